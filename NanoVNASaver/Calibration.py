@@ -18,12 +18,15 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
 import cmath
+import json
 import math
 import os
 import re
+import struct
 from collections import defaultdict, UserDict
-from typing import List
+from typing import Dict, List
 
+import numpy as np
 from scipy.interpolate import interp1d
 
 from NanoVNASaver.RFTools import Datapoint
@@ -40,6 +43,19 @@ RXP_CAL_LINE = re.compile(r"""^\s*
 
 logger = logging.getLogger(__name__)
 
+# Binary calibration file:
+#   magic, version (uint32), header length (uint32), json header,
+#   padded to BINARY_ALIGN, frequencies (int64) followed by the
+#   columns listed in the header (complex128), all little endian.
+BINARY_SUFFIX = ".calb"
+BINARY_MAGIC = b"NVNASCAL"
+BINARY_VERSION = 1
+BINARY_PREFIX = struct.Struct("<8sII")
+BINARY_ALIGN = 16
+
+# number of frequency grids (sweep segments) to keep error terms for
+ERROR_TERM_CACHE_SIZE = 64
+
 
 def correct_delay(d: Datapoint, delay: float, reflect: bool = False):
     mult = 2 if reflect else 1
@@ -48,6 +64,13 @@ def correct_delay(d: Datapoint, delay: float, reflect: bool = False):
     return Datapoint(d.freq, corr_data.real, corr_data.imag)
 
 
+def correct_delay_batch(freq: np.ndarray, values: np.ndarray,
+                        delay: float, reflect: bool = False) -> np.ndarray:
+    """correct_delay for whole arrays of frequencies and values"""
+    mult = 2 if reflect else 1
+    return values * np.exp(-2j * math.pi * np.asarray(freq) * delay * mult)
+
+
 class CalData(UserDict):
     def __init__(self):
         data = {
@@ -81,16 +104,92 @@ class CalData(UserDict):
 
 
 class CalDataSet:
+    """Calibration standards and error terms per frequency
+
+    The values are available per frequency as CalData and as numpy
+    columns over all frequencies. A dataset loaded from a binary file
+    only holds the columns, the CalData view is built
+    on first use.
+    """
+    STANDARDS = ("short", "open", "load", "through", "isolation")
+    ERROR_TERMS = ("e00", "e11", "delta_e", "e30", "e10e32")
+
     def __init__(self):
-        self.data = defaultdict(CalData)
+        self._data = defaultdict(CalData)
+        self._columns = {}
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray]) -> 'CalDataSet':
+        """Creates a dataset from numpy columns
+
+        Missing standards are marked with nan, missing error terms
+        default to zero.
+        """
+        dataset = cls()
+        dataset._data = None
+        dataset._columns = dict(columns)
+        return dataset
+
+    @property
+    def data(self) -> Dict[int, CalData]:
+        if self._data is None:
+            self._data = defaultdict(CalData)
+            freqs = self.column("freq").tolist()
+            for name in CalDataSet.STANDARDS:
+                values = self.column(name)
+                if np.isnan(values).all():
+                    continue
+                for freq, value in zip(freqs, values.tolist()):
+                    if not cmath.isnan(value):
+                        self._data[freq][name] = Datapoint(
+                            freq, value.real, value.imag)
+            for name in CalDataSet.ERROR_TERMS:
+                for freq, value in zip(freqs, self.column(name).tolist()):
+                    self._data[freq][name] = value
+            for freq in freqs:
+                self._data[freq]["freq"] = freq
+        return self._data
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns the values of name over all frequencies, sorted by
+        frequency. Missing standards are nan"""
+        if name not in self._columns:
+            values = list(self.values())
+            if name == "freq":
+                column = np.array([v["freq"] for v in values],
+                                  dtype=np.int64)
+            elif name in CalDataSet.STANDARDS:
+                column = np.array(
+                    [complex("nan") if v[name] is None else
+                     complex(v[name].re, v[name].im) for v in values],
+                    dtype=np.complex128)
+            elif self._data is None:
+                column = np.zeros(len(values), dtype=np.complex128)
+            else:
+                column = np.array([v[name] for v in values],
+                                  dtype=np.complex128)
+            self._columns[name] = column
+        return self._columns[name]
+
+    def set_column(self, name: str, values: np.ndarray):
+        """Stores calculated error terms"""
+        if name not in CalDataSet.ERROR_TERMS:
+            raise KeyError(name)
+        self._columns[name] = values
+        if self._data is not None:
+            for caldata, value in zip(self.values(), values.tolist()):
+                caldata[name] = value
 
     def insert(self, name: str, dp: Datapoint):
         if name not in self.data[dp.freq]:
             raise KeyError(name)
         self.data[dp.freq]["freq"] = dp.freq
         self.data[dp.freq][name] = dp
+        self._columns.clear()
 
     def frequencies(self) -> List[int]:
+        if self._data is None:
+            return self.column("freq").tolist()
         return sorted(self.data.keys())
 
     def get(self, freq: int) -> CalData:
@@ -103,22 +202,21 @@ class CalDataSet:
         for freq in self.frequencies():
             yield self.get(freq)
 
+    def size(self) -> int:
+        return len(self.column("freq"))
+
     def size_of(self, name: str) -> int:
-        return len([v for v in self.data.values() if v[name] is not None])
+        return int(np.count_nonzero(~np.isnan(self.column(name))))
 
     def complete1port(self) -> bool:
-        for val in self.data.values():
-            for name in ("short", "open", "load"):
-                if val[name] is None:
-                    return False
-        return any(self.data)
+        return self.size() > 0 and all(
+            self.size_of(name) == self.size()
+            for name in ("short", "open", "load"))
 
     def complete2port(self) -> bool:
-        for val in self.data.values():
-            for name in ("short", "open", "load", "through", "isolation"):
-                if val[name] is None:
-                    return False
-        return any(self.data)
+        return self.complete1port() and all(
+            self.size_of(name) == self.size()
+            for name in ("through", "isolation"))
 
 
 class Calibration:
@@ -132,6 +230,7 @@ class Calibration:
         self.notes = []
         self.dataset = CalDataSet()
         self.interp = {}
+        self._error_terms = {}
 
         self.useIdealShort = True
         self.shortL0 = 5.7 * 10E-12
@@ -169,7 +268,7 @@ class Calibration:
             self.dataset.insert(name, dp)
 
     def size(self) -> int:
-        return len(self.dataset.frequencies())
+        return self.dataset.size()
 
     def data_size(self, name) -> int:
         return self.dataset.size_of(name)
@@ -189,125 +288,134 @@ class Calibration:
                 "must be completed for calibration to be applied.")
         logger.debug("Calculating calibration for %d points.", self.size())
 
-        for freq, caldata in self.dataset.items():
-            g1 = self.gamma_short(freq)
-            g2 = self.gamma_open(freq)
-            g3 = self.gamma_load(freq)
-
-            gm1 = caldata["short"].z
-            gm2 = caldata["open"].z
-            gm3 = caldata["load"].z
-
-            try:
-                denominator = (g1 * (g2 - g3) * gm1 +
-                               g2 * g3 * gm2 - g2 * g3 * gm3 -
-                               (g2 * gm2 - g3 * gm3) * g1)
-                caldata["e00"] = - ((g2 * gm3 - g3 * gm3) * g1 * gm2 -
-                                    (g2 * g3 * gm2 - g2 * g3 * gm3 -
-                                     (g3 * gm2 - g2 * gm3) * g1) * gm1
-                                    ) / denominator
-                caldata["e11"] = ((g2 - g3) * gm1 - g1 * (gm2 - gm3) +
-                                  g3 * gm2 - g2 * gm3) / denominator
-                caldata["delta_e"] = - ((g1 * (gm2 - gm3) - g2 * gm2 + g3 *
-                                         gm3) * gm1 + (g2 * gm3 - g3 * gm3) *
-                                        gm2) / denominator
-            except ZeroDivisionError as exc:
-                self.isCalculated = False
-                logger.error(
-                    "Division error - did you use the same measurement"
-                    " for two of short, open and load?")
-                raise ValueError(
-                    f"Two of short, open and load returned the same"
-                    f" values at frequency {freq}Hz.") from exc
-
-            if self.isValid2Port():
-                caldata["e30"] = caldata["isolation"].z
-
-                gt = self.gamma_through(freq)
-                caldata["e10e32"] = (caldata["through"].z / gt - caldata["e30"]
-                                     ) * (1 - caldata["e11"]**2)
+        freq = self.dataset.column("freq")
+        measured = self.dataset.column
+
+        g1 = self.gamma_short(freq)
+        g2 = self.gamma_open(freq)
+        g3 = self.gamma_load(freq)
+
+        gm1 = measured("short")
+        gm2 = measured("open")
+        gm3 = measured("load")
+
+        denominator = (g1 * (g2 - g3) * gm1 +
+                       g2 * g3 * gm2 - g2 * g3 * gm3 -
+                       (g2 * gm2 - g3 * gm3) * g1)
+        zero_division = denominator == 0
+        if zero_division.any():
+            self.isCalculated = False
+            bad_freqs = ", ".join(f"{f}Hz" for f in freq[zero_division])
+            logger.error(
+                "Division error - did you use the same measurement"
+                " for two of short, open and load?")
+            raise ValueError(
+                f"Two of short, open and load returned the same"
+                f" values at frequency {bad_freqs}.")
+
+        e00 = - ((g2 * gm3 - g3 * gm3) * g1 * gm2 -
+                 (g2 * g3 * gm2 - g2 * g3 * gm3 -
+                  (g3 * gm2 - g2 * gm3) * g1) * gm1
+                 ) / denominator
+        e11 = ((g2 - g3) * gm1 - g1 * (gm2 - gm3) +
+               g3 * gm2 - g2 * gm3) / denominator
+        delta_e = - ((g1 * (gm2 - gm3) - g2 * gm2 + g3 *
+                      gm3) * gm1 + (g2 * gm3 - g3 * gm3) *
+                     gm2) / denominator
+
+        terms = {"e00": e00, "e11": e11, "delta_e": delta_e}
+        if self.isValid2Port():
+            e30 = measured("isolation")
+            gt = self.gamma_through(freq)
+            terms["e30"] = e30
+            terms["e10e32"] = (measured("through") / gt - e30
+                               ) * (1 - e11**2)
+
+        for name, values in terms.items():
+            self.dataset.set_column(name, values)
 
         self.gen_interpolation()
         self.isCalculated = True
         logger.debug("Calibration correctly calculated.")
 
+    # The standards models work on single frequencies as well as on
+    # numpy arrays of frequencies
+
     def gamma_short(self, freq: int) -> complex:
         g = Calibration.IDEAL_SHORT
         if not self.useIdealShort:
             logger.debug("Using short calibration set values.")
-            Zsp = complex(0, 2 * math.pi * freq * (
+            freq = np.asarray(freq, dtype=np.float64)
+            Zsp = 2j * math.pi * freq * (
                 self.shortL0 + self.shortL1 * freq +
-                self.shortL2 * freq**2 + self.shortL3 * freq**3))
+                self.shortL2 * freq**2 + self.shortL3 * freq**3)
             # Referencing https://arxiv.org/pdf/1606.02446.pdf (18) - (21)
-            g = (Zsp / 50 - 1) / (Zsp / 50 + 1) * cmath.exp(
-                complex(0, 2 * math.pi * 2 * freq * self.shortLength * -1))
+            g = (Zsp / 50 - 1) / (Zsp / 50 + 1) * np.exp(
+                -2j * math.pi * 2 * freq * self.shortLength)
         return g
 
     def gamma_open(self, freq: int) -> complex:
         g = Calibration.IDEAL_OPEN
         if not self.useIdealOpen:
             logger.debug("Using open calibration set values.")
-            Zop = complex(0, 2 * math.pi * freq * (
+            freq = np.asarray(freq, dtype=np.float64)
+            Zop = 2j * math.pi * freq * (
                 self.openC0 + self.openC1 * freq +
-                self.openC2 * freq**2 + self.openC3 * freq**3))
-            g = ((1 - 50 * Zop) / (1 + 50 * Zop)) * cmath.exp(
-                complex(0, 2 * math.pi * 2 * freq * self.openLength * -1))
+                self.openC2 * freq**2 + self.openC3 * freq**3)
+            g = ((1 - 50 * Zop) / (1 + 50 * Zop)) * np.exp(
+                -2j * math.pi * 2 * freq * self.openLength)
         return g
 
     def gamma_load(self, freq: int) -> complex:
         g = Calibration.IDEAL_LOAD
         if not self.useIdealLoad:
             logger.debug("Using load calibration set values.")
+            freq = np.asarray(freq, dtype=np.float64)
             Zl = complex(self.loadR, 0)
             if self.loadC > 0:
-                Zl = self.loadR / complex(1, 2 * self.loadR * math.pi * freq * self.loadC)
+                Zl = self.loadR / (1 + 2j * self.loadR * math.pi *
+                                   freq * self.loadC)
             if self.loadL > 0:
-                Zl = Zl + complex(0, 2 * math.pi * freq * self.loadL)
-            g = (Zl / 50 - 1) / (Zl / 50 + 1) * cmath.exp(
-                complex(0, 2 * math.pi * 2 * freq * self.loadLength * -1))
+                Zl = Zl + 2j * math.pi * freq * self.loadL
+            g = (Zl / 50 - 1) / (Zl / 50 + 1) * np.exp(
+                -2j * math.pi * 2 * freq * self.loadLength)
         return g
 
     def gamma_through(self, freq: int) -> complex:
         g = complex(1, 0)
         if not self.useIdealThrough:
             logger.debug("Using through calibration set values.")
-            g = cmath.exp(complex(0, 1) * 2 * math.pi *
-                          self.throughLength * freq * -1)
+            freq = np.asarray(freq, dtype=np.float64)
+            g = np.exp(-2j * math.pi * self.throughLength * freq)
         return g
 
     def gen_interpolation(self):
-        freq = []
-        e00 = []
-        e11 = []
-        delta_e = []
-        e30 = []
-        e10e32 = []
-
-        for caldata in self.dataset.values():
-            freq.append(caldata["freq"])
-            e00.append(caldata["e00"])
-            e11.append(caldata["e11"])
-            delta_e.append(caldata["delta_e"])
-            e30.append(caldata["e30"])
-            e10e32.append(caldata["e10e32"])
-
-        self.interp = {
-            "e00": interp1d(freq, e00,
-                            kind="slinear", bounds_error=False,
-                            fill_value=(e00[0], e00[-1])),
-            "e11": interp1d(freq, e11,
-                            kind="slinear", bounds_error=False,
-                            fill_value=(e11[0], e11[-1])),
-            "delta_e": interp1d(freq, delta_e,
-                                kind="slinear", bounds_error=False,
-                                fill_value=(delta_e[0], delta_e[-1])),
-            "e30": interp1d(freq, e30,
-                            kind="slinear", bounds_error=False,
-                            fill_value=(e30[0], e30[-1])),
-            "e10e32": interp1d(freq, e10e32,
-                               kind="slinear", bounds_error=False,
-                               fill_value=(e10e32[0], e10e32[-1])),
-        }
+        freq = self.dataset.column("freq")
+        self.interp = {}
+        for name in CalDataSet.ERROR_TERMS:
+            values = self.dataset.column(name)
+            self.interp[name] = interp1d(
+                freq, values, kind="slinear", bounds_error=False,
+                fill_value=(values[0], values[-1]))
+        self._error_terms = {}
+
+    def error_terms(self, freq: np.ndarray) -> Dict[str, np.ndarray]:
+        """Returns the error terms interpolated to the frequencies in freq
+
+        The result is cached per frequency grid, so repeated sweeps over
+        the same segments do not need to interpolate again.
+        """
+        freq = np.asarray(freq, dtype=np.int64)
+        key = freq.tobytes()
+        try:
+            return self._error_terms[key]
+        except KeyError:
+            pass
+        if len(self._error_terms) >= ERROR_TERM_CACHE_SIZE:
+            self._error_terms.clear()
+        terms = {name: interp(freq) for name, interp in self.interp.items()}
+        self._error_terms[key] = terms
+        return terms
 
     def correct11(self, dp: Datapoint):
         i = self.interp
@@ -320,11 +428,25 @@ class Calibration:
         s21 = (dp.z - i["e30"](dp.freq)) / i["e10e32"](dp.freq)
         return Datapoint(dp.freq, s21.real, s21.imag)
 
-    # TODO: implement tests
+    def correct11_batch(self, freq: np.ndarray,
+                        s11: np.ndarray) -> np.ndarray:
+        """correct11 for whole arrays of frequencies and s11 values"""
+        e = self.error_terms(freq)
+        return (s11 - e["e00"]) / ((s11 * e["e11"]) - e["delta_e"])
+
+    def correct21_batch(self, freq: np.ndarray,
+                        s21: np.ndarray) -> np.ndarray:
+        """correct21 for whole arrays of frequencies and s21 values"""
+        e = self.error_terms(freq)
+        return (s21 - e["e30"]) / e["e10e32"]
+
     def save(self, filename: str):
         # Save the calibration data to file
         if not self.isValid1Port():
             raise ValueError("Not a valid 1-Port calibration")
+        if filename.endswith(BINARY_SUFFIX):
+            self.save_binary(filename)
+            return
         with open(f"{filename}", "w") as calfile:
             calfile.write("# Calibration data for NanoVNA-Saver\n")
             for note in self.notes:
@@ -335,9 +457,73 @@ class Calibration:
             for freq in self.dataset.frequencies():
                 calfile.write(f"{self.dataset.get(freq)}\n")
 
-    # TODO: implement tests
+    def save_binary(self, filename: str):
+        if not self.isValid1Port():
+            raise ValueError("Not a valid 1-Port calibration")
+        names = [name for name in CalDataSet.STANDARDS
+                 if self.dataset.size_of(name)]
+        if self.isCalculated:
+            names += CalDataSet.ERROR_TERMS
+        header = json.dumps({
+            "points": self.size(),
+            "columns": names,
+            "notes": self.notes,
+        }).encode("utf-8")
+        header += b" " * (-(BINARY_PREFIX.size + len(header)) % BINARY_ALIGN)
+        # write to a new file, the old one stays intact if writing fails
+        tmpname = f"{filename}.tmp"
+        with open(tmpname, "wb") as calfile:
+            calfile.write(BINARY_PREFIX.pack(
+                BINARY_MAGIC, BINARY_VERSION, len(header)))
+            calfile.write(header)
+            calfile.write(self.dataset.column("freq").astype("<i8").tobytes())
+            for name in names:
+                calfile.write(
+                    self.dataset.column(name).astype("<c16").tobytes())
+        os.replace(tmpname, filename)
+
+    def load_binary(self, filename: str):
+        """Loads a binary calibration file
+
+        The values are read as one block and not parsed. The file is
+        not kept open or mapped, so it can be overwritten on every
+        platform while the calibration is in use.
+        """
+        with open(filename, "rb") as calfile:
+            magic, version, header_len = BINARY_PREFIX.unpack(
+                calfile.read(BINARY_PREFIX.size))
+            if magic != BINARY_MAGIC:
+                raise ValueError(f"{filename} is no binary calibration file")
+            if version != BINARY_VERSION:
+                raise ValueError(
+                    f"Unsupported calibration file version {version}")
+            header = json.loads(calfile.read(header_len))
+            raw = np.fromfile(calfile, dtype=np.uint8)
+        raw.flags.writeable = False
+        points = header["points"]
+        columns = {"freq": raw[:points * 8].view("<i8")}
+        offset = points * 8
+        for name in header["columns"]:
+            columns[name] = raw[offset:offset + points * 16].view("<c16")
+            offset += points * 16
+        for name in CalDataSet.STANDARDS:
+            if name not in columns:
+                columns[name] = np.full(points, complex("nan"))
+
+        self.source = os.path.basename(filename)
+        self.dataset = CalDataSet.from_columns(columns)
+        self.notes = header["notes"]
+
+    @staticmethod
+    def is_binary(filename: str) -> bool:
+        with open(filename, "rb") as calfile:
+            return calfile.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
     # TODO: Exception should be catched by caller
     def load(self, filename):
+        if Calibration.is_binary(filename):
+            self.load_binary(filename)
+            return
         self.source = os.path.basename(filename)
         self.dataset = CalDataSet()
         self.notes = []
@@ -33,6 +33,7 @@ logger = logging.getLogger(__name__)
 class CombinedLogMagChart(FrequencyChart):
     def __init__(self, name=""):
         super().__init__(name)
+        self.flag.layered = False
 
         self.minDisplayValue = -80
         self.maxDisplayValue = 10
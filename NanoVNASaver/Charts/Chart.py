@@ -18,9 +18,10 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
 
-from dataclasses import dataclass, replace
+from dataclasses import dataclass, field, replace
 from typing import List, Set, Tuple, ClassVar, Any
 
+import numpy as np
 from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtCore import pyqtSignal
 
@@ -30,17 +31,38 @@ from NanoVNASaver.Marker import Marker
 logger = logging.getLogger(__name__)
 
 
+def polygon(x: np.ndarray, y: np.ndarray) -> QtGui.QPolygonF:
+    """Builds a QPolygonF from coordinate arrays without a python loop"""
+    poly = QtGui.QPolygonF(len(x))
+    if len(x):
+        buffer = poly.data()
+        buffer.setsize(len(x) * 2 * np.dtype(np.float64).itemsize)
+        points = np.frombuffer(buffer, np.float64).reshape(-1, 2)
+        points[:, 0] = x
+        points[:, 1] = y
+    return poly
+
+
 @dataclass
 class ChartColors:  # pylint: disable=too-many-instance-attributes
-    background: QtGui.QColor = QtGui.QColor(QtCore.Qt.white)
-    foreground: QtGui.QColor = QtGui.QColor(QtCore.Qt.lightGray)
-    reference: QtGui.QColor = QtGui.QColor(0, 0, 255, 64)
-    reference_secondary: QtGui.QColor = QtGui.QColor(0, 0, 192, 48)
-    sweep: QtGui.QColor =  QtGui.QColor(QtCore.Qt.darkYellow)
-    sweep_secondary: QtGui.QColor = QtGui.QColor(QtCore.Qt.darkMagenta)
-    swr: QtGui.QColor = QtGui.QColor(255, 0, 0, 128)
-    text: QtGui.QColor = QtGui.QColor(QtCore.Qt.black)
-    bands: QtGui.QColor = QtGui.QColor(128, 128, 128, 48)
+    background: QtGui.QColor = field(
+        default_factory=lambda: QtGui.QColor(QtCore.Qt.white))
+    foreground: QtGui.QColor = field(
+        default_factory=lambda: QtGui.QColor(QtCore.Qt.lightGray))
+    reference: QtGui.QColor = field(
+        default_factory=lambda: QtGui.QColor(0, 0, 255, 64))
+    reference_secondary: QtGui.QColor = field(
+        default_factory=lambda: QtGui.QColor(0, 0, 192, 48))
+    sweep: QtGui.QColor = field(
+        default_factory=lambda: QtGui.QColor(QtCore.Qt.darkYellow))
+    sweep_secondary: QtGui.QColor = field(
+        default_factory=lambda: QtGui.QColor(QtCore.Qt.darkMagenta))
+    swr: QtGui.QColor = field(
+        default_factory=lambda: QtGui.QColor(255, 0, 0, 128))
+    text: QtGui.QColor = field(
+        default_factory=lambda: QtGui.QColor(QtCore.Qt.black))
+    bands: QtGui.QColor = field(
+        default_factory=lambda: QtGui.QColor(128, 128, 128, 48))
 
 @dataclass
 class ChartDimensions:
@@ -63,6 +85,8 @@ class ChartDragBox:
 class ChartFlags:
     draw_lines: bool = False
     is_popout: bool = False
+    # sweep only drawn by drawData(qp, self.data, ...), see FrequencyChart
+    layered: bool = True
 
 @dataclass
 class ChartMarkerConfig:
@@ -103,6 +127,8 @@ class ChartMarker(QtWidgets.QWidget):
 class Chart(QtWidgets.QWidget):
     bands: ClassVar[Any] = None
     popoutRequested: ClassVar[Any] = pyqtSignal(object)
+    # emitted when the chart becomes visible again and may be outdated
+    shown: ClassVar[Any] = pyqtSignal()
     color: ClassVar[ChartColors] = ChartColors()
     marker_cfg: ClassVar[ChartMarkerConfig] = ChartMarkerConfig()
 
@@ -145,6 +171,16 @@ class Chart(QtWidgets.QWidget):
         self.data = data
         self.update()
 
+    def showEvent(self, a0: QtGui.QShowEvent) -> None:
+        super().showEvent(a0)
+        self.shown.emit()
+
+    def changeEvent(self, a0: QtCore.QEvent) -> None:
+        super().changeEvent(a0)
+        if (a0.type() == QtCore.QEvent.WindowStateChange and
+                not self.isMinimized()):
+            self.shown.emit()
+
     def setMarkers(self, markers):
         self.markers = markers
 
@@ -18,20 +18,36 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import math
 import logging
-from typing import List, Tuple
+from collections import OrderedDict
+from typing import Callable, List, Tuple
 
 import numpy as np
 from PyQt5 import QtWidgets, QtGui, QtCore
 
-from NanoVNASaver.Charts.Chart import Chart
+from NanoVNASaver.Charts.Chart import Chart, polygon
 from NanoVNASaver.Formatting import (
     parse_frequency, parse_value,
     format_frequency_chart, format_y_axis)
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.SITools import Format, Value
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
+# traces with more points per pixel column are drawn as min/max envelope
+DECIMATE_ABOVE = 2
+# pixel columns and envelopes kept per chart, enough for data and
+# reference of a few zoom levels
+DECIMATE_CACHE_SIZE = 8
+
+
+def value_range(values: np.ndarray, minimum: float,
+                maximum: float) -> Tuple[float, float]:
+    """Extends minimum and maximum by values, NaN never compares"""
+    values = values[~np.isnan(values)]
+    return (float(np.min(values, initial=minimum)),
+            float(np.max(values, initial=maximum)))
+
 
 class FrequencyChart(Chart):
     fstart = 0
@@ -55,6 +71,17 @@ class FrequencyChart(Chart):
     bottomMargin = 20
     topMargin = 30
 
+    # Layered painting: axes, bands and reference are kept in a cached
+    # background, the sweep trace on top of it in the canvas. A sweep
+    # update only repaints the x-range of the points that changed.
+    _background = None
+    _axis_state = None  # what the background was drawn for
+    _canvas = None
+    _dirty = None  # index range of changed points
+    _recording = False
+    _traces = ()
+    _marker_calls = ()
+
     def __init__(self, name):
         super().__init__(name)
         self.leftMargin = 30
@@ -62,6 +89,7 @@ class FrequencyChart(Chart):
         self.dim.height = 250
         self.fstart = 0
         self.fstop = 0
+        self._column_cache = OrderedDict()
 
         self.name_unit = ""
         self.value_function = lambda x: 0.0
@@ -474,15 +502,152 @@ class FrequencyChart(Chart):
         self.dim.height = a0.size().height() - self.bottomMargin - self.topMargin
         self.update()
 
+    def update(self):
+        self._background = None
+        super().update()
+
+    def setData(self, data):
+        dirty = self._changedRange(self.data, data)
+        self.data = data
+        if dirty is None:
+            self.update()
+            return
+        if dirty[0] > dirty[1]:
+            return  # nothing changed
+        if self._dirty is not None:
+            dirty = (min(dirty[0], self._dirty[0]),
+                     max(dirty[1], self._dirty[1]))
+        self._dirty = dirty
+        super().update()
+
+    @staticmethod
+    def _changedRange(old, new) -> Tuple[int, int]:
+        """Range of changed points or None if the frequencies differ"""
+        if not (hasattr(old, "z") and hasattr(new, "z")):
+            return None
+        if len(old) != len(new) or not np.array_equal(old.freq, new.freq):
+            return None
+        changed = np.flatnonzero(old.z != new.z)
+        if not len(changed):
+            return (0, -1)
+        return (int(changed[0]), int(changed[-1]))
+
     def paintEvent(self, _: QtGui.QPaintEvent) -> None:
-        qp = QtGui.QPainter(self)
-        self.drawChart(qp)
-        self.drawValues(qp)
+        if not self.flag.layered:
+            self._dirty = None
+            qp = QtGui.QPainter(self)
+            self.drawChart(qp)
+            self.drawValues(qp)
+        else:
+            self._paintLayers()
+            qp = QtGui.QPainter(self)
+            qp.drawPixmap(0, 0, self._canvas)
+            for data, y_function in self._marker_calls:
+                self.drawMarkers(qp, data, y_function)
         self._check_frequency_boundaries(qp)
         if self.dragbox.state and self.dragbox.pos[0] != -1:
             self.drawDragbog(qp)
         qp.end()
 
+    def _paintLayers(self):
+        dirty, self._dirty = self._dirty, None
+        if self._background is not None and dirty is None:
+            return  # e.g. exposed again, the canvas is up to date
+        axis_state = self._axisState()
+        if axis_state != self._axis_state:
+            # the scaling changed with the data
+            self._background = None
+        if self._background is not None and dirty is not None and \
+                self._paintRange(*dirty):
+            return
+        if self._background is None:
+            self._axis_state = axis_state
+            self._background = self._renderBackground()
+        self._canvas = QtGui.QPixmap(self._background)
+        qp = QtGui.QPainter(self._canvas)
+        for color, y_function in self._traces:
+            self._drawData(qp, self.data, color, y_function)
+        qp.end()
+
+    def _axisState(self) -> tuple:
+        """Everything the background depends on besides explicit updates
+
+        Cheap to calculate from the cached trace columns, the
+        background is only redrawn when this changes.
+        """
+        state = (self.size(), self.devicePixelRatioF(),
+                 self.leftMargin, self.rightMargin,
+                 self.topMargin, self.bottomMargin,
+                 self.dim.point, self.dim.line,
+                 self.logarithmicX, self.logarithmicY,
+                 self.fixedSpan, self.fixedValues, self.bands.enabled,
+                 tuple(color.rgba() for color in vars(Chart.color).values()))
+        if len(self.data) == 0 and len(self.reference) == 0:
+            return state
+        self._set_start_stop()
+        return state + (self.fstart, self.fstop, self._find_scaling())
+
+    def _renderBackground(self) -> QtGui.QPixmap:
+        """Draws the chart without the sweep trace and the markers"""
+        ratio = self.devicePixelRatioF()
+        pixmap = QtGui.QPixmap(self.size() * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Chart.color.background)
+        self._traces = []
+        self._marker_calls = []
+        qp = QtGui.QPainter(pixmap)
+        self._recording = True
+        try:
+            self.drawChart(qp)
+            self.drawValues(qp)
+        finally:
+            self._recording = False
+            qp.end()
+        return pixmap
+
+    def _paintRange(self, first: int, last: int) -> bool:
+        """Repaints the stripe of the canvas showing the given points"""
+        data = self.data
+        if self._canvas is None or self._canvas.size() != self._background.size():
+            return False
+        xpos = self._xPositions(data.freq)
+        if np.any(np.diff(xpos) < 0):
+            return False
+        pad = max(self.dim.point, self.dim.line) + 1
+        x_start = xpos[max(first - 1, 0)] - pad
+        x_stop = xpos[min(last + 1, len(data) - 1)] + pad
+        # include the points whose lines reach into the stripe
+        start = max(int(np.searchsorted(xpos, x_start)) - 1, 0)
+        stop = min(int(np.searchsorted(xpos, x_stop, "right")) + 1, len(data))
+        if self._decimated(data):
+            # whole pixel columns, so the stripe has the envelope of the
+            # full trace, and the columns next to them for their lines
+            start = int(np.searchsorted(xpos, xpos[start]))
+            start = int(np.searchsorted(xpos, xpos[max(start - 1, 0)]))
+            stop = int(np.searchsorted(xpos, xpos[stop - 1], "right"))
+            stop = int(np.searchsorted(
+                xpos, xpos[min(stop, len(data) - 1)], "right"))
+        qp = QtGui.QPainter(self._canvas)
+        qp.setClipRect(QtCore.QRect(
+            int(x_start), 0, int(x_stop - x_start) + 1, self.height()))
+        qp.drawPixmap(0, 0, self._background)
+        for color, y_function in self._traces:
+            self._drawData(qp, data, color, y_function, (start, stop))
+        qp.end()
+        return True
+
+    def _xPositions(self, freq: np.ndarray) -> np.ndarray:
+        """Vectorized getXPosition"""
+        span = self.fstop - self.fstart
+        if span <= 0:
+            return np.full(len(freq), math.floor(self.width() / 2))
+        if self.logarithmicX:
+            span = math.log(self.fstop) - math.log(self.fstart)
+            return self.leftMargin + np.round(
+                self.dim.width * (np.log(freq) - math.log(self.fstart)) / span)
+        return self.leftMargin + np.round(
+            self.dim.width * (freq - self.fstart) / span)
+
     def _check_frequency_boundaries(self, qp: QtGui.QPainter):
         if (len(self.data) > 0 and
                 (self.data[0].freq > self.fstop or
@@ -569,7 +734,8 @@ class FrequencyChart(Chart):
         self.drawData(qp, self.reference, Chart.color.reference)
         self.drawMarkers(qp)
 
-    def _find_scaling(self) -> Tuple[int, int]:
+    def _find_scaling(self) -> Tuple[float, float]:
+        """Range of the value axis, charts calculate it without painting"""
         if self.fixedValues:
             return (self.minDisplayValue / 10e11,
                     self.maxDisplayValue / 10e11)
@@ -635,50 +801,198 @@ class FrequencyChart(Chart):
 
     def drawData(self, qp: QtGui.QPainter, data: List[Datapoint],
                  color: QtGui.QColor, y_function=None):
-        if y_function is None:
-            y_function = self.getYPosition
+        if self._recording and data is self.data:
+            self._traces.append((color, y_function))
+            return
+        self._drawData(qp, data, color, y_function)
+
+    def _decimated(self, data: List[Datapoint]) -> bool:
+        """Whether a whole trace is drawn as min/max envelope"""
+        return len(data) > DECIMATE_ABOVE * max(self.dim.width, 1)
+
+    def _drawData(self, qp: QtGui.QPainter, data: List[Datapoint],
+                  color: QtGui.QColor, y_function=None,
+                  part: Tuple[int, int] = None):
+        """part is the index range drawn of data, all of it if None
+
+        A part of a decimated trace has to start and stop at whole
+        pixel columns, it is drawn like the same range of the trace.
+        """
+        if len(data) == 0:
+            return
+        data = Trace.from_datapoints(data)
+        decimate = self._decimated(data)
+        start = 0
+        drawn = data
+        if part is not None:
+            start = part[0]
+            drawn = data[part[0]:part[1]]
+        envelope = None
+        if decimate and part is None:
+            envelope = self._cachedEnvelope(data, y_function)
+        if envelope is None:
+            y = self.getYPositions(drawn, y_function)
+            if decimate:
+                envelope = self._decimate(data.freq, y, start)
+                if part is None:
+                    self._cacheEnvelope(data, y_function, envelope)
+        if envelope is not None:
+            x, y = envelope
+        else:
+            x = self._xPositions(drawn.freq)
+        drawable = np.isfinite(y)
+        if self.flag.draw_lines and len(data) > 1:
+            line_pen = QtGui.QPen(color)
+            line_pen.setWidth(self.dim.line)
+            qp.save()
+            qp.setPen(line_pen)
+            margin = self.dim.line
+            qp.setClipRect(QtCore.QRect(
+                self.leftMargin - margin, self.topMargin - margin,
+                self.dim.width + 2 * margin, self.dim.height + 2 * margin),
+                QtCore.Qt.IntersectClip)
+            # one polyline per run of drawable points
+            edges = np.flatnonzero(np.diff(np.concatenate(
+                ([0], drawable.view(np.int8), [0]))))
+            for start, stop in edges.reshape(-1, 2):
+                if stop - start > 1:
+                    qp.drawPolyline(polygon(x[start:stop], y[start:stop]))
+            qp.restore()
+        plotable = drawable & self._isPlotable(x, y)
         pen = QtGui.QPen(color)
         pen.setWidth(self.dim.point)
-        line_pen = QtGui.QPen(color)
-        line_pen.setWidth(self.dim.line)
         qp.setPen(pen)
-        for i, d in enumerate(data):
-            x = self.getXPosition(d)
-            y = y_function(d)
-            if y is None:
-                continue
-            if self.isPlotable(x, y):
-                qp.drawPoint(int(x), int(y))
-            if self.flag.draw_lines and i > 0:
-                prevx = self.getXPosition(data[i - 1])
-                prevy = y_function(data[i - 1])
-                if prevy is None:
-                    continue
-                qp.setPen(line_pen)
-                if self.isPlotable(x, y) and self.isPlotable(prevx, prevy):
-                    qp.drawLine(x, y, prevx, prevy)
-                elif self.isPlotable(x, y) and not self.isPlotable(prevx, prevy):
-                    new_x, new_y = self.getPlotable(x, y, prevx, prevy)
-                    qp.drawLine(x, y, new_x, new_y)
-                elif not self.isPlotable(x, y) and self.isPlotable(prevx, prevy):
-                    new_x, new_y = self.getPlotable(prevx, prevy, x, y)
-                    qp.drawLine(prevx, prevy, new_x, new_y)
-                qp.setPen(pen)
+        qp.drawPoints(polygon(x[plotable], y[plotable]))
+
+    def _decimate(self, freq: np.ndarray, y: np.ndarray,
+                  start: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """Reduces the points to first, min, max and last per pixel column
+
+        Peaks and nulls are kept exactly, the vertical line through
+        the min and max covers all points of a column. freq is the
+        frequency axis of the whole trace, y the positions of the
+        points from start on, which both are whole pixel columns.
+        """
+        columns = self._pixelColumns(freq)
+        if columns is None:
+            return None
+        starts, x = columns
+        if start or len(y) < len(freq):
+            first, last = np.searchsorted(starts, (start, start + len(y)))
+            starts = starts[first:last] - start
+            x = x[first:last]
+        low = np.fmin.reduceat(y, starts)
+        high = np.fmax.reduceat(y, starts)
+        first = y[starts]
+        last = y[np.append(starts[1:], len(y)) - 1]
+        return (np.repeat(x, 4),
+                np.column_stack((first, low, high, last)).ravel())
+
+    def _pixelColumns(self, freq: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """First point and x position of every pixel column
+
+        Cached per frequency axis and zoom, None for unsorted points.
+        """
+        key = ("columns", len(freq), int(freq[0]), int(freq[-1]),
+               self.fstart, self.fstop, self.logarithmicX,
+               self.leftMargin, self.dim.width)
+        cached = self._cacheGet(key)
+        if cached is not None and np.array_equal(cached[0], freq):
+            return cached[1]
+        x = self._xPositions(freq)
+        step = np.diff(x)
+        if np.any(step < 0):
+            columns = None
+        else:
+            starts = np.concatenate(([0], np.flatnonzero(step) + 1))
+            columns = (starts, x[starts])
+        self._cachePut(key, (freq, columns))
+        return columns
+
+    def _cachedEnvelope(self, data: Trace, y_function):
+        """Envelope of a whole trace drawn before with the same axes"""
+        if not self.flag.layered or self._axis_state is None:
+            return None
+        cached = self._cacheGet(("envelope", id(data), y_function))
+        if cached is None or cached[0] is not data or \
+                cached[1] != self._axis_state:
+            return None
+        return cached[2]
+
+    def _cacheEnvelope(self, data: Trace, y_function, envelope):
+        if self.flag.layered and self._axis_state is not None:
+            self._cachePut(("envelope", id(data), y_function),
+                           (data, self._axis_state, envelope))
+
+    def _cacheGet(self, key):
+        cached = self._column_cache.get(key)
+        if cached is not None:
+            self._column_cache.move_to_end(key)
+        return cached
+
+    def _cachePut(self, key, value):
+        self._column_cache[key] = value
+        self._column_cache.move_to_end(key)
+        while len(self._column_cache) > DECIMATE_CACHE_SIZE:
+            self._column_cache.popitem(last=False)
+
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        """Vectorized y_function, NaN where a point can not be drawn
+
+        Charts override this with a calculation on the trace columns,
+        the default calls y_function for every point.
+        """
+        if y_function is None:
+            y_function = self.getYPosition
+        return np.array([y_function(d) for d in data], dtype=np.float64)
+
+    def visibleValues(self, quantity: Callable[[Trace], np.ndarray]) -> np.ndarray:
+        """quantity of the data and of the reference within the span
+
+        The traces cache the derived columns, so all charts showing
+        a snapshot share one calculation.
+        """
+        data = Trace.from_datapoints(self.data)
+        reference = Trace.from_datapoints(self.reference)
+        shown = (reference.freq >= self.fstart) & (reference.freq <= self.fstop)
+        return np.concatenate((quantity(data), quantity(reference)[shown]))
+
+    def _valuePositions(self, values: np.ndarray,
+                        max_value: float, span: float) -> np.ndarray:
+        """Vectorized linear mapping of values to y positions"""
+        with np.errstate(invalid="ignore", over="ignore"):
+            return self.topMargin + np.round(
+                (max_value - values) / span * self.dim.height)
+
+    def _isPlotable(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        with np.errstate(invalid="ignore"):
+            return ((x >= self.leftMargin) &
+                    (x <= self.leftMargin + self.dim.width) &
+                    (y >= self.topMargin) &
+                    (y <= self.topMargin + self.dim.height))
 
     def drawMarkers(self, qp, data=None, y_function=None):
+        if self._recording:
+            self._marker_calls.append((data, y_function))
+            return
         if data is None:
             data = self.data
-        if y_function is None:
-            y_function = self.getYPosition
         highlighter = QtGui.QPen(QtGui.QColor(20, 0, 255))
         highlighter.setWidth(1)
         for m in self.markers:
             if m.location != -1 and m.location < len(data):
                 x = self.getXPosition(data[m.location])
-                y = y_function(data[m.location])
+                y = self.getMarkerYPosition(data, m.location, y_function)
                 if self.isPlotable(x, y):
                     self.drawMarker(x, y, qp, m.color, self.markers.index(m)+1)
 
+    def getMarkerYPosition(self, data: List[Datapoint], index: int,
+                           y_function=None) -> int:
+        """y position of the marker at index of data"""
+        if y_function is None:
+            y_function = self.getYPosition
+        return y_function(data[index])
+
     def isPlotable(self, x, y):
         return y is not None and x is not None and \
                self.leftMargin <= x <= self.leftMargin + self.dim.width and \
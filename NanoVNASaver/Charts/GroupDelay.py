@@ -22,10 +22,11 @@ from typing import List
 
 import numpy as np
 
-from PyQt5 import QtGui
+from PyQt5 import QtWidgets, QtGui
 
 from NanoVNASaver.Charts.Chart import Chart
 from NanoVNASaver.RFTools import Datapoint
+from NanoVNASaver.SweepData import Trace
 from .Frequency import FrequencyChart
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,7 @@ logger = logging.getLogger(__name__)
 class GroupDelayChart(FrequencyChart):
     def __init__(self, name="", reflective=True):
         super().__init__(name)
+        self.flag.layered = False
 
         self.name_unit = "ns"
 
@@ -47,79 +49,66 @@ class GroupDelayChart(FrequencyChart):
 
         self.reflective = reflective
 
-        self.groupDelay = []
-        self.groupDelayReference = []
+        self._trace = Trace((), ())
+        self._reference_trace = Trace((), ())
+        self.groupDelay = np.zeros(0)
+        self.groupDelayReference = np.zeros(0)
 
         self.minDisplayValue = -180
         self.maxDisplayValue = 180
 
+        self.aperture = 2
+        self.y_menu.addSeparator()
+        self.action_set_aperture = QtWidgets.QAction(
+            f"Aperture ({self.aperture})")
+        self.action_set_aperture.triggered.connect(self.inputAperture)
+        self.y_menu.addAction(self.action_set_aperture)
+
     def copy(self):
         new_chart: GroupDelayChart = super().copy()
         new_chart.reflective = self.reflective
-        new_chart.groupDelay = self.groupDelay.copy()
-        new_chart.groupDelayReference = self.groupDelay.copy()
+        new_chart.setAperture(self.aperture)
+        new_chart.setData(self.data)
+        new_chart.setReference(self.reference)
         return new_chart
 
+    def setAperture(self, aperture: int):
+        self.aperture = max(1, aperture)
+        self.action_set_aperture.setText(f"Aperture ({self.aperture})")
+        self.calculateGroupDelay()
+
+    def inputAperture(self):
+        aperture, selected = QtWidgets.QInputDialog.getInt(
+            self, "Aperture",
+            "Set aperture (frequency steps)", value=self.aperture, min=1)
+        if not selected:
+            return
+        self.setAperture(aperture)
+
     def setReference(self, data):
         self.reference = data
-
-        self.calculateGroupDelay()
+        self._reference_trace = Trace.from_datapoints(data)
+        self.groupDelayReference = self.delays(self._reference_trace)
+        self.update()
 
     def setData(self, data):
         self.data = data
-
-        self.calculateGroupDelay()
+        self._trace = Trace.from_datapoints(data)
+        self.groupDelay = self.delays(self._trace)
+        self.update()
 
     def calculateGroupDelay(self):
-        rawData = []
-        for d in self.data:
-            rawData.append(d.phase)
-
-        rawReference = []
-        for d in self.reference:
-            rawReference.append(d.phase)
-
-        if len(self.data) > 1:
-            unwrappedData = np.degrees(np.unwrap(rawData))
-            self.groupDelay = []
-            for i in range(len(self.data)):
-                # TODO: Replace with call to RFTools.groupDelay
-                if i == 0:
-                    phase_change = unwrappedData[1] - unwrappedData[0]
-                    freq_change = self.data[1].freq - self.data[0].freq
-                elif i == len(self.data)-1:
-                    idx = len(self.data)-1
-                    phase_change = unwrappedData[idx] - unwrappedData[idx-1]
-                    freq_change = self.data[idx].freq - self.data[idx-1].freq
-                else:
-                    phase_change = unwrappedData[i+1] - unwrappedData[i-1]
-                    freq_change = self.data[i+1].freq - self.data[i-1].freq
-                delay = (-phase_change / (freq_change * 360)) * 10e8
-                if not self.reflective:
-                    delay /= 2
-                self.groupDelay.append(delay)
-
-        if len(self.reference) > 1:
-            unwrappedReference = np.degrees(np.unwrap(rawReference))
-            self.groupDelayReference = []
-            for i in range(len(self.reference)):
-                if i == 0:
-                    phase_change = unwrappedReference[1] - unwrappedReference[0]
-                    freq_change = self.reference[1].freq - self.reference[0].freq
-                elif i == len(self.reference)-1:
-                    idx = len(self.reference)-1
-                    phase_change = unwrappedReference[idx] - unwrappedReference[idx-1]
-                    freq_change = self.reference[idx].freq - self.reference[idx-1].freq
-                else:
-                    phase_change = unwrappedReference[i+1] - unwrappedReference[i-1]
-                    freq_change = self.reference[i+1].freq - self.reference[i-1].freq
-                delay = (-phase_change / (freq_change * 360)) * 10e8
-                if not self.reflective:
-                    delay /= 2
-                self.groupDelayReference.append(delay)
-
+        self.groupDelay = self.delays(self._trace)
+        self.groupDelayReference = self.delays(self._reference_trace)
         self.update()
 
+    def delays(self, data: Trace) -> np.ndarray:
+        """Group delay in ns, the traces cache it for all consumers"""
+        delay = data.groupDelay(self.aperture) * 1e9
+        if not self.reflective:
+            delay /= 2
+        return delay
+
     def drawValues(self, qp: QtGui.QPainter):
         if len(self.data) == 0 and len(self.reference) == 0:
             return
@@ -179,71 +168,39 @@ class GroupDelayChart(FrequencyChart):
 
         self.drawFrequencyTicks(qp)
 
-        color = Chart.color.sweep
-        pen = QtGui.QPen(color)
-        pen.setWidth(self.dim.point)
-        line_pen = QtGui.QPen(color)
-        line_pen.setWidth(self.dim.line)
-        qp.setPen(pen)
-        for i in range(len(self.data)):
-            x = self.getXPosition(self.data[i])
-            y = self.getYPositionFromDelay(self.groupDelay[i])
-            if self.isPlotable(x, y):
-                qp.drawPoint(int(x), int(y))
-            if self.flag.draw_lines and i > 0:
-                prevx = self.getXPosition(self.data[i - 1])
-                prevy = self.getYPositionFromDelay(self.groupDelay[i - 1])
-                qp.setPen(line_pen)
-                if self.isPlotable(x, y) and self.isPlotable(prevx, prevy):
-                    qp.drawLine(x, y, prevx, prevy)
-                elif self.isPlotable(x, y) and not self.isPlotable(prevx, prevy):
-                    new_x, new_y = self.getPlotable(x, y, prevx, prevy)
-                    qp.drawLine(x, y, new_x, new_y)
-                elif not self.isPlotable(x, y) and self.isPlotable(prevx, prevy):
-                    new_x, new_y = self.getPlotable(prevx, prevy, x, y)
-                    qp.drawLine(prevx, prevy, new_x, new_y)
-                qp.setPen(pen)
-
-        color = Chart.color.reference
-        pen = QtGui.QPen(color)
-        pen.setWidth(self.dim.point)
-        line_pen = QtGui.QPen(color)
-        line_pen.setWidth(self.dim.line)
-        qp.setPen(pen)
-        for i in range(len(self.reference)):
-            x = self.getXPosition(self.reference[i])
-            y = self.getYPositionFromDelay(self.groupDelayReference[i])
-            if self.isPlotable(x, y):
-                qp.drawPoint(int(x), int(y))
-            if self.flag.draw_lines and i > 0:
-                prevx = self.getXPosition(self.reference[i - 1])
-                prevy = self.getYPositionFromDelay(self.groupDelayReference[i - 1])
-                qp.setPen(line_pen)
-                if self.isPlotable(x, y) and self.isPlotable(prevx, prevy):
-                    qp.drawLine(x, y, prevx, prevy)
-                elif self.isPlotable(x, y) and not self.isPlotable(prevx, prevy):
-                    new_x, new_y = self.getPlotable(x, y, prevx, prevy)
-                    qp.drawLine(x, y, new_x, new_y)
-                elif not self.isPlotable(x, y) and self.isPlotable(prevx, prevy):
-                    new_x, new_y = self.getPlotable(prevx, prevy, x, y)
-                    qp.drawLine(prevx, prevy, new_x, new_y)
-                qp.setPen(pen)
-
+        self.drawData(qp, self.data, Chart.color.sweep)
+        self.drawData(qp, self.reference, Chart.color.reference)
         self.drawMarkers(qp)
 
     def getYPosition(self, d: Datapoint) -> int:
-        # TODO: Find a faster way than these expensive "d in self.data" lookups
-        if d in self.data:
-            delay = self.groupDelay[self.data.index(d)]
-        elif d in self.reference:
-            delay = self.groupDelayReference[self.reference.index(d)]
-        else:
-            delay = 0
-        return self.getYPositionFromDelay(delay)
+        for trace, delays in ((self._trace, self.groupDelay),
+                              (self._reference_trace,
+                               self.groupDelayReference)):
+            index = int(np.searchsorted(trace.freq, d.freq))
+            if index < len(trace) and trace[index] == d:
+                return self.getYPositionFromDelay(delays[index])
+        return self.getYPositionFromDelay(0)
+
+    def getMarkerYPosition(self, data: List[Datapoint], index: int,
+                           y_function=None) -> int:
+        if y_function is None and data is self.data:
+            return self.getYPositionFromDelay(self.groupDelay[index])
+        return super().getMarkerYPosition(data, index, y_function)
 
     def getYPositionFromDelay(self, delay: float):
         return self.topMargin + round((self.maxDelay - delay) / self.span * self.dim.height)
 
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        if y_function is not None:
+            return super().getYPositions(data, y_function)
+        if data is self._trace:
+            delays = self.groupDelay
+        elif data is self._reference_trace:
+            delays = self.groupDelayReference
+        else:
+            delays = self.delays(data)
+        return self._valuePositions(delays, self.maxDelay, self.span)
+
     def valueAtPosition(self, y) -> List[float]:
         absy = y - self.topMargin
         val = -1 * ((absy / self.dim.height * self.span) - self.maxDelay)
@@ -18,14 +18,16 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import math
 import logging
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
 from PyQt5 import QtWidgets, QtGui
 
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.SITools import Format, Value
 from NanoVNASaver.Charts.Chart import Chart
-from NanoVNASaver.Charts.Frequency import FrequencyChart
+from NanoVNASaver.Charts.Frequency import FrequencyChart, value_range
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
@@ -87,31 +89,9 @@ class InductanceChart(FrequencyChart):
         if self.bands.enabled:
             self.drawBands(qp, fstart, fstop)
 
-        if self.fixedValues:
-            maxValue = self.maxDisplayValue / 10e11
-            minValue = self.minDisplayValue / 10e11
-            self.maxValue = maxValue
-            self.minValue = minValue
-        else:
-            # Find scaling
-            minValue = 1
-            maxValue = -1
-            for d in self.data:
-                val = d.inductiveEquivalent()
-                if val > maxValue:
-                    maxValue = val
-                if val < minValue:
-                    minValue = val
-            for d in self.reference:  # Also check min/max for the reference sweep
-                if d.freq < self.fstart or d.freq > self.fstop:
-                    continue
-                val = d.inductiveEquivalent()
-                if val > maxValue:
-                    maxValue = val
-                if val < minValue:
-                    minValue = val
-            self.maxValue = maxValue
-            self.minValue = minValue
+        minValue, maxValue = self._find_scaling()
+        self.maxValue = maxValue
+        self.minValue = minValue
 
         span = maxValue - minValue
         if span == 0:
@@ -143,11 +123,24 @@ class InductanceChart(FrequencyChart):
         self.drawData(qp, self.reference, Chart.color.reference)
         self.drawMarkers(qp)
 
+    def _find_scaling(self) -> Tuple[float, float]:
+        if self.fixedValues:
+            return super()._find_scaling()
+        # also check min/max for the reference sweep
+        return value_range(
+            self.visibleValues(lambda trace: trace.inductiveEquivalent()), 1, -1)
+
     def getYPosition(self, d: Datapoint) -> int:
         return (self.topMargin +
                 round((self.maxValue - d.inductiveEquivalent()) /
                       self.span * self.dim.height))
 
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        if y_function is not None:
+            return super().getYPositions(data, y_function)
+        return self._valuePositions(
+            data.inductiveEquivalent(), self.maxValue, self.span)
+
     def valueAtPosition(self, y) -> List[float]:
         absy = y - self.topMargin
         val = -1 * ((absy / self.dim.height * self.span) - self.maxValue)
@@ -18,13 +18,15 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import math
 import logging
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
 from PyQt5 import QtGui
 
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.Charts.Chart import Chart
-from NanoVNASaver.Charts.Frequency import FrequencyChart
+from NanoVNASaver.Charts.Frequency import FrequencyChart, value_range
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
@@ -54,38 +56,9 @@ class LogMagChart(FrequencyChart):
         if self.bands.enabled:
             self.drawBands(qp, self.fstart, self.fstop)
 
-        if self.fixedValues:
-            maxValue = self.maxDisplayValue
-            minValue = self.minDisplayValue
-            self.maxValue = maxValue
-            self.minValue = minValue
-        else:
-            # Find scaling
-            minValue = 100
-            maxValue = -100
-            for d in self.data:
-                logmag = self.logMag(d)
-                if math.isinf(logmag):
-                    continue
-                if logmag > maxValue:
-                    maxValue = logmag
-                if logmag < minValue:
-                    minValue = logmag
-            for d in self.reference:  # Also check min/max for the reference sweep
-                if d.freq < self.fstart or d.freq > self.fstop:
-                    continue
-                logmag = self.logMag(d)
-                if math.isinf(logmag):
-                    continue
-                if logmag > maxValue:
-                    maxValue = logmag
-                if logmag < minValue:
-                    minValue = logmag
-
-            minValue = 10*math.floor(minValue/10)
-            self.minValue = minValue
-            maxValue = 10*math.ceil(maxValue/10)
-            self.maxValue = maxValue
+        minValue, maxValue = self._find_scaling()
+        self.minValue = minValue
+        self.maxValue = maxValue
 
         span = maxValue-minValue
         if span == 0:
@@ -171,12 +144,34 @@ class LogMagChart(FrequencyChart):
         self.drawData(qp, self.reference, Chart.color.reference)
         self.drawMarkers(qp)
 
+    def _axisState(self) -> tuple:
+        return super()._axisState() + (self.isInverted,)
+
+    def _find_scaling(self) -> Tuple[float, float]:
+        if self.fixedValues:
+            return self.minDisplayValue, self.maxDisplayValue
+        # also check min/max for the reference sweep
+        logmag = self.visibleValues(lambda trace: trace.gain)
+        if self.isInverted:
+            logmag = -logmag
+        min_value, max_value = value_range(
+            logmag[~np.isinf(logmag)], 100, -100)
+        return 10*math.floor(min_value/10), 10*math.ceil(max_value/10)
+
     def getYPosition(self, d: Datapoint) -> int:
         logMag = self.logMag(d)
         if math.isinf(logMag):
             return None
         return self.topMargin + round((self.maxValue - logMag) / self.span * self.dim.height)
 
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        if y_function is not None:
+            return super().getYPositions(data, y_function)
+        gain = -data.gain if self.isInverted else data.gain
+        y = self._valuePositions(gain, self.maxValue, self.span)
+        y[np.isinf(gain)] = np.nan
+        return y
+
     def valueAtPosition(self, y) -> List[float]:
         absy = y - self.topMargin
         val = -1 * ((absy / self.dim.height * self.span) - self.maxValue)
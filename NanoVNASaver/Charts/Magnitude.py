@@ -18,13 +18,15 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import math
 import logging
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
 from PyQt5 import QtGui
 
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.Charts.Chart import Chart
-from NanoVNASaver.Charts.Frequency import FrequencyChart
+from NanoVNASaver.Charts.Frequency import FrequencyChart, value_range
+from NanoVNASaver.SweepData import Trace
 logger = logging.getLogger(__name__)
 
 
@@ -53,34 +55,9 @@ class MagnitudeChart(FrequencyChart):
         if self.bands.enabled:
             self.drawBands(qp, self.fstart, self.fstop)
 
-        if self.fixedValues:
-            maxValue = self.maxDisplayValue
-            minValue = self.minDisplayValue
-            self.maxValue = maxValue
-            self.minValue = minValue
-        else:
-            # Find scaling
-            minValue = 100
-            maxValue = 0
-            for d in self.data:
-                mag = self.magnitude(d)
-                if mag > maxValue:
-                    maxValue = mag
-                if mag < minValue:
-                    minValue = mag
-            for d in self.reference:  # Also check min/max for the reference sweep
-                if d.freq < self.fstart or d.freq > self.fstop:
-                    continue
-                mag = self.magnitude(d)
-                if mag > maxValue:
-                    maxValue = mag
-                if mag < minValue:
-                    minValue = mag
-
-            minValue = 10*math.floor(minValue/10)
-            self.minValue = minValue
-            maxValue = 10*math.ceil(maxValue/10)
-            self.maxValue = maxValue
+        minValue, maxValue = self._find_scaling()
+        self.minValue = minValue
+        self.maxValue = maxValue
 
         span = maxValue-minValue
         if span == 0:
@@ -124,10 +101,23 @@ class MagnitudeChart(FrequencyChart):
         self.drawData(qp, self.reference, Chart.color.reference)
         self.drawMarkers(qp)
 
+    def _find_scaling(self) -> Tuple[float, float]:
+        if self.fixedValues:
+            return self.minDisplayValue, self.maxDisplayValue
+        # also check min/max for the reference sweep
+        min_value, max_value = value_range(
+            self.visibleValues(lambda trace: trace.mag), 100, 0)
+        return 10*math.floor(min_value/10), 10*math.ceil(max_value/10)
+
     def getYPosition(self, d: Datapoint) -> int:
         mag = self.magnitude(d)
         return self.topMargin + round((self.maxValue - mag) / self.span * self.dim.height)
 
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        if y_function is not None:
+            return super().getYPositions(data, y_function)
+        return self._valuePositions(data.mag, self.maxValue, self.span)
+
     def valueAtPosition(self, y) -> List[float]:
         absy = y - self.topMargin
         val = -1 * ((absy / self.dim.height * self.span) - self.maxValue)
@@ -18,15 +18,17 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import math
 import logging
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
 from PyQt5 import QtGui
 
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.SITools import Format, Value
 from NanoVNASaver.Charts.Chart import Chart
-from NanoVNASaver.Charts.Frequency import FrequencyChart
+from NanoVNASaver.Charts.Frequency import FrequencyChart, value_range
 from NanoVNASaver.Charts.LogMag import LogMagChart
+from NanoVNASaver.SweepData import Trace
 
 
 logger = logging.getLogger(__name__)
@@ -53,45 +55,13 @@ class MagnitudeZChart(FrequencyChart):
         if self.bands.enabled:
             self.drawBands(qp, self.fstart, self.fstop)
 
-        if self.fixedValues:
-            maxValue = self.maxDisplayValue
-            minValue = self.minDisplayValue
-            self.maxValue = maxValue
-            if self.logarithmicY and minValue <= 0:
-                self.minValue = 0.01
-            else:
-                self.minValue = minValue
+        minValue, maxValue = self._find_scaling()
+        self.maxValue = maxValue
+        if self.logarithmicY and minValue <= 0:
+            self.minValue = 0.01
         else:
-            # Find scaling
-            minValue = 100
-            maxValue = 0
-            for d in self.data:
-                mag = self.magnitude(d)
-                if math.isinf(mag): # Avoid infinite scales
-                    continue
-                if mag > maxValue:
-                    maxValue = mag
-                if mag < minValue:
-                    minValue = mag
-            for d in self.reference:  # Also check min/max for the reference sweep
-                if d.freq < self.fstart or d.freq > self.fstop:
-                    continue
-                mag = self.magnitude(d)
-                if math.isinf(mag): # Avoid infinite scales
-                    continue
-                if mag > maxValue:
-                    maxValue = mag
-                if mag < minValue:
-                    minValue = mag
-
-            minValue = 10*math.floor(minValue/10)
-            if self.logarithmicY and minValue <= 0:
-                minValue = 0.01
             self.minValue = minValue
 
-            maxValue = 10*math.ceil(maxValue/10)
-            self.maxValue = maxValue
-
         span = maxValue-minValue
         if span == 0:
             span = 0.01
@@ -119,6 +89,18 @@ class MagnitudeZChart(FrequencyChart):
         self.drawData(qp, self.reference, Chart.color.reference)
         self.drawMarkers(qp)
 
+    def _find_scaling(self) -> Tuple[float, float]:
+        if self.fixedValues:
+            return self.minDisplayValue, self.maxDisplayValue
+        # also check min/max for the reference sweep
+        mags = self.visibleValues(self.magnitudes)
+        min_value, max_value = value_range(
+            mags[~np.isinf(mags)], 100, 0)  # Avoid infinite scales
+        min_value = 10*math.floor(min_value/10)
+        if self.logarithmicY and min_value <= 0:
+            min_value = 0.01
+        return min_value, 10*math.ceil(max_value/10)
+
     def getYPosition(self, d: Datapoint) -> int:
         mag = self.magnitude(d)
         if self.logarithmicY and mag == 0:
@@ -131,6 +113,21 @@ class MagnitudeZChart(FrequencyChart):
             return self.topMargin + round((self.maxValue - mag) / self.span * self.dim.height)
         return self.topMargin
 
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        if y_function is not None:
+            return super().getYPositions(data, y_function)
+        mag = self.magnitudes(data)
+        if self.logarithmicY:
+            span = math.log(self.maxValue) - math.log(self.minValue)
+            with np.errstate(divide="ignore"):
+                y = self._valuePositions(
+                    np.log(mag), math.log(self.maxValue), span)
+            y[mag == 0] = self.topMargin - self.dim.height
+        else:
+            y = self._valuePositions(mag, self.maxValue, self.span)
+        y[~np.isfinite(mag)] = self.topMargin
+        return y
+
     def valueAtPosition(self, y) -> List[float]:
         absy = y - self.topMargin
         if self.logarithmicY:
@@ -144,6 +141,10 @@ class MagnitudeZChart(FrequencyChart):
     def magnitude(p: Datapoint) -> float:
         return abs(p.impedance())
 
+    @staticmethod
+    def magnitudes(data: Trace) -> np.ndarray:
+        return np.abs(data.impedance())
+
     def logarithmicYAllowed(self) -> bool:
         return True
 
@@ -19,7 +19,10 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
 
+import numpy as np
+
 from NanoVNASaver.RFTools import Datapoint
+from NanoVNASaver.SweepData import Trace
 from NanoVNASaver.Charts.MagnitudeZ import MagnitudeZChart
 
 
@@ -31,3 +34,7 @@ class MagnitudeZSeriesChart(MagnitudeZChart):
     @staticmethod
     def magnitude(p: Datapoint) -> float:
         return abs(p.seriesImpedance())
+
+    @staticmethod
+    def magnitudes(data: Trace) -> np.ndarray:
+        return np.abs(data.seriesImpedance())
@@ -19,7 +19,10 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
 
+import numpy as np
+
 from NanoVNASaver.RFTools import Datapoint
+from NanoVNASaver.SweepData import Trace
 from .MagnitudeZ import MagnitudeZChart
 
 logger = logging.getLogger(__name__)
@@ -30,3 +33,7 @@ class MagnitudeZShuntChart(MagnitudeZChart):
     @staticmethod
     def magnitude(p: Datapoint) -> float:
         return abs(p.shuntImpedance())
+
+    @staticmethod
+    def magnitudes(data: Trace) -> np.ndarray:
+        return np.abs(data.shuntImpedance())
@@ -20,19 +20,21 @@ import math
 import logging
 from typing import List
 
+import numpy as np
 from PyQt5 import QtGui
 
 from NanoVNASaver.Marker import Marker
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.SITools import Format, Value
 from NanoVNASaver.Charts.Chart import Chart
-from NanoVNASaver.Charts.Frequency import FrequencyChart
+from NanoVNASaver.Charts.Frequency import FrequencyChart, value_range
 logger = logging.getLogger(__name__)
 
 
 class PermeabilityChart(FrequencyChart):
     def __init__(self, name=""):
         super().__init__(name)
+        self.flag.layered = False
         self.leftMargin = 40
         self.rightMargin = 30
         self.dim.width = 230
@@ -83,36 +85,13 @@ class PermeabilityChart(FrequencyChart):
             min_val = self.minDisplayValue
             max_val = self.maxDisplayValue
         else:
-            min_val = 1000
-            max_val = -1000
-            for d in self.data:
-                imp = d.impedance()
-                re, im = imp.real, imp.imag
-                re = re * 10e6 / d.freq
-                im = im * 10e6 / d.freq
-                if re > max_val:
-                    max_val = re
-                if re < min_val:
-                    min_val = re
-                if im > max_val:
-                    max_val = im
-                if im < min_val:
-                    min_val = im
-            for d in self.reference:  # Also check min/max for the reference sweep
-                if d.freq < self.fstart or d.freq > self.fstop:
-                    continue
-                imp = d.impedance()
-                re, im = imp.real, imp.imag
-                re = re * 10e6 / d.freq
-                im = im * 10e6 / d.freq
-                if re > max_val:
-                    max_val = re
-                if re < min_val:
-                    min_val = re
-                if im > max_val:
-                    max_val = im
-                if im < min_val:
-                    min_val = im
+            # Also check min/max for the reference sweep
+            imp = self.visibleValues(lambda trace: trace.impedance())
+            freq = self.visibleValues(lambda trace: trace.freq)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values = np.concatenate((imp.real * 10e6 / freq,
+                                         imp.imag * 10e6 / freq))
+            min_val, max_val = value_range(values, 1000, -1000)
 
         if self.logarithmicY:
             min_val = max(0.01, min_val)
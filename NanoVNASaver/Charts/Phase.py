@@ -19,7 +19,7 @@
 import math
 import logging
 
-from typing import List
+from typing import List, Tuple
 import numpy as np
 
 from PyQt5 import QtWidgets, QtGui
@@ -27,6 +27,7 @@ from PyQt5 import QtWidgets, QtGui
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.Charts.Chart import Chart
 from NanoVNASaver.Charts.Frequency import FrequencyChart
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +61,8 @@ class PhaseChart(FrequencyChart):
 
     def setUnwrap(self, unwrap: bool):
         self.unwrap = unwrap
+        # unwrapping changes the points after an updated one too
+        self.flag.layered = not unwrap
         self.update()
 
     def drawValues(self, qp: QtGui.QPainter):
@@ -78,18 +81,7 @@ class PhaseChart(FrequencyChart):
             self.unwrappedData = np.degrees(np.unwrap(rawData))
             self.unwrappedReference = np.degrees(np.unwrap(rawReference))
 
-        if self.fixedValues:
-            minAngle = self.minDisplayValue
-            maxAngle = self.maxDisplayValue
-        elif self.unwrap and self.data:
-            minAngle = math.floor(np.min(self.unwrappedData))
-            maxAngle = math.ceil(np.max(self.unwrappedData))
-        elif self.unwrap and self.reference:
-            minAngle = math.floor(np.min(self.unwrappedReference))
-            maxAngle = math.ceil(np.max(self.unwrappedReference))
-        else:
-            minAngle = -180
-            maxAngle = 180
+        minAngle, maxAngle = self._find_scaling()
 
         span = maxAngle - minAngle
         if span == 0:
@@ -135,6 +127,17 @@ class PhaseChart(FrequencyChart):
         self.drawData(qp, self.reference, Chart.color.reference)
         self.drawMarkers(qp)
 
+    def _find_scaling(self) -> Tuple[float, float]:
+        if self.fixedValues:
+            return self.minDisplayValue, self.maxDisplayValue
+        if self.unwrap and self.data:
+            return (math.floor(np.min(self.unwrappedData)),
+                    math.ceil(np.max(self.unwrappedData)))
+        if self.unwrap and self.reference:
+            return (math.floor(np.min(self.unwrappedReference)),
+                    math.ceil(np.max(self.unwrappedReference)))
+        return -180, 180
+
     def getYPosition(self, d: Datapoint) -> int:
         if self.unwrap:
             if d in self.data:
@@ -147,6 +150,12 @@ class PhaseChart(FrequencyChart):
             angle = math.degrees(d.phase)
         return self.topMargin + round((self.maxAngle - angle) / self.span * self.dim.height)
 
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        if y_function is not None or self.unwrap:
+            return super().getYPositions(data, y_function)
+        return self._valuePositions(
+            np.degrees(data.phase), self.maxAngle, self.span)
+
     def valueAtPosition(self, y) -> List[float]:
         absy = y - self.topMargin
         val = -1 * ((absy / self.dim.height * self.span) - self.maxAngle)
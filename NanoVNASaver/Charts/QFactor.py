@@ -18,13 +18,15 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import math
 import logging
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
 from PyQt5 import QtGui
 
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.Charts.Chart import Chart
-from NanoVNASaver.Charts.Frequency import FrequencyChart
+from NanoVNASaver.Charts.Frequency import FrequencyChart, value_range
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
@@ -46,21 +48,7 @@ class QualityFactorChart(FrequencyChart):
     def drawChart(self, qp: QtGui.QPainter):
         super().drawChart(qp)
 
-        # Make up some sensible scaling here
-        if self.fixedValues:
-            maxQ = self.maxDisplayValue
-            minQ = self.minDisplayValue
-        else:
-            minQ = 0
-            maxQ = 0
-            for d in self.data:
-                Q = d.qFactor()
-                if Q > maxQ:
-                    maxQ = Q
-            scale = 0
-            if maxQ > 0:
-                scale = max(scale, math.floor(math.log10(maxQ)))
-                maxQ = math.ceil(maxQ / 10 ** scale) * 10 ** scale
+        minQ, maxQ = self._find_scaling()
         self.minQ = minQ
         self.maxQ = maxQ
         self.span = self.maxQ - self.minQ
@@ -117,10 +105,26 @@ class QualityFactorChart(FrequencyChart):
         self.drawData(qp, self.reference, Chart.color.reference)
         self.drawMarkers(qp)
 
+    def _find_scaling(self) -> Tuple[float, float]:
+        # Make up some sensible scaling here
+        if self.fixedValues:
+            return self.minDisplayValue, self.maxDisplayValue
+        _, maxQ = value_range(
+            Trace.from_datapoints(self.data).qFactor(), 0, 0)
+        if maxQ > 0:
+            scale = max(0, math.floor(math.log10(maxQ)))
+            maxQ = math.ceil(maxQ / 10 ** scale) * 10 ** scale
+        return 0, maxQ
+
     def getYPosition(self, d: Datapoint) -> int:
         Q = d.qFactor()
         return self.topMargin + round((self.maxQ - Q) / self.span * self.dim.height)
 
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        if y_function is not None:
+            return super().getYPositions(data, y_function)
+        return self._valuePositions(data.qFactor(), self.maxQ, self.span)
+
     def valueAtPosition(self, y) -> List[float]:
         absy = y - self.topMargin
         val = -1 * ((absy / self.dim.height * self.span) - self.maxQ)
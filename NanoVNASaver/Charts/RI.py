@@ -20,6 +20,7 @@ import math
 import logging
 from typing import List
 
+import numpy as np
 from PyQt5 import QtWidgets, QtGui
 
 from NanoVNASaver.Formatting import format_frequency_chart
@@ -28,7 +29,8 @@ from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.SITools import Format, Value
 
 from NanoVNASaver.Charts.Chart import Chart
-from NanoVNASaver.Charts.Frequency import FrequencyChart
+from NanoVNASaver.Charts.Frequency import FrequencyChart, value_range
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +38,7 @@ logger = logging.getLogger(__name__)
 class RealImaginaryChart(FrequencyChart):
     def __init__(self, name=""):
         super().__init__(name)
+        self.flag.layered = False
         self.leftMargin = 45
         self.rightMargin = 45
         self.dim.width = 230
@@ -149,38 +152,11 @@ class RealImaginaryChart(FrequencyChart):
             min_imag = self.minDisplayImag
             max_imag = self.maxDisplayImag
         else:
-            min_real = 1000
-            min_imag = 1000
-            max_real = 0
-            max_imag = -1000
-            for d in self.data:
-                imp = self.impedance(d)
-                re, im = imp.real, imp.imag
-                if math.isinf(re): # Avoid infinite scales
-                    continue
-                if re > max_real:
-                    max_real = re
-                if re < min_real:
-                    min_real = re
-                if im > max_imag:
-                    max_imag = im
-                if im < min_imag:
-                    min_imag = im
-            for d in self.reference:  # Also check min/max for the reference sweep
-                if d.freq < self.fstart or d.freq > self.fstop:
-                    continue
-                imp = self.impedance(d)
-                re, im = imp.real, imp.imag
-                if math.isinf(re): # Avoid infinite scales
-                    continue
-                if re > max_real:
-                    max_real = re
-                if re < min_real:
-                    min_real = re
-                if im > max_imag:
-                    max_imag = im
-                if im < min_imag:
-                    min_imag = im
+            # Also check min/max for the reference sweep
+            imp = self.visibleValues(self.impedances)
+            imp = imp[~np.isinf(imp.real)]  # Avoid infinite scales
+            min_real, max_real = value_range(imp.real, 1000, 0)
+            min_imag, max_imag = value_range(imp.imag, 1000, -1000)
 
             # Always have at least 8 numbered horizontal lines
             max_real = max(8, math.ceil(max_real))
@@ -506,3 +482,6 @@ class RealImaginaryChart(FrequencyChart):
 
     def impedance(self, p: Datapoint) -> complex:
         return p.impedance()
+
+    def impedances(self, data: Trace) -> np.ndarray:
+        return data.impedance()
@@ -18,7 +18,10 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
 
+import numpy as np
+
 from NanoVNASaver.RFTools import Datapoint
+from NanoVNASaver.SweepData import Trace
 from .RI import RealImaginaryChart
 
 logger = logging.getLogger(__name__)
@@ -28,3 +31,6 @@ class RealImaginaryShuntChart(RealImaginaryChart):
 
     def impedance(self, p: Datapoint) -> complex:
         return p.shuntImpedance()
+
+    def impedances(self, data: Trace) -> np.ndarray:
+        return data.shuntImpedance()
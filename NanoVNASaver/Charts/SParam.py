@@ -18,14 +18,16 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import math
 import logging
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
 from PyQt5 import QtGui
 
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.Charts.Chart import Chart
 from NanoVNASaver.Charts.Frequency import FrequencyChart
 from NanoVNASaver.Charts.LogMag import LogMagChart
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
@@ -68,36 +70,9 @@ class SParameterChart(FrequencyChart):
         if self.bands.enabled:
             self.drawBands(qp, self.fstart, self.fstop)
 
-        if self.fixedValues:
-            maxValue = self.maxDisplayValue
-            minValue = self.minDisplayValue
-            self.maxValue = maxValue
-            self.minValue = minValue
-        else:
-            # Find scaling
-            minValue = -1
-            maxValue = 1
-            self.maxValue = maxValue
-            self.minValue = minValue
-            # for d in self.data:
-            #     val = d.re
-            #     if val > maxValue:
-            #         maxValue = val
-            #     if val < minValue:
-            #         minValue = val
-            # for d in self.reference:  # Also check min/max for the reference sweep
-            #     if d.freq < self.fstart or d.freq > self.fstop:
-            #         continue
-            #     logmag = self.logMag(d)
-            #     if logmag > maxValue:
-            #         maxValue = logmag
-            #     if logmag < minValue:
-            #         minValue = logmag
-
-            # minValue = 10*math.floor(minValue/10)
-            # self.minValue = minValue
-            # maxValue = 10*math.ceil(maxValue/10)
-            # self.maxValue = maxValue
+        minValue, maxValue = self._find_scaling()
+        self.maxValue = maxValue
+        self.minValue = minValue
 
         span = maxValue-minValue
         if span == 0:
@@ -131,6 +106,11 @@ class SParameterChart(FrequencyChart):
         self.drawMarkers(qp, y_function=self.getReYPosition)
         self.drawMarkers(qp, y_function=self.getImYPosition)
 
+    def _find_scaling(self) -> Tuple[float, float]:
+        if self.fixedValues:
+            return self.minDisplayValue, self.maxDisplayValue
+        return -1, 1
+
     def getYPosition(self, d: Datapoint) -> int:
         return self.topMargin + round((self.maxValue - d.re) / self.span * self.dim.height)
 
@@ -140,6 +120,13 @@ class SParameterChart(FrequencyChart):
     def getImYPosition(self, d: Datapoint) -> int:
         return self.topMargin + round((self.maxValue - d.im) / self.span * self.dim.height)
 
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        if y_function == self.getImYPosition:
+            return self._valuePositions(data.im, self.maxValue, self.span)
+        if y_function in (None, self.getYPosition, self.getReYPosition):
+            return self._valuePositions(data.re, self.maxValue, self.span)
+        return super().getYPositions(data, y_function)
+
     def valueAtPosition(self, y) -> List[float]:
         absy = y - self.topMargin
         val = -1 * ((absy / self.dim.height * self.span) - self.maxValue)
@@ -16,14 +16,15 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
-import math
 import logging
 
+import numpy as np
 from PyQt5 import QtGui, QtCore
 
 from NanoVNASaver.RFTools import Datapoint
-from NanoVNASaver.Charts.Chart import Chart
+from NanoVNASaver.Charts.Chart import Chart, polygon
 from NanoVNASaver.Charts.Square import SquareChart
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
@@ -40,13 +41,35 @@ class SmithChart(SquareChart):
         self.setPalette(pal)
         self.setAutoFillBackground(True)
 
+        self._grid = None
+        self._grid_key = None
+
     def paintEvent(self, _: QtGui.QPaintEvent) -> None:
         qp = QtGui.QPainter(self)
-        # qp.begin(self)  # Apparently not needed?
-        self.drawSmithChart(qp)
+        qp.drawPixmap(0, 0, self.gridPixmap())
         self.drawValues(qp)
         qp.end()
 
+    def gridPixmap(self) -> QtGui.QPixmap:
+        """Returns the grid, rendered once per size, colors and labels"""
+        key = (self.size(), self.devicePixelRatioF(),
+               self.dim.width, self.dim.height, self.font().key(),
+               self.name, self.sweepTitle, tuple(sorted(self.swrMarkers)),
+               tuple(color.rgba() for color in (
+                   Chart.color.background, Chart.color.foreground,
+                   Chart.color.text, Chart.color.swr)))
+        if key != self._grid_key:
+            ratio = self.devicePixelRatioF()
+            self._grid = QtGui.QPixmap(self.size() * ratio)
+            self._grid.setDevicePixelRatio(ratio)
+            self._grid.fill(Chart.color.background)
+            qp = QtGui.QPainter(self._grid)
+            qp.setFont(self.font())
+            self.drawSmithChart(qp)
+            qp.end()
+            self._grid_key = key
+        return self._grid
+
     def drawSmithChart(self, qp: QtGui.QPainter):
         centerX = int(self.width()/2)
         centerY = int(self.height()/2)
@@ -119,45 +142,12 @@ class SmithChart(SquareChart):
     def drawValues(self, qp: QtGui.QPainter):
         if len(self.data) == 0 and len(self.reference) == 0:
             return
-        pen = QtGui.QPen(Chart.color.sweep)
-        pen.setWidth(self.dim.point)
-        line_pen = QtGui.QPen(Chart.color.sweep)
-        line_pen.setWidth(self.dim.line)
-        highlighter = QtGui.QPen(QtGui.QColor(20, 0, 255))
-        highlighter.setWidth(1)
-        qp.setPen(pen)
-        for i in range(len(self.data)):
-            x = self.getXPosition(self.data[i])
-            y = int(self.height()/2 + self.data[i].im * -1 * self.dim.height/2)
-            qp.drawPoint(x, y)
-            if self.flag.draw_lines and i > 0:
-                prevx = self.getXPosition(self.data[i-1])
-                prevy = int(self.height() / 2 + self.data[i-1].im * -1 * self.dim.height / 2)
-                qp.setPen(line_pen)
-                qp.drawLine(x, y, prevx, prevy)
-                qp.setPen(pen)
-        pen.setColor(Chart.color.reference)
-        line_pen.setColor(Chart.color.reference)
-        qp.setPen(pen)
-        if len(self.data) > 0:
-            fstart = self.data[0].freq
-            fstop = self.data[len(self.data)-1].freq
-        else:
-            fstart = self.reference[0].freq
-            fstop = self.reference[len(self.reference)-1].freq
-        for i in range(len(self.reference)):
-            data = self.reference[i]
-            if data.freq < fstart or data.freq > fstop:
-                continue
-            x = self.getXPosition(data)
-            y = int(self.height()/2 + data.im * -1 * self.dim.height/2)
-            qp.drawPoint(x, y)
-            if self.flag.draw_lines and i > 0:
-                prevx = self.getXPosition(self.reference[i-1])
-                prevy = int(self.height() / 2 + self.reference[i-1].im * -1 * self.dim.height / 2)
-                qp.setPen(line_pen)
-                qp.drawLine(x, y, prevx, prevy)
-                qp.setPen(pen)
+        data = Trace.from_datapoints(self.data)
+        reference = Trace.from_datapoints(self.reference)
+        self._drawTrace(qp, data, Chart.color.sweep)
+        fstart, fstop = (data if data else reference).freq[[0, -1]]
+        self._drawTrace(qp, reference, Chart.color.reference,
+                        (reference.freq >= fstart) & (reference.freq <= fstop))
         # Now draw the markers
         for m in self.markers:
             if m.location != -1:
@@ -171,6 +161,36 @@ class SmithChart(SquareChart):
     def getYPosition(self, d: Datapoint) -> int:
         return int(self.height()/2 + d.im * -1 * self.dim.height/2)
 
+    def getXPositions(self, data: Trace) -> np.ndarray:
+        return np.trunc(self.width()/2 + data.re * self.dim.width/2)
+
+    def getYPositions(self, data: Trace) -> np.ndarray:
+        return np.trunc(self.height()/2 + data.im * -1 * self.dim.height/2)
+
+    def _drawTrace(self, qp: QtGui.QPainter, data: Trace,
+                   color: QtGui.QColor, shown: np.ndarray = None):
+        """Draws the points selected by shown, joined to their predecessor"""
+        if len(data) == 0:
+            return
+        if shown is None:
+            shown = np.ones(len(data), dtype=bool)
+        x = self.getXPositions(data)
+        y = self.getYPositions(data)
+        if self.flag.draw_lines:
+            line_pen = QtGui.QPen(color)
+            line_pen.setWidth(self.dim.line)
+            qp.setPen(line_pen)
+            edges = np.flatnonzero(np.diff(np.concatenate(
+                ([0], shown.view(np.int8), [0]))))
+            for start, stop in edges.reshape(-1, 2):
+                start = max(start - 1, 0)
+                if stop - start > 1:
+                    qp.drawPolyline(polygon(x[start:stop], y[start:stop]))
+        pen = QtGui.QPen(color)
+        pen.setWidth(self.dim.point)
+        qp.setPen(pen)
+        qp.drawPoints(polygon(x[shown], y[shown]))
+
     def heightForWidth(self, a0: int) -> int:
         return a0
 
@@ -192,13 +212,10 @@ class SmithChart(SquareChart):
             target = self.data
         else:
             target = self.reference
-        positions = []
-        for d in target:
-            thisx = self.width() / 2 + d.re * self.dim.width / 2
-            thisy = self.height() / 2 + d.im * -1 * self.dim.height / 2
-            positions.append(math.sqrt((x - thisx)**2 + (y - thisy)**2))
-
-        minimum_position = positions.index(min(positions))
+        points = Trace.from_datapoints(target)
+        minimum_position = int(np.argmin(np.hypot(
+            x - (self.width() / 2 + points.re * self.dim.width / 2),
+            y - (self.height() / 2 + points.im * -1 * self.dim.height / 2))))
         m = self.getActiveMarker()
         if m is not None:
             m.setFrequency(str(round(target[minimum_position].freq)))
@@ -18,13 +18,15 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import math
 import logging
-from typing import List
+from typing import List, Tuple
 
+import numpy as np
 from PyQt5 import QtGui
 
 from NanoVNASaver.RFTools import Datapoint
 from NanoVNASaver.Charts.Chart import Chart
-from NanoVNASaver.Charts.Frequency import FrequencyChart
+from NanoVNASaver.Charts.Frequency import FrequencyChart, value_range
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
@@ -62,18 +64,7 @@ class VSWRChart(FrequencyChart):
         if self.bands.enabled:
             self.drawBands(qp, fstart, fstop)
 
-        # Find scaling
-        if self.fixedValues:
-            minVSWR = max(1, self.minDisplayValue)
-            maxVSWR = self.maxDisplayValue
-        else:
-            minVSWR = 1
-            maxVSWR = 3
-            for d in self.data:
-                vswr = d.vswr
-                if vswr > maxVSWR:
-                    maxVSWR = vswr
-            maxVSWR = min(self.maxDisplayValue, math.ceil(maxVSWR))
+        minVSWR, maxVSWR = self._find_scaling()
         self.maxVSWR = maxVSWR
         span = maxVSWR-minVSWR
         if span == 0:
@@ -142,6 +133,13 @@ class VSWRChart(FrequencyChart):
         self.drawData(qp, self.reference, Chart.color.reference)
         self.drawMarkers(qp)
 
+    def _find_scaling(self) -> Tuple[float, float]:
+        if self.fixedValues:
+            return max(1, self.minDisplayValue), self.maxDisplayValue
+        _, maxVSWR = value_range(
+            Trace.from_datapoints(self.data).vswr, 1, 3)
+        return 1, min(self.maxDisplayValue, math.ceil(maxVSWR))
+
     def getYPositionFromValue(self, vswr) -> int:
         if self.logarithmicY:
             min_val = self.maxVSWR - self.span
@@ -157,6 +155,22 @@ class VSWRChart(FrequencyChart):
     def getYPosition(self, d: Datapoint) -> int:
         return self.getYPositionFromValue(d.vswr)
 
+    def getYPositions(self, data: Trace, y_function=None) -> np.ndarray:
+        if y_function is not None:
+            return super().getYPositions(data, y_function)
+        vswr = data.vswr
+        if not self.logarithmicY:
+            return self._valuePositions(vswr, self.maxVSWR, self.span)
+        min_val = self.maxVSWR - self.span
+        if self.maxVSWR <= 0 or min_val <= 0:
+            return np.full(len(vswr), -1.0)
+        span = math.log(self.maxVSWR) - math.log(min_val)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            y = self._valuePositions(
+                np.log(vswr), math.log(self.maxVSWR), span)
+        y[vswr <= 0] = -1
+        return y
+
     def valueAtPosition(self, y) -> List[float]:
         absy = y - self.topMargin
         if self.logarithmicY:
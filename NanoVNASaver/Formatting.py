@@ -43,25 +43,25 @@ FMT_PARSE = SITools.Format(parse_sloppy_unit=True, parse_sloppy_kilo=True,
 FMT_PARSE_VALUE = SITools.Format(parse_sloppy_unit=True, parse_sloppy_kilo=True)
 
 def format_frequency(freq: Number) -> str:
-    return str(SITools.Value(freq, "Hz", FMT_FREQ))
+    return SITools.format_value(freq, "Hz", FMT_FREQ)
 
 
 def format_frequency_inputs(freq: float) -> str:
-    return str(SITools.Value(freq, "Hz", FMT_FREQ_INPUTS))
+    return SITools.format_value(freq, "Hz", FMT_FREQ_INPUTS)
 
 
 def format_frequency_short(freq: Number) -> str:
-    return str(SITools.Value(freq, "Hz", FMT_FREQ_SHORT))
+    return SITools.format_value(freq, "Hz", FMT_FREQ_SHORT)
 
 def format_frequency_chart(freq: Number) -> str:
-    return str(SITools.Value(freq, "", FMT_FREQ_SHORT))
+    return SITools.format_value(freq, "", FMT_FREQ_SHORT)
 
 def format_frequency_space(freq: float, fmt=FMT_FREQ_SPACE) -> str:
-    return str(SITools.Value(freq, "Hz", fmt))
+    return SITools.format_value(freq, "Hz", fmt)
 
 
 def format_frequency_sweep(freq: Number) -> str:
-    return str(SITools.Value(freq, "Hz", FMT_FREQ_SWEEP))
+    return SITools.format_value(freq, "Hz", FMT_FREQ_SWEEP)
 
 
 def format_gain(val: float, invert: bool = False) -> str:
@@ -73,7 +73,7 @@ def format_gain(val: float, invert: bool = False) -> str:
 def format_q_factor(val: float, allow_negative: bool = False) -> str:
     if (not allow_negative and val < 0) or abs(val > 10000.0):
         return "\N{INFINITY}"
-    return str(SITools.Value(val, fmt=FMT_Q_FACTOR))
+    return SITools.format_value(val, fmt=FMT_Q_FACTOR)
 
 
 def format_vswr(val: float) -> str:
@@ -87,23 +87,23 @@ def format_magnitude(val: float) -> str:
 def format_resistance(val: float, allow_negative: bool = False) -> str:
     if not allow_negative and val < 0:
         return "- \N{OHM SIGN}"
-    return str(SITools.Value(val, "\N{OHM SIGN}", FMT_REACT))
+    return SITools.format_value(val, "\N{OHM SIGN}", FMT_REACT)
 
 
 def format_capacitance(val: float, allow_negative: bool = True) -> str:
     if not allow_negative and val < 0:
         return "- pF"
-    return str(SITools.Value(val, "F", FMT_REACT))
+    return SITools.format_value(val, "F", FMT_REACT)
 
 
 def format_inductance(val: float, allow_negative: bool = True) -> str:
     if not allow_negative and val < 0:
         return "- nH"
-    return str(SITools.Value(val, "H", FMT_REACT))
+    return SITools.format_value(val, "H", FMT_REACT)
 
 
 def format_group_delay(val: float) -> str:
-    return str(SITools.Value(val, "s", FMT_GROUP_DELAY))
+    return SITools.format_value(val, "s", FMT_GROUP_DELAY)
 
 
 def format_phase(val: float) -> str:
@@ -118,23 +118,23 @@ def format_complex_adm(z: complex, allow_negative: bool = False) -> str:
     fmt_re = FMT_COMPLEX
     if allow_negative:
         fmt_re = FMT_COMPLEX_NEG
-    re = SITools.Value(adm.real, fmt=fmt_re)
-    im = SITools.Value(abs(adm.imag), fmt=FMT_COMPLEX)
+    re = SITools.format_value(adm.real, fmt=fmt_re)
+    im = SITools.format_value(abs(adm.imag), fmt=FMT_COMPLEX)
     return f"{re}{'-' if adm.imag < 0 else '+'}j{im} S"
 
 def format_complex_imp(z: complex, allow_negative: bool = False) -> str:
     fmt_re = FMT_COMPLEX
     if allow_negative:
         fmt_re = FMT_COMPLEX_NEG
-    re = SITools.Value(z.real, fmt=fmt_re)
-    im = SITools.Value(abs(z.imag), fmt=FMT_COMPLEX)
+    re = SITools.format_value(z.real, fmt=fmt_re)
+    im = SITools.format_value(abs(z.imag), fmt=FMT_COMPLEX)
     return f"{re}{'-' if z.imag < 0 else '+'}j{im} ""\N{OHM SIGN}"
 
 def format_wavelength(length: Number) -> str:
-    return str(SITools.Value(length, "m", FMT_WAVELENGTH))
+    return SITools.format_value(length, "m", FMT_WAVELENGTH)
 
 def format_y_axis(val: float, unit: str="") -> str:
-    return str(SITools.Value(val, unit, FMT_SHORT))
+    return SITools.format_value(val, unit, FMT_SHORT)
 
 def parse_frequency(freq: str) -> int:
     try:
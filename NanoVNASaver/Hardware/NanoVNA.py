@@ -24,12 +24,26 @@ import serial
 import numpy as np
 from PyQt5 import QtGui
 
-from NanoVNASaver.Hardware.Serial import drain_serial, Interface
-from NanoVNASaver.Hardware.VNA import VNA
+from NanoVNASaver.Hardware.Serial import Interface, PROMPT
+from NanoVNASaver.Hardware.VNA import VNA, WAIT, _max_retries
 from NanoVNASaver.Version import Version
 
 logger = logging.getLogger(__name__)
 
+# scan output mask bits
+SCAN_MASK_FREQ = 0b001
+SCAN_MASK_DATA0 = 0b010
+SCAN_MASK_DATA1 = 0b100
+SCAN_MASK_ALL = SCAN_MASK_FREQ | SCAN_MASK_DATA0 | SCAN_MASK_DATA1
+
+# binary scan output: header and one record per point for SCAN_MASK_ALL
+_SCAN_BIN_HEADER = struct.Struct("<HH")
+_SCAN_BIN_RECORD = np.dtype([
+    ("freq", "<u4"),
+    ("s11_real", "<f4"), ("s11_imag", "<f4"),
+    ("s21_real", "<f4"), ("s21_imag", "<f4"),
+])
+
 
 class NanoVNA(VNA):
     name = "NanoVNA"
@@ -44,6 +58,8 @@ class NanoVNA(VNA):
         self.start, self.stop = self._get_running_frequencies()
         self.sweep_max_freq_Hz = 300e6
         self._sweepdata = []
+        # set if the last scan has not been handed out yet
+        self._scan_unread = False
 
     def _get_running_frequencies(self):
 
@@ -60,7 +76,7 @@ class NanoVNA(VNA):
     def _capture_data(self) -> bytes:
         timeout = self.serial.timeout
         with self.serial.lock:
-            drain_serial(self.serial)
+            self.sync_serial()
             timeout = self.serial.timeout
             self.serial.write("capture\r".encode('ascii'))
             self.serial.readline()
@@ -117,6 +133,8 @@ class NanoVNA(VNA):
             logger.debug("Using scan mask command.")
             self.features.add("Scan mask command")
             self.sweep_method = "scan_mask"
+            if "Scan binary output" in self.features:
+                logger.debug("Using binary scan output.")
         elif self.version >= Version("0.2.0"):
             logger.debug("Using new scan command.")
             self.features.add("Scan command")
@@ -126,24 +144,78 @@ class NanoVNA(VNA):
         logger.debug("readFrequencies: %s", self.sweep_method)
         if self.sweep_method != "scan_mask":
             return super().readFrequencies()
-        return [int(line) for line in self.exec_command(
-            f"scan {self.start} {self.stop} {self.datapoints} 0b001")]
+        # read the values together with the frequencies
+        self._scan()
+        return self._sweepdata[0].tolist()
 
     def readValues(self, value) -> List[str]:
         if self.sweep_method != "scan_mask":
             return super().readValues(value)
+        return [f"{x.real} {x.imag}"
+                for x in self.readComplexValues(value).tolist()]
+
+    def readComplexValues(self, value) -> np.ndarray:
+        if self.sweep_method != "scan_mask":
+            return super().readComplexValues(value)
         logger.debug("readValue with scan mask (%s)", value)
-        # Actually grab the data only when requesting channel 0.
-        # The hardware will return all channels which we will store.
+        # The values are read with the frequencies, but a repeated
+        # request for channel 0 needs a new scan.
         if value == "data 0":
-            self._sweepdata = []
-            for line in self.exec_command(
-                    f"scan {self.start} {self.stop} {self.datapoints} 0b110"):
-                data = line.split()
-                self._sweepdata.append((
-                    f"{data[0]} {data[1]}",
-                    f"{data[2]} {data[3]}"))
-        if value == "data 0":
-            return [x[0] for x in self._sweepdata]
-        if value == "data 1":
-            return [x[1] for x in self._sweepdata]
+            if not self._scan_unread:
+                self._scan()
+            self._scan_unread = False
+            return self._sweepdata[1]
+        if value == "data 1" and self._sweepdata:
+            return self._sweepdata[2]
+        return np.zeros(0, dtype=complex)  # nothing scanned yet
+
+    def _scan(self):
+        """Reads frequencies and both channels in a single scan"""
+        if "Scan binary output" in self.features:
+            self._sweepdata = self._scan_binary()
+        else:
+            self._sweepdata = self._scan_text()
+        self._scan_unread = True
+
+    def _scan_text(self):
+        lines = list(self.exec_command(
+            f"scan {self.start} {self.stop} {self.datapoints}"
+            f" {SCAN_MASK_ALL:#05b}"))
+        values = np.array([line.split() for line in lines],
+                          dtype=np.float64).reshape(-1, 5)
+        return (values[:, 0].astype(np.int64),
+                values[:, 1] + 1j * values[:, 2],
+                values[:, 3] + 1j * values[:, 4])
+
+    def _scan_binary(self):
+        command = (f"scan_bin {self.start} {self.stop} {self.datapoints}"
+                   f" {SCAN_MASK_ALL:#05b}")
+        logger.debug("binary scan: %s", command)
+        with self.serial.lock:
+            self.sync_serial()
+            timeout = self.serial.timeout
+            self.serial.timeout = _max_retries(
+                self.bandwidth, self.datapoints) * WAIT
+            try:
+                self.serial.write(f"{command}\r".encode("ascii"))
+                self.serial.readline()  # echo
+                header = self.serial.read(_SCAN_BIN_HEADER.size)
+                if len(header) != _SCAN_BIN_HEADER.size:
+                    raise IOError("Timeout reading binary scan")
+                mask, points = _SCAN_BIN_HEADER.unpack(header)
+                if mask & SCAN_MASK_ALL != SCAN_MASK_ALL:
+                    raise IOError(f"Unexpected binary scan mask {mask:#x}")
+                size = points * _SCAN_BIN_RECORD.itemsize
+                data = self.serial.read(size)
+                if len(data) != size:
+                    raise IOError(
+                        f"Timeout reading binary scan: {len(data)} of"
+                        f" {size} bytes")
+                self.serial.synced = self.serial.read_until(
+                    PROMPT).endswith(PROMPT)
+            finally:
+                self.serial.timeout = timeout
+        records = np.frombuffer(data, dtype=_SCAN_BIN_RECORD)
+        return (records["freq"].astype(np.int64),
+                records["s11_real"] + 1j * records["s11_imag"],
+                records["s21_real"] + 1j * records["s21_imag"])
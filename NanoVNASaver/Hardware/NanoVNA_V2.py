@@ -18,10 +18,12 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
 import platform
-from struct import pack, unpack_from
+from struct import pack
 from time import sleep
 from typing import List
 
+import numpy as np
+
 from NanoVNASaver.Hardware.Serial import Interface
 from NanoVNASaver.Hardware.VNA import VNA
 from NanoVNASaver.Version import Version
@@ -57,6 +59,14 @@ _ADDR_FW_MINOR = 0xf4
 
 WRITE_SLEEP = 0.05
 
+# one record of the values FIFO
+_FIFO_RECORD = np.dtype([
+    ("fwd_real", "<i4"), ("fwd_imag", "<i4"),
+    ("rev0_real", "<i4"), ("rev0_imag", "<i4"),
+    ("rev1_real", "<i4"), ("rev1_imag", "<i4"),
+    ("freq_index", "<u2"), ("reserved", "V6"),
+])
+
 _ADF4350_TXPOWER_DESC_MAP = {
     0: '9dB attenuation',
     1: '6dB attenuation',
@@ -75,7 +85,7 @@ class NanoVNA_V2(VNA):
     def __init__(self, iface: Interface):
         super().__init__(iface)
 
-        if platform.system() != 'Windows':
+        if platform.system() != 'Windows' and iface.type != 'simulator':
             tty.setraw(self.serial.fd)
 
         # reset protocol to known state
@@ -93,7 +103,8 @@ class NanoVNA_V2(VNA):
         self.sweepStartHz = 200e6
         self.sweepStepHz = 1e6
 
-        self._sweepdata = []
+        self._sweepdata = (np.zeros(0, dtype=complex),
+                           np.zeros(0, dtype=complex))
         self._updateSweep()
 
     def getCalibration(self) -> str:
@@ -130,6 +141,10 @@ class NanoVNA_V2(VNA):
             for i in range(self.datapoints)]
 
     def readValues(self, value) -> List[str]:
+        return [f"{x.real} {x.imag}"
+                for x in self.readComplexValues(value).tolist()]
+
+    def readComplexValues(self, value) -> np.ndarray:
         # Actually grab the data only when requesting channel 0.
         # The hardware will return all channels which we will store.
         if value == "data 0":
@@ -144,9 +159,10 @@ class NanoVNA_V2(VNA):
                                        _CMD_WRITE, _ADDR_VALUES_FIFO, 0))
                 sleep(WRITE_SLEEP)
                 # clear sweepdata
-                self._sweepdata = [(complex(), complex())] * (
-                    self.datapoints + s21hack)
                 pointstodo = self.datapoints + s21hack
+                s11 = np.zeros(pointstodo, dtype=complex)
+                s21 = np.zeros(pointstodo, dtype=complex)
+                self._sweepdata = (s11, s21)
                 # we read at most 255 values at a time and the time required empirically is
                 # just over 3 seconds for 101 points or 7 seconds for 255 points
                 self.serial.timeout = min(pointstodo, 255) * 0.035 + 0.1
@@ -160,7 +176,7 @@ class NanoVNA_V2(VNA):
                              pointstoread))
                     sleep(WRITE_SLEEP)
                     # each value is 32 bytes
-                    nBytes = pointstoread * 32
+                    nBytes = pointstoread * _FIFO_RECORD.itemsize
 
                     # serial .read() will try to read nBytes bytes in timeout secs
                     arr = self.serial.read(nBytes)
@@ -172,37 +188,33 @@ class NanoVNA_V2(VNA):
                         if nBytes > len(arr):
                             arr = arr + self.serial.read(nBytes - len(arr))
                     if nBytes != len(arr):
-                        return []
-
-                    freq_index = -1
-                    for i in range(pointstoread):
-                        (fwd_real, fwd_imag, rev0_real, rev0_imag, rev1_real,
-                         rev1_imag, freq_index) = unpack_from(
-                             "<iiiiiihxxxxxx", arr, i * 32)
-                        fwd = complex(fwd_real, fwd_imag)
-                        refl = complex(rev0_real, rev0_imag)
-                        thru = complex(rev1_real, rev1_imag)
-                        if i == 0:
-                            logger.debug("Freq index from: %i", freq_index)
-                        self._sweepdata[freq_index] = (refl / fwd, thru / fwd)
-                    logger.debug("Freq index to: %i", freq_index)
+                        self.serial.timeout = timeout
+                        return np.zeros(0, dtype=complex)
+
+                    records = np.frombuffer(arr, dtype=_FIFO_RECORD)
+                    freq_index = records["freq_index"]
+                    logger.debug("Freq index from: %i to: %i",
+                                 freq_index[0], freq_index[-1])
+                    fwd = records["fwd_real"] + 1j * records["fwd_imag"]
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        s11[freq_index] = (
+                            records["rev0_real"] +
+                            1j * records["rev0_imag"]) / fwd
+                        s21[freq_index] = (
+                            records["rev1_real"] +
+                            1j * records["rev1_imag"]) / fwd
 
                     pointstodo = pointstodo - pointstoread
             self.serial.timeout = timeout
 
             if s21hack:
-                self._sweepdata = self._sweepdata[1:]
-
-            ret = [x[0] for x in self._sweepdata]
-            ret = [str(x.real) + ' ' + str(x.imag) for x in ret]
-            return ret
+                self._sweepdata = (s11[1:], s21[1:])
+            return self._sweepdata[0]
 
         if value == "data 1":
-            ret = [x[1] for x in self._sweepdata]
-            ret = [str(x.real) + ' ' + str(x.imag) for x in ret]
-            return ret
+            return self._sweepdata[1]
 
-        return []
+        return np.zeros(0, dtype=complex)
 
     def resetSweep(self, start: int, stop: int):
         self.setSweep(start, stop)
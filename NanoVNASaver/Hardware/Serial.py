@@ -18,11 +18,15 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
 from threading import Lock
+from time import monotonic
+from typing import Iterator
 
 import serial
 
 logger = logging.getLogger(__name__)
 
+PROMPT = b"ch>"
+
 
 def drain_serial(serial_port: serial.Serial):
     """drain up to 10M outstanding data in the serial incoming buffer"""
@@ -30,7 +34,7 @@ def drain_serial(serial_port: serial.Serial):
     timeout = serial_port.timeout
     serial_port.timeout = 0.05
     for _ in range(10240):
-        cnt = len(serial_port.read(128))
+        cnt = len(serial_port.read(serial_port.in_waiting or 128))
         if not cnt:
             serial_port.timeout = timeout
             return
@@ -38,16 +42,61 @@ def drain_serial(serial_port: serial.Serial):
     logger.warning("unable to drain all data")
 
 
+def read_lines(serial_port: serial.Serial, timeout: float,
+               prompt: bytes = PROMPT) -> Iterator[str]:
+    """Yields the non empty lines received until the shell prompt
+
+    Everything pending is read in one block, a read only blocks for the
+    port timeout while nothing has arrived. Raises IOError if the port
+    stayed idle for more than timeout seconds before the prompt showed up.
+    """
+    pending = b""
+    idle = 0.0
+    while True:
+        started = monotonic()
+        chunk = serial_port.read(serial_port.in_waiting or 1)
+        if not chunk:
+            idle += monotonic() - started
+            if idle > timeout:
+                raise IOError("timeout waiting for prompt")
+            continue
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line = line.strip()
+            if line.startswith(prompt):
+                return
+            if line:
+                yield line.decode("ascii")
+        if pending.lstrip().startswith(prompt):
+            return
+
+
 class Interface(serial.Serial):
     def __init__(self, interface_type: str, comment, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        assert interface_type in ('serial', 'usb', 'bt', 'network')
+        assert interface_type in ('serial', 'usb', 'bt', 'network',
+                                  'simulator')
         self.type = interface_type
         self.comment = comment
         self.port = None
         self.baudrate = 115200
         self.timeout = 0.05
         self.lock = Lock()
+        # set when the last command was read up to the prompt
+        self.synced = False
+        # transferred bytes for the sweep statistics
+        self.bytes_in = 0
+        self.bytes_out = 0
 
     def __str__(self):
         return f"{self.port} ({self.comment})"
+
+    def read(self, size: int = 1) -> bytes:
+        data = super().read(size)
+        self.bytes_in += len(data)
+        return data
+
+    def write(self, data: bytes) -> int:
+        self.bytes_out += len(data)
+        return super().write(data)
@@ -0,0 +1,515 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""Simulated VNA hardware for tests and benchmarks without a device
+
+A SimulatedInterface replaces the serial port and answers like a
+NanoVNA text shell (ShellDevice) or a NanoVNA V2 binary protocol
+device (V2Device). The measured values come from synthetic DUT models,
+response latency, sweep speed and link bandwidth are configurable.
+
+    iface = SimulatedInterface(ShellDevice(Antenna(7.1e6)))
+    iface.open()
+    iface.comment = get_comment(iface)
+    vna = get_VNA(iface)
+"""
+import logging
+import struct
+from time import monotonic, sleep
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from NanoVNASaver.Hardware.Serial import Interface
+from NanoVNASaver.Hardware.VNA import DISLORD_BW
+
+logger = logging.getLogger(__name__)
+
+SPEED_OF_LIGHT = 299792458
+Z0 = 50
+
+# (delay in s, payload) pairs answered by a device
+Response = Tuple[float, bytes]
+
+
+class DUT:
+    """Synthetic device under test, s11 at port 1 and s21 to port 2"""
+
+    def s_parameters(self, freq: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError()
+
+
+class Load(DUT):
+    """One port load of a fixed impedance"""
+
+    def __init__(self, impedance: complex = Z0):
+        self.impedance = impedance
+
+    def s_parameters(self, freq):
+        s11 = np.full(len(freq), (self.impedance - Z0) /
+                      (self.impedance + Z0), dtype=complex)
+        return s11, np.zeros(len(freq), dtype=complex)
+
+
+class Antenna(DUT):
+    """One port series RLC resonator around its radiation resistance"""
+
+    def __init__(self, resonance: float, resistance: float = 40,
+                 q_factor: float = 10):
+        self.resonance = resonance
+        self.resistance = resistance
+        self.q_factor = q_factor
+
+    def s_parameters(self, freq):
+        detune = freq / self.resonance - self.resonance / freq
+        z = self.resistance * (1 + 1j * self.q_factor * detune)
+        return (z - Z0) / (z + Z0), np.zeros(len(freq), dtype=complex)
+
+
+class Cable(DUT):
+    """Matched coax cable, terminated by another DUT at the far end
+
+    The loss is given in dB per 100m at 100MHz and scales with the
+    square root of the frequency (skin effect).
+    """
+
+    def __init__(self, length: float, velocity_factor: float = 0.66,
+                 loss: float = 5.0, termination: DUT = None):
+        self.length = length
+        self.velocity_factor = velocity_factor
+        self.loss = loss
+        self.termination = termination
+
+    def s_parameters(self, freq):
+        attenuation = (self.loss * self.length / 100 *
+                       np.sqrt(freq / 100e6) / 20 * np.log(10))
+        phase = (2 * np.pi * freq * self.length /
+                 (self.velocity_factor * SPEED_OF_LIGHT))
+        s21 = np.exp(-attenuation - 1j * phase)
+        if self.termination is None:
+            return np.zeros(len(freq), dtype=complex), s21
+        return self.termination.s_parameters(freq)[0] * s21 ** 2, s21
+
+
+class _Butterworth(DUT):
+    """Lossless butterworth two port on a normalized frequency"""
+
+    def __init__(self, order: int):
+        self.order = order
+
+    def _normalized(self, freq: np.ndarray) -> np.ndarray:
+        raise NotImplementedError()
+
+    def s_parameters(self, freq):
+        poles = np.exp(1j * np.pi * (
+            2 * np.arange(1, self.order + 1) + self.order - 1) /
+            (2 * self.order))
+        s = 1j * self._normalized(freq)
+        s21 = 1 / np.prod(s[:, np.newaxis] - poles, axis=1)
+        s11 = (np.sqrt(np.maximum(0, 1 - np.abs(s21) ** 2)) *
+               np.exp(1j * (np.angle(s21) + np.pi / 2)))
+        return s11, s21
+
+
+class LowPass(_Butterworth):
+    def __init__(self, cutoff: float, order: int = 5):
+        super().__init__(order)
+        self.cutoff = cutoff
+
+    def _normalized(self, freq):
+        return freq / self.cutoff
+
+
+class BandPass(_Butterworth):
+    def __init__(self, center: float, bandwidth: float, order: int = 3):
+        super().__init__(order)
+        self.center = center
+        self.bandwidth = bandwidth
+
+    def _normalized(self, freq):
+        return (freq / self.center - self.center / freq) * (
+            self.center / self.bandwidth)
+
+
+class SimulatedDevice:
+    """Base of the protocol emulations
+
+    latency is the answer delay of every command, point_time the
+    measurement time of every sweep point. noise adds complex gaussian
+    noise of that standard deviation to the measured values.
+    """
+    name = "Simulator"
+
+    def __init__(self, dut: DUT, latency: float = 0.0,
+                 point_time: float = 0.0, noise: float = 0.0,
+                 seed: int = None):
+        self.dut = dut
+        self.latency = latency
+        self.point_time = point_time
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+
+    def measure(self, freq: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        s11, s21 = self.dut.s_parameters(np.asarray(freq, dtype=float))
+        if self.noise:
+            shape = (2, len(freq))
+            noise = (self.rng.normal(0, self.noise, shape) +
+                     1j * self.rng.normal(0, self.noise, shape))
+            s11, s21 = s11 + noise[0], s21 + noise[1]
+        return s11, s21
+
+    def reset(self):
+        """Called when the port is opened"""
+
+    def feed(self, data: bytes) -> Iterator[Response]:
+        raise NotImplementedError()
+
+
+class ShellDevice(SimulatedDevice):
+    """NanoVNA text shell with scan mask and binary scan support"""
+
+    def __init__(self, dut: DUT, board: str = "NanoVNA-H",
+                 version: str = "1.2.0", scan_binary: bool = True,
+                 **kwargs):
+        super().__init__(dut, **kwargs)
+        self.board = board
+        self.version = version
+        self.scan_binary = scan_binary
+        self.bandwidth = 1000
+        self.sweep = (50000, 900000000, 101)
+        self._input = b""
+
+    def reset(self):
+        self._input = b""
+
+    def frequencies(self) -> np.ndarray:
+        start, stop, points = self.sweep
+        return np.linspace(start, stop, points).round().astype(np.int64)
+
+    def feed(self, data):
+        self._input += data
+        *commands, self._input = self._input.split(b"\r")
+        for command in commands:
+            command = command.decode("ascii").strip()
+            delay, out = self.latency, command.encode("ascii") + b"\r\n"
+            if command:
+                cmd_delay, payload = self.execute(*command.split())
+                delay += cmd_delay
+                out += payload
+            yield delay, out + b"ch> "
+
+    @staticmethod
+    def _lines(lines: List[str]) -> bytes:
+        return "".join(f"{line}\r\n" for line in lines).encode("ascii")
+
+    def execute(self, command: str, *args: str) -> Response:
+        handler = getattr(self, f"cmd_{command}", None)
+        if handler is None:
+            return 0, f"{command}?\r\n".encode("ascii")
+        try:
+            return handler(*args)
+        except (KeyError, TypeError, ValueError):
+            return 0, f"usage: {command}\r\n".encode("ascii")
+
+    def cmd_help(self) -> Response:
+        commands = sorted(name[4:] for name in dir(self)
+                          if name.startswith("cmd_"))
+        if not self.scan_binary:
+            commands.remove("scan_bin")
+        return 0, self._lines(["Commands: " + " ".join(commands)])
+
+    def cmd_version(self) -> Response:
+        return 0, self._lines([self.version])
+
+    def cmd_info(self) -> Response:
+        return 0, self._lines([
+            f"Board: {self.board}", "Simulated device",
+            f"Version: {self.version}"])
+
+    def cmd_bandwidth(self, value: str = None) -> Response:
+        if value is None:
+            return 0, self._lines([
+                f"{DISLORD_BW[self.bandwidth]} ({self.bandwidth}Hz)"])
+        self.bandwidth = {v: k for k, v in DISLORD_BW.items()}[int(value)]
+        return 0, b""
+
+    def cmd_resume(self) -> Response:
+        return 0, b""
+
+    def cmd_pause(self) -> Response:
+        return 0, b""
+
+    def cmd_sweep(self, *args: str) -> Response:
+        if not args:
+            return 0, self._lines([" ".join(map(str, self.sweep))])
+        start, stop, points = (args + (str(self.sweep[2]), ))[:3]
+        self.sweep = (int(start), int(stop), int(points))
+        return 0, b""
+
+    def cmd_frequencies(self) -> Response:
+        return 0, self._lines(map(str, self.frequencies().tolist()))
+
+    def cmd_data(self, channel: str = "0") -> Response:
+        values = self.measure(self.frequencies())[int(channel)]
+        return 0, self._lines(
+            f"{v.real:.9f} {v.imag:.9f}" for v in values.tolist())
+
+    def _scan(self, start: str, stop: str, points: str
+              ) -> Tuple[float, np.ndarray, np.ndarray, np.ndarray]:
+        self.sweep = (int(start), int(stop), int(points))
+        freq = self.frequencies()
+        s11, s21 = self.measure(freq)
+        return len(freq) * self.point_time, freq, s11, s21
+
+    def cmd_scan(self, start: str, stop: str, points: str,
+                 mask: str = "0") -> Response:
+        delay, freq, s11, s21 = self._scan(start, stop, points)
+        mask = int(mask, 0)
+        columns = []
+        if mask & 0b001:
+            columns.append(freq.astype(str))
+        for bit, values in ((0b010, s11), (0b100, s21)):
+            if mask & bit:
+                columns.append(np.char.mod("%.9f", values.real))
+                columns.append(np.char.mod("%.9f", values.imag))
+        if not columns:
+            return delay, b""
+        return delay, self._lines(
+            " ".join(row) for row in zip(*columns))
+
+    def cmd_scan_bin(self, start: str, stop: str, points: str,
+                     mask: str = "0") -> Response:
+        delay, freq, s11, s21 = self._scan(start, stop, points)
+        mask = int(mask, 0)
+        fields = []
+        if mask & 0b001:
+            fields.append(("freq", "<u4", freq))
+        for bit, name, values in ((0b010, "s11", s11), (0b100, "s21", s21)):
+            if mask & bit:
+                fields.append((f"{name}_real", "<f4", values.real))
+                fields.append((f"{name}_imag", "<f4", values.imag))
+        records = np.zeros(len(freq), dtype=[f[:2] for f in fields])
+        for name, _, values in fields:
+            records[name] = values
+        header = struct.pack("<HH", mask | 0x80, len(freq))
+        return delay, header + records.tobytes()
+
+
+# NanoVNA V2 protocol opcodes: (argument size, register size)
+_V2_OPCODES = {
+    0x00: (0, 0),  # NOP
+    0x0d: (0, 0),  # INDICATE
+    0x10: (1, 1), 0x11: (1, 2), 0x12: (1, 4),  # READ, READ2, READ4
+    0x18: (2, 0),  # READFIFO
+    0x20: (1, 1), 0x21: (1, 2), 0x22: (1, 4), 0x23: (1, 8),  # WRITE
+    0x28: (2, 0),  # WRITEFIFO
+}
+_V2_FIFO_RECORD = np.dtype([
+    ("fwd_real", "<i4"), ("fwd_imag", "<i4"),
+    ("rev0_real", "<i4"), ("rev0_imag", "<i4"),
+    ("rev1_real", "<i4"), ("rev1_imag", "<i4"),
+    ("freq_index", "<u2"), ("reserved", "V6"),
+])
+_V2_FWD_LEVEL = 1 << 24
+
+
+class V2Device(SimulatedDevice):
+    """NanoVNA V2 register and values FIFO protocol"""
+
+    def __init__(self, dut: DUT, firmware: Tuple[int, int] = (1, 3),
+                 board: Tuple[int, int] = (2, 4), **kwargs):
+        super().__init__(dut, **kwargs)
+        self.registers = bytearray(256)
+        self.registers[0xf0], self.registers[0xf2] = board
+        self.registers[0xf1] = 1
+        self.registers[0xf3], self.registers[0xf4] = firmware
+        self._set(0x00, 8, 200000000)
+        self._set(0x10, 8, 1000000)
+        self._set(0x20, 2, 101)
+        self._input = b""
+        self._fifo_index = 0
+
+    def reset(self):
+        self._input = b""
+
+    def _get(self, addr: int, size: int) -> int:
+        return int.from_bytes(self.registers[addr:addr + size], "little")
+
+    def _set(self, addr: int, size: int, value: int):
+        self.registers[addr:addr + size] = value.to_bytes(size, "little")
+
+    def frequencies(self) -> np.ndarray:
+        return (self._get(0x00, 8) +
+                self._get(0x10, 8) * np.arange(self._get(0x20, 2)))
+
+    def feed(self, data):
+        self._input += data
+        while self._input:
+            opcode = self._input[0]
+            if opcode not in _V2_OPCODES:
+                logger.warning("V2 simulator: invalid opcode %#x", opcode)
+                self._input = self._input[1:]
+                continue
+            args, size = _V2_OPCODES[opcode]
+            length = 1 + args + (size if opcode >= 0x20 else 0)
+            if opcode == 0x28 and len(self._input) >= 3:
+                length += self._input[2]
+            if len(self._input) < length:
+                return
+            packet, self._input = (self._input[:length],
+                                   self._input[length:])
+            answer = self._execute(opcode, packet[1:])
+            if answer is not None:
+                yield answer
+
+    def _execute(self, opcode: int, args: bytes) -> Response:
+        if opcode == 0x00:
+            return None
+        if opcode == 0x0d:
+            return self.latency, b"2"
+        addr = args[0]
+        _, size = _V2_OPCODES[opcode]
+        if opcode == 0x18:
+            return self._read_fifo(args[1])
+        if opcode == 0x28:
+            return None
+        if opcode < 0x20:
+            return self.latency, bytes(self.registers[addr:addr + size])
+        self.registers[addr:addr + size] = args[1:]
+        if addr == 0x30:  # any write clears the FIFO
+            self._fifo_index = 0
+        return None
+
+    def _read_fifo(self, count: int) -> Response:
+        freq = self.frequencies()
+        index = (self._fifo_index + np.arange(count)) % len(freq)
+        self._fifo_index = (self._fifo_index + count) % len(freq)
+        s11, s21 = self.measure(freq[index])
+        records = np.zeros(count, dtype=_V2_FIFO_RECORD)
+        records["fwd_real"] = _V2_FWD_LEVEL
+        for name, values in (("rev0", s11), ("rev1", s21)):
+            records[f"{name}_real"] = np.round(values.real * _V2_FWD_LEVEL)
+            records[f"{name}_imag"] = np.round(values.imag * _V2_FWD_LEVEL)
+        records["freq_index"] = index
+        return (self.latency + count * self.point_time,
+                records.tobytes())
+
+
+class SimulatedInterface(Interface):
+    """Serial port look alike connected to a simulated device
+
+    The answers are scheduled when a command is written and become
+    readable after the device delay, at bandwidth bytes per second
+    (unlimited if None). Reads block up to timeout like a serial port.
+    """
+
+    def __init__(self, device: SimulatedDevice,
+                 bandwidth: float = None, comment: str = None):
+        super().__init__("simulator", comment or device.name)
+        self.port = "simulator"
+        self.device = device
+        self.bandwidth = bandwidth
+        # [start, end, data, offset] of the scheduled answers
+        self._chunks = []
+        self._busy_until = 0.0
+
+    def _reconfigure_port(self, *args, **kwargs):
+        pass
+
+    def open(self):
+        self.device.reset()
+        self.reset_input_buffer()
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def write(self, data: bytes) -> int:
+        if not self.is_open:
+            raise IOError("simulated port not open")
+        self.bytes_out += len(data)
+        now = monotonic()
+        for delay, payload in self.device.feed(bytes(data)):
+            start = max(now + delay, self._busy_until)
+            end = start
+            if self.bandwidth:
+                end += len(payload) / self.bandwidth
+            self._busy_until = end
+            self._chunks.append([start, end, payload, 0])
+        return len(data)
+
+    @staticmethod
+    def _arrived(chunk: list, now: float) -> int:
+        start, end, data, _ = chunk
+        if now >= end:
+            return len(data)
+        if now < start:
+            return 0
+        return int(len(data) * (now - start) / (end - start))
+
+    def _available(self, now: float) -> int:
+        count = 0
+        for chunk in self._chunks:
+            arrived = self._arrived(chunk, now)
+            count += arrived - chunk[3]
+            if arrived < len(chunk[2]):
+                break
+        return count
+
+    def _arrival(self, count: int) -> float:
+        """Time when count bytes will have arrived, inf if never"""
+        for start, end, data, offset in self._chunks:
+            if count <= len(data) - offset:
+                return start + (end - start) * (offset + count) / len(data)
+            count -= len(data) - offset
+        return float("inf")
+
+    @property
+    def in_waiting(self) -> int:
+        return self._available(monotonic())
+
+    def read(self, size: int = 1) -> bytes:
+        if not self.is_open:
+            raise IOError("simulated port not open")
+        now = monotonic()
+        deadline = float("inf") if self.timeout is None else now + self.timeout
+        wait = min(self._arrival(size), deadline) - now
+        if wait == float("inf"):
+            raise IOError("blocking read without data on simulated port")
+        if wait > 0:
+            sleep(wait)
+        count = min(size, self._available(monotonic()))
+        out = bytearray()
+        while count:
+            chunk = self._chunks[0]
+            _, _, data, offset = chunk
+            part = data[offset:offset + count]
+            out += part
+            count -= len(part)
+            chunk[3] += len(part)
+            if chunk[3] == len(data):
+                self._chunks.pop(0)
+        self.bytes_in += len(out)
+        return bytes(out)
+
+    def reset_input_buffer(self):
+        self._chunks.clear()
+        self._busy_until = 0.0
+
+    def reset_output_buffer(self):
+        pass
@@ -24,7 +24,7 @@ import serial
 import numpy as np
 from PyQt5 import QtGui
 
-from NanoVNASaver.Hardware.Serial import drain_serial, Interface
+from NanoVNASaver.Hardware.Serial import Interface
 from NanoVNASaver.Hardware.VNA import VNA
 
 logger = logging.getLogger(__name__)
@@ -59,7 +59,7 @@ class TinySA(VNA):
     def _capture_data(self) -> bytes:
         timeout = self.serial.timeout
         with self.serial.lock:
-            drain_serial(self.serial)
+            self.sync_serial()
             timeout = self.serial.timeout
             self.serial.write("capture\r".encode('ascii'))
             self.serial.readline()
@@ -21,10 +21,11 @@ from collections import OrderedDict
 from time import sleep
 from typing import List, Iterator
 
+import numpy as np
 from PyQt5 import QtGui
 
 from NanoVNASaver.Version import Version
-from NanoVNASaver.Hardware.Serial import Interface, drain_serial
+from NanoVNASaver.Hardware.Serial import Interface, drain_serial, read_lines
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +45,18 @@ def _max_retries(bandwidth: int, datapoints: int) -> int:
                  (1000 / bandwidth) ** 1.30 * (datapoints / 101))
 
 
+def parse_values(lines: List[str]) -> np.ndarray:
+    """Converts "real imag" value lines to a complex array
+
+    Raises ValueError if a line is not a pair of numbers.
+    """
+    values = np.array([line.split() for line in lines], dtype=np.float64)
+    if values.size and values.shape[-1] != 2:
+        raise ValueError(f"Expected value pairs, got: {lines[0]}")
+    values = values.reshape(-1, 2)
+    return values[:, 0] + 1j * values[:, 1]
+
+
 class VNA:
     name = "VNA"
     valid_datapoints = (101, 51, 11)
@@ -91,36 +104,42 @@ class VNA:
         self.connect()
         sleep(WAIT)
 
+    def sync_serial(self):
+        """Drains the input only if the stream is out of sync
+
+        Needs the serial lock to be held. The stream is considered in
+        sync until the next command has been read up to its prompt,
+        the blank following the prompt may still be pending.
+        """
+        if self.serial.synced and self.serial.in_waiting:
+            pending = self.serial.read(self.serial.in_waiting)
+            self.serial.synced = not pending.strip()
+        if not self.serial.synced:
+            logger.debug("draining out of sync serial")
+            drain_serial(self.serial)
+        self.serial.synced = False
+
     def exec_command(self, command: str, wait: float = WAIT) -> Iterator[str]:
         logger.debug("exec_command(%s)", command)
         with self.serial.lock:
-            drain_serial(self.serial)
+            self.sync_serial()
             self.serial.write(f"{command}\r".encode('ascii'))
-            sleep(wait)
-            retries = 0
             max_retries = _max_retries(self.bandwidth, self.datapoints)
             logger.debug("Max retries: %s", max_retries)
-            while True:
-                line = self.serial.readline()
-                line = line.decode("ascii").strip()
-                if not line:
-                    retries += 1
-                    if retries > max_retries:
-                        raise IOError("too many retries")
-                    sleep(wait)
-                    continue
+            timeout = max_retries * (wait + self.serial.timeout)
+            for line in read_lines(self.serial, timeout):
                 if line == command:  # suppress echo
                     continue
-                if line.startswith("ch>"):
-                    logger.debug("Needed retries: %s", retries)
-                    break
                 yield line
+            self.serial.synced = True
 
     def read_features(self):
         result = " ".join(self.exec_command("help")).split()
         logger.debug("result:\n%s", result)
         if "capture" in result:
             self.features.add("Screenshots")
+        if "scan_bin" in result:
+            self.features.add("Scan binary output")
 		#####################################################
         if "sn:" in result:
             self.features.add("SN")
@@ -202,6 +221,14 @@ class VNA:
                      value, len(result))
         return result
 
+    def readComplexValues(self, value) -> np.ndarray:
+        """Reads "data 0" or "data 1" as complex array
+
+        Devices with a binary protocol override this to skip the
+        text representation.
+        """
+        return parse_values(self.readValues(value))
+
     def readVersion(self) -> 'Version':
         result = list(self.exec_command("version"))
         logger.debug("result:\n%s", result)
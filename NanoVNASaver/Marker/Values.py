@@ -77,17 +77,9 @@ class Value():
     def store(self, index: int,
               s11: List[Datapoint],
               s21: List[Datapoint]):
-        # handle boundaries
-        if index == 0:
-            index = 1
-            s11 = [s11[0], ] + s11
-            if s21:
-                s21 = [s21[0], ] + s21
-        if index == len(s11):
-            s11 = s11 + [s11[-1], ]
-            if s21:
-                s21 = s21 + [s21[-1], ]
-        self.freq = s11[1].freq
-        self.s11 = s11[index-1:index+2]
+        # handle boundaries by repeating the first / last point
+        window = (max(index - 1, 0), index, min(index + 1, len(s11) - 1))
+        self.freq = s11[index].freq
+        self.s11 = [s11[i] for i in window]
         if s21:
-            self.s21 = s21[index-1:index+2]
+            self.s21 = [s21[i] for i in window]
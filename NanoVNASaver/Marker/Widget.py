@@ -17,8 +17,10 @@
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import math
-from typing import List
+from functools import cached_property
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
 
+import numpy as np
 from PyQt5 import QtGui, QtWidgets, QtCore
 from PyQt5.QtCore import pyqtSignal
 
@@ -41,6 +43,203 @@ from NanoVNASaver.Formatting import (
 )
 from NanoVNASaver.Inputs import MarkerFrequencyInputWidget as FrequencyInput
 from NanoVNASaver.Marker.Values import TYPES, Value, default_label_ids
+from NanoVNASaver.SweepData import Trace
+
+
+def nearest_location(freq: np.ndarray, frequency: int) -> int:
+    """Index of the point nearest to frequency
+
+    Binary search in the ascending frequencies of a sweep, whatever the
+    step sizes. Of two equally near points the upper one wins, of
+    repeated frequencies the last one.
+    """
+    if np.any(freq[1:] < freq[:-1]):  # not a sweep, search all points
+        return int(np.argmin(np.abs(freq - frequency)))
+    above = int(np.searchsorted(freq, frequency, "right"))
+    if above == len(freq) or (
+            above > 0 and frequency - freq[above - 1] < freq[above] - frequency):
+        nearest = freq[above - 1]
+    else:
+        nearest = freq[above]
+    return int(np.searchsorted(freq, nearest, "right")) - 1
+
+
+def _capacitance(freq: np.ndarray, reactance: np.ndarray) -> np.ndarray:
+    """RFTools.impedance_to_capacitance for many points"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cap = -(1 / (freq * 2 * math.pi * reactance))
+    cap[reactance == 0] = math.inf
+    cap[freq == 0] = -math.inf
+    return cap
+
+
+def _inductance(freq: np.ndarray, reactance: np.ndarray) -> np.ndarray:
+    """RFTools.impedance_to_inductance for many points"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ind = reactance * 1 / (freq * 2 * math.pi)
+    ind[freq == 0] = 0
+    return ind
+
+
+class Columns:
+    """Values of one s-parameter at the locations of many markers
+
+    Each quantity is calculated once for all locations, on first use.
+    Columns are plain lists, so formatting sees Python numbers just
+    like with single datapoints.
+    """
+
+    def __init__(self, trace: Trace, locations: np.ndarray):
+        self.trace = trace
+        self.locations = locations
+        self.at = Trace(trace.freq[locations], trace.z[locations])
+
+    @cached_property
+    def freq(self) -> List[int]:
+        return self.at.freq.tolist()
+
+    @cached_property
+    def mag(self) -> List[float]:
+        return self.at.mag.tolist()
+
+    @cached_property
+    def phase(self) -> List[float]:
+        return self.at.phase.tolist()
+
+    @cached_property
+    def gain(self) -> List[float]:
+        return self.at.gain.tolist()
+
+    @cached_property
+    def vswr(self) -> List[float]:
+        return self.at.vswr.tolist()
+
+    @cached_property
+    def qFactor(self) -> List[float]:
+        return self.at.qFactor().tolist()
+
+    @cached_property
+    def groupDelay(self) -> List[float]:
+        # needs the neighbours, taken from the column shared with charts
+        return self.trace.groupDelay()[self.locations].tolist()
+
+    @cached_property
+    def shuntImpedance(self) -> List[complex]:
+        return self.at.shuntImpedance().tolist()
+
+    @cached_property
+    def seriesImpedance(self) -> List[complex]:
+        return self.at.seriesImpedance().tolist()
+
+    @cached_property
+    def impedance(self) -> List[complex]:
+        return self.at.impedance().tolist()
+
+    @cached_property
+    def _parallel(self) -> np.ndarray:
+        """RFTools.serial_to_parallel of the impedances"""
+        imp = self.at.impedance()
+        z_sq_sum = imp.real ** 2 + imp.imag ** 2
+        parallel = np.empty_like(imp)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            parallel.real = np.where(
+                imp.real == 0, math.inf, z_sq_sum / imp.real)
+            parallel.imag = np.where(
+                imp.imag == 0, math.inf, z_sq_sum / imp.imag)
+        return parallel
+
+    @cached_property
+    def parallel(self) -> List[complex]:
+        return self._parallel.tolist()
+
+    @cached_property
+    def capacitance(self) -> List[float]:
+        return _capacitance(self.at.freq, self.at.impedance().imag).tolist()
+
+    @cached_property
+    def inductance(self) -> List[float]:
+        return _inductance(self.at.freq, self.at.impedance().imag).tolist()
+
+    @cached_property
+    def parallelCapacitance(self) -> List[float]:
+        return _capacitance(self.at.freq, self._parallel.imag).tolist()
+
+    @cached_property
+    def parallelInductance(self) -> List[float]:
+        return _inductance(self.at.freq, self._parallel.imag).tolist()
+
+
+class MarkerValues(NamedTuple):
+    """Label values of a batch of markers, see Marker.updateMarkers"""
+    s11: Columns
+    s21: Optional[Columns]
+
+    @classmethod
+    def gather(cls, s11: List[RFTools.Datapoint],
+               s21: List[RFTools.Datapoint],
+               locations: Sequence[int]) -> 'MarkerValues':
+        locations = np.asarray(locations, dtype=np.intp)
+        s21 = (Columns(Trace.from_datapoints(s21), locations)
+               if len(s21) == len(s11) else None)
+        return cls(Columns(Trace.from_datapoints(s11), locations), s21)
+
+
+def _reactance(capacitance: float, inductance: float, imag: float) -> str:
+    if imag < 0:
+        return format_capacitance(capacitance)
+    return format_inductance(inductance)
+
+
+def _polar(mag: float, phase: float) -> str:
+    return str(round(mag, 2)) + "∠" + format_phase(phase)
+
+
+# label id -> text of the label at index i of the values
+LABEL_TEXT: Dict[str, Callable[['MarkerValues', int, 'Marker'], str]] = {
+    'actualfreq': lambda v, i, m: format_frequency_space(v.s11.freq[i]),
+    'lambda': lambda v, i, m: format_wavelength(
+        299792458 / v.s11.freq[i]),
+    'admittance': lambda v, i, m: format_complex_adm(v.s11.impedance[i]),
+    'impedance': lambda v, i, m: format_complex_imp(v.s11.impedance[i]),
+    'parc': lambda v, i, m: format_capacitance(
+        v.s11.parallelCapacitance[i]),
+    'parl': lambda v, i, m: format_inductance(v.s11.parallelInductance[i]),
+    'parlc': lambda v, i, m: _reactance(
+        v.s11.parallelCapacitance[i], v.s11.parallelInductance[i],
+        v.s11.parallel[i].imag),
+    'parr': lambda v, i, m: format_resistance(v.s11.parallel[i].real),
+    'returnloss': lambda v, i, m: format_gain(
+        v.s11.gain[i], m.returnloss_is_positive),
+    's11groupdelay': lambda v, i, m: format_group_delay(
+        v.s11.groupDelay[i]),
+    's11mag': lambda v, i, m: format_magnitude(v.s11.mag[i]),
+    's11phase': lambda v, i, m: format_phase(v.s11.phase[i]),
+    's11polar': lambda v, i, m: _polar(v.s11.mag[i], v.s11.phase[i]),
+    's11q': lambda v, i, m: format_q_factor(v.s11.qFactor[i]),
+    's11z': lambda v, i, m: format_resistance(abs(v.s11.impedance[i])),
+    'serc': lambda v, i, m: format_capacitance(v.s11.capacitance[i]),
+    'serl': lambda v, i, m: format_inductance(v.s11.inductance[i]),
+    'serlc': lambda v, i, m: _reactance(
+        v.s11.capacitance[i], v.s11.inductance[i],
+        v.s11.impedance[i].imag),
+    'serr': lambda v, i, m: format_resistance(v.s11.impedance[i].real),
+    'vswr': lambda v, i, m: format_vswr(v.s11.vswr[i]),
+    's21gain': lambda v, i, m: format_gain(v.s21.gain[i]),
+    's21groupdelay': lambda v, i, m: format_group_delay(
+        v.s21.groupDelay[i] / 2),
+    's21mag': lambda v, i, m: format_magnitude(v.s21.mag[i]),
+    's21phase': lambda v, i, m: format_phase(v.s21.phase[i]),
+    's21polar': lambda v, i, m: _polar(v.s21.mag[i], v.s21.phase[i]),
+    's21magshunt': lambda v, i, m: format_magnitude(
+        abs(v.s21.shuntImpedance[i])),
+    's21magseries': lambda v, i, m: format_magnitude(
+        abs(v.s21.seriesImpedance[i])),
+    's21realimagshunt': lambda v, i, m: format_complex_imp(
+        v.s21.shuntImpedance[i], allow_negative=True),
+    's21realimagseries': lambda v, i, m: format_complex_imp(
+        v.s21.seriesImpedance[i], allow_negative=True),
+}
+
 
 COLORS = (
     QtGui.QColor(QtCore.Qt.darkGray),
@@ -77,6 +276,8 @@ class Marker(QtCore.QObject, Value):
         self.name = name
         self.color = QtGui.QColor()
         self.index = 0
+        # values of the last update and the index of this marker in them
+        self._values = None
 
         if self.qsettings:
             Marker._instances += 1
@@ -217,6 +418,7 @@ class Marker(QtCore.QObject, Value):
     def setFieldSelection(self, fields):
         self.active_labels = fields[:]
         self.buildForm()
+        self._showLabels()
 
     def setColor(self, color):
         if color.isValid():
@@ -247,124 +449,80 @@ class Marker(QtCore.QObject, Value):
         self.location = -1
         self.frequencyInput.nextFrequency = -1
         self.frequencyInput.previousFrequency = -1
-        datasize = len(data)
+        freq = Trace.from_datapoints(data).freq
+        datasize = len(freq)
         if datasize == 0:
             # Set the frequency before loading any data
             return
 
-        min_freq = data[0].freq
-        max_freq = data[-1].freq
-        lower_stepsize = data[1].freq - data[0].freq
-        upper_stepsize = data[-1].freq - data[-2].freq
+        if datasize > 1:
+            lower_stepsize = freq[1] - freq[0]
+            upper_stepsize = freq[-1] - freq[-2]
+        else:
+            lower_stepsize = upper_stepsize = 0
 
         # We are outside the bounds of the data, so we can't put in a marker
-        if (self.freq + lower_stepsize/2 < min_freq or
-                self.freq - upper_stepsize/2 > max_freq):
+        if (self.freq + lower_stepsize/2 < freq[0] or
+                self.freq - upper_stepsize/2 > freq[-1]):
             return
 
-        min_distance = max_freq
-        for i, item in enumerate(data):
-            if abs(item.freq - self.freq) <= min_distance:
-                min_distance = abs(item.freq - self.freq)
-            else:
-                # We have now started moving away from the nearest point
-                self.location = i-1
-                if i < datasize:
-                    self.frequencyInput.nextFrequency = item.freq
-                if (i-2) >= 0:
-                    self.frequencyInput.previousFrequency = data[i-2].freq
-                return
-        # If we still didn't find a best spot, it was the last value
-        self.location = datasize - 1
-        self.frequencyInput.previousFrequency = data[-2].freq
+        self.location = nearest_location(freq, self.freq)
+        # neighbours for stepping with the arrow keys
+        if self.location + 1 < datasize:
+            self.frequencyInput.nextFrequency = int(freq[self.location + 1])
+        if self.location > 0:
+            self.frequencyInput.previousFrequency = int(freq[self.location - 1])
 
     def get_data_layout(self) -> QtWidgets.QGroupBox:
         return self.group_box
 
     def resetLabels(self):
+        self._values = None
         for v in self.label.values():
             v.setText("")
 
     def updateLabels(self,
                      s11: List[RFTools.Datapoint],
                      s21: List[RFTools.Datapoint]):
+        Marker.updateMarkers([self], s11, s21)
+
+    @staticmethod
+    def updateMarkers(markers: List['Marker'],
+                      s11: List[RFTools.Datapoint],
+                      s21: List[RFTools.Datapoint]):
+        """Updates the labels of all markers in one pass over the data"""
         if not s11:
             return
+        markers = [m for m in markers if m._locate(s11, s21)]
+        values = MarkerValues.gather(
+            s11, s21, [m.location for m in markers])
+        for i, m in enumerate(markers):
+            m._values = (values, i)
+            m._showLabels()
+
+    def _locate(self, s11: List[RFTools.Datapoint],
+                s21: List[RFTools.Datapoint]) -> bool:
         if self.location == -1:  # initial position
             try:
                 location = (self.index -1) / (self._instances - 1) * (len(s11) - 1)
                 self.location = int(location)
             except ZeroDivisionError:
                 self.location = 0
-        try:
-            _s11 = s11[self.location]
-        except IndexError:
+        if self.location >= len(s11):
             self.location = 0
-            return
-
-        self.frequencyInput.setText(_s11.freq)
+            return False
+        self.frequencyInput.setText(s11[self.location].freq)
         self.store(self.location, s11, s21)
+        return True
 
-        imp = _s11.impedance()
-        cap_str = format_capacitance(
-            RFTools.impedance_to_capacitance(imp, _s11.freq))
-        ind_str = format_inductance(
-            RFTools.impedance_to_inductance(imp, _s11.freq))
-
-        imp_p = RFTools.serial_to_parallel(imp)
-        cap_p_str = format_capacitance(
-            RFTools.impedance_to_capacitance(imp_p, _s11.freq))
-        ind_p_str = format_inductance(
-            RFTools.impedance_to_inductance(imp_p, _s11.freq))
-
-        if imp.imag < 0:
-            x_str = cap_str
-        else:
-            x_str = ind_str
-
-        if imp_p.imag < 0:
-            x_p_str = cap_p_str
-        else:
-            x_p_str = ind_p_str
-
-        self.label['actualfreq'].setText(format_frequency_space(_s11.freq))
-        self.label['lambda'].setText(format_wavelength(_s11.wavelength))
-        self.label['admittance'].setText(format_complex_adm(imp))
-        self.label['impedance'].setText(format_complex_imp(imp))
-        self.label['parc'].setText(cap_p_str)
-        self.label['parl'].setText(ind_p_str)
-        self.label['parlc'].setText(x_p_str)
-        self.label['parr'].setText(format_resistance(imp_p.real))
-        self.label['returnloss'].setText(
-            format_gain(_s11.gain, self.returnloss_is_positive))
-        self.label['s11groupdelay'].setText(
-            format_group_delay(RFTools.groupDelay(s11, self.location)))
-        self.label['s11mag'].setText(format_magnitude(abs(_s11.z)))
-        self.label['s11phase'].setText(format_phase(_s11.phase))
-        self.label['s11polar'].setText(
-            str(round(abs(_s11.z), 2)) + "∠" + format_phase(_s11.phase))
-        self.label['s11q'].setText(format_q_factor(_s11.qFactor()))
-        self.label['s11z'].setText(format_resistance(abs(imp)))
-        self.label['serc'].setText(cap_str)
-        self.label['serl'].setText(ind_str)
-        self.label['serlc'].setText(x_str)
-        self.label['serr'].setText(format_resistance(imp.real))
-        self.label['vswr'].setText(format_vswr(_s11.vswr))
-
-        if len(s21) == len(s11):
-            _s21 = s21[self.location]
-            self.label['s21gain'].setText(format_gain(_s21.gain))
-            self.label['s21groupdelay'].setText(
-                format_group_delay(RFTools.groupDelay(s21, self.location) / 2))
-            self.label['s21mag'].setText(format_magnitude(abs(_s21.z)))
-            self.label['s21phase'].setText(format_phase(_s21.phase))
-            self.label['s21polar'].setText(
-                str(round(abs(_s21.z), 2)) + "∠" + format_phase(_s21.phase))
-            self.label['s21magshunt'].setText(
-                format_magnitude(abs(_s21.shuntImpedance())))
-            self.label['s21magseries'].setText(
-                format_magnitude(abs(_s21.seriesImpedance())))
-            self.label['s21realimagshunt'].setText(
-                format_complex_imp(_s21.shuntImpedance(), allow_negative=True))
-            self.label['s21realimagseries'].setText(
-                format_complex_imp(_s21.seriesImpedance(), allow_negative=True))
+    def _showLabels(self):
+        """Sets the text of the shown labels only"""
+        if self._values is None:
+            return
+        values, index = self._values
+        for label_id in self.active_labels:
+            if label_id not in LABEL_TEXT or (
+                    values.s21 is None and label_id.startswith("s21")):
+                continue
+            self.label[label_id].setText(
+                LABEL_TEXT[label_id](values, index, self))
@@ -18,16 +18,17 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
 import sys
-import threading
+import weakref
 from collections import OrderedDict
 from time import strftime, localtime
 
+import numpy as np
 from PyQt5 import QtWidgets, QtCore, QtGui
 
 from .Windows import (
     AboutWindow, AnalysisWindow, CalibrationWindow,
-    DeviceSettingsWindow, DisplaySettingsWindow, SweepSettingsWindow,
-    TDRWindow, FilesWindow
+    DeviceSettingsWindow, DisplaySettingsWindow, StatisticsWindow,
+    SweepSettingsWindow, TDRWindow, FilesWindow
 )
 from .Controls import MarkerControl, SweepControl, SerialControl
 from .Formatting import format_frequency, format_vswr, format_gain
@@ -46,6 +47,8 @@ from .Charts import (
 )
 from .Calibration import Calibration
 from .Marker import Marker, DeltaMarker
+from .RefreshScheduler import DEFAULT_RATE, RefreshScheduler
+from .SweepData import Snapshot, Trace
 from .SweepWorker import SweepWorker
 from .Settings import BandsModel, Sweep
 from .Touchstone import Touchstone
@@ -75,6 +78,10 @@ class NanoVNASaver(QtWidgets.QWidget):
         self.threadpool = QtCore.QThreadPool()
         self.sweep = Sweep()
         self.worker = SweepWorker(self)
+        self.refresh = RefreshScheduler(
+            self.refreshData,
+            self.settings.value("RefreshRate", DEFAULT_RATE, int),
+            self.worker.stats, self)
 
         self.worker.signals.updated.connect(self.dataUpdated)
         self.worker.signals.finished.connect(self.sweepFinished)
@@ -99,8 +106,11 @@ class NanoVNASaver(QtWidgets.QWidget):
         except IOError as exc:
             self.showError(f"{exc}\n\nPlease try reconnect")
 
-        self.dataLock = threading.Lock()
-        self.data = Touchstone()
+        # latest published sweep, replaced as a whole on every update
+        self.snapshot = Snapshot()
+        self._published_version = 0
+        # snapshot version last shown by each chart
+        self._shown_versions = weakref.WeakKeyDictionary()
         self.ref_data = Touchstone()
 
         self.sweepSource = ""
@@ -189,6 +199,7 @@ class NanoVNASaver(QtWidgets.QWidget):
 
         for c in self.subscribing_charts:
             c.popoutRequested.connect(self.popoutChart)
+            c.shown.connect(self.dataUpdated)
 
         self.charts_layout = QtWidgets.QGridLayout()
 
@@ -229,6 +240,7 @@ class NanoVNASaver(QtWidgets.QWidget):
             "file": FilesWindow(self),
             "sweep_settings": SweepSettingsWindow(self),
             "setup": DisplaySettingsWindow(self),
+            "statistics": StatisticsWindow(self),
             "tdr": TDRWindow(self),
         }
 
@@ -447,26 +459,34 @@ class NanoVNASaver(QtWidgets.QWidget):
         self.worker.stopped = True
 
     def saveData(self, data, data21, source=None):
-        with self.dataLock:
-            self.data.s11 = data
-            self.data.s21 = data21
-            if self.s21att > 0:
-                self.data.s21 = corr_att_data(self.data.s21, self.s21att)
-        if source is not None:
-            self.sweepSource = source
-        else:
-            self.sweepSource = (
+        data = Trace.from_datapoints(data)
+        data21 = Trace.from_datapoints(data21)
+        if self.s21att > 0:
+            data21 = corr_att_data(data21, self.s21att)
+        if source is None:
+            source = (
                 f"{self.sweep.properties.name}"
                 f" {strftime('%Y-%m-%d %H:%M:%S', localtime())}"
             ).lstrip()
+        self.snapshot = Snapshot(data, data21, source)
+        self.sweepSource = source
+
+    @property
+    def data(self) -> Snapshot:
+        """Read-only view of the published sweep
+
+        Readers that need s11 and s21 of the same sweep take the
+        snapshot once instead of reading this twice.
+        """
+        return self.snapshot
 
     def markerUpdated(self, marker: Marker):
-        with self.dataLock:
-            marker.findLocation(self.data.s11)
-            marker.resetLabels()
-            marker.updateLabels(self.data.s11, self.data.s21)
-            for c in self.subscribing_charts:
-                c.update()
+        snapshot = self.snapshot
+        marker.findLocation(snapshot.s11)
+        marker.resetLabels()
+        marker.updateLabels(snapshot.s11, snapshot.s21)
+        for c in self.subscribing_charts:
+            c.update()
         if Marker.count() >= 2 and not self.delta_marker_layout.isHidden():
             self.delta_marker.set_markers(self.markers[0], self.markers[1])
             self.delta_marker.resetLabels()
@@ -476,28 +496,59 @@ class NanoVNASaver(QtWidgets.QWidget):
                 pass
 
     def dataUpdated(self):
-        with self.dataLock:
-            s11 = self.data.s11[:]
-            s21 = self.data.s21[:]
+        """Schedules a refresh of everything showing the sweep data"""
+        self.refresh.request()
+
+    def refreshData(self):
+        with self.worker.stats.timer("dataUpdated"):
+            self._refreshData()
+
+    def _isOutdated(self, chart: Chart, version: int) -> bool:
+        """Hidden charts are skipped until they are shown again"""
+        if not chart.isVisible() or chart.window().isMinimized():
+            return False
+        if self._shown_versions.get(chart) == version:
+            return False
+        self._shown_versions[chart] = version
+        return True
+
+    def _refreshData(self):
+        self.sweep_control.progress_bar.setValue(self.worker.percentage)
 
-        for m in self.markers:
-            m.resetLabels()
-            m.updateLabels(s11, s21)
+        snapshot = self.snapshot
+        s11 = snapshot.s11
+        s21 = snapshot.s21
+        version = snapshot.version
 
         for c in self.s11charts:
-            c.setData(s11)
+            if self._isOutdated(c, version):
+                c.setData(s11)
 
         for c in self.s21charts:
-            c.setData(s21)
+            if self._isOutdated(c, version):
+                c.setData(s21)
 
         for c in self.combinedCharts:
-            c.setCombinedData(s11, s21)
+            if self._isOutdated(c, version):
+                c.setCombinedData(s11, s21)
 
-        self.sweep_control.progress_bar.setValue(self.worker.percentage)
+        for c in (self.tdr_chart, self.tdr_mainwindow_chart):
+            if self._isOutdated(c, version):
+                c.update()
+
+        if version == self._published_version:
+            return  # already shown, e.g. queued update of an older sweep
+        self._published_version = version
+
+        # also sets the always shown cable length of the main window
         self.windows["tdr"].updateTDR()
 
+        for m in self.markers:
+            m.resetLabels()
+        Marker.updateMarkers(self.markers, s11, s21)
+
         if s11:
-            min_vswr = min(s11, key=lambda data: data.vswr)
+            min_vswr = s11[int(np.argmin(s11.vswr))]
             self.s11_min_swr_label.setText(
                 f"{format_vswr(min_vswr.vswr)} @ {format_frequency(min_vswr.freq)}")
             self.s11_min_rl_label.setText(format_gain(min_vswr.gain))
@@ -506,8 +557,8 @@ class NanoVNASaver(QtWidgets.QWidget):
             self.s11_min_rl_label.setText("")
 
         if s21:
-            min_gain = min(s21, key=lambda data: data.gain)
-            max_gain = max(s21, key=lambda data: data.gain)
+            min_gain = s21[int(np.argmin(s21.gain))]
+            max_gain = s21[int(np.argmax(s21.gain))]
             self.s21_min_gain_label.setText(
                 f"{format_gain(min_gain.gain)}"
                 f" @ {format_frequency(min_gain.freq)}")
@@ -533,9 +584,11 @@ class NanoVNASaver(QtWidgets.QWidget):
 
     def setReference(self, s11=None, s21=None, source=None):
         if not s11:
-            with self.dataLock:
-                s11 = self.data.s11[:]
-                s21 = self.data.s21[:]
+            snapshot = self.snapshot
+            s11 = snapshot.s11
+            s21 = snapshot.s21
+        s11 = Trace.from_datapoints(s11)
+        s21 = Trace.from_datapoints(s21)
 
         self.ref_data.s11 = s11
         for c in self.s11charts:
@@ -561,7 +614,7 @@ class NanoVNASaver(QtWidgets.QWidget):
         insert = "("
         if self.sweepSource != "":
             insert += (
-                f"Sweep: {self.sweepSource} @ {len(self.data.s11)} points"
+                f"Sweep: {self.sweepSource} @ {len(self.snapshot.s11)} points"
                 f"{', ' if self.referenceSource else ''}")
         if self.referenceSource != "":
             insert += (
@@ -615,8 +668,15 @@ class NanoVNASaver(QtWidgets.QWidget):
         if chart in self.combinedCharts:
             self.combinedCharts.append(new_chart)
         new_chart.popoutRequested.connect(self.popoutChart)
+        new_chart.shown.connect(self.dataUpdated)
         return new_chart
 
+    def changeEvent(self, a0: QtCore.QEvent) -> None:
+        super().changeEvent(a0)
+        if (a0.type() == QtCore.QEvent.WindowStateChange and
+                not self.isMinimized()):
+            self.dataUpdated()  # charts were skipped while minimized
+
     def closeEvent(self, a0: QtGui.QCloseEvent) -> None:
         self.worker.stopped = True
         self.settings.setValue("MarkerCount", Marker.count())
@@ -20,6 +20,8 @@ import math
 import cmath
 from typing import List, NamedTuple
 
+import numpy as np
+
 from NanoVNASaver.SITools import Format, clamp_value
 
 FMT_FREQ = Format()
@@ -96,14 +98,38 @@ def gamma_to_impedance(gamma: complex, ref_impedance: float = 50) -> complex:
         return math.inf
 
 
+def group_delay(freq: np.ndarray, phase: np.ndarray,
+                aperture: int = 2) -> np.ndarray:
+    """Group delay in seconds for every point of a sweep
+
+    Difference quotient of the unwrapped phase over aperture frequency
+    steps around each point, narrowed to one side at the ends of the
+    sweep. The default aperture of 2 is the central difference.
+    """
+    freq = np.asarray(freq)
+    count = len(freq)
+    if count < 2:
+        return np.zeros(count)
+    phase = np.unwrap(phase)
+    index = np.arange(count) - aperture // 2
+    lower = np.clip(index, 0, count - 2)
+    upper = np.clip(index + aperture, 1, count - 1)
+    delta_freq = (freq[upper] - freq[lower]).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delay = -(phase[upper] - phase[lower]) / math.tau / delta_freq
+    delay[delta_freq == 0] = 0
+    return delay
+
+
 def groupDelay(data: List[Datapoint], index: int) -> float:
+    """Group delay in seconds at index, see group_delay"""
+    if hasattr(data, "groupDelay"):  # SweepData.Trace, cached per sweep
+        return float(data.groupDelay()[index])
     idx0 = clamp_value(index - 1, 0, len(data) - 1)
     idx1 = clamp_value(index + 1, 0, len(data) - 1)
-    delta_angle = data[idx1].phase - data[idx0].phase
-    delta_freq = data[idx1].freq - data[idx0].freq
-    if delta_freq == 0:
-        return 0
-    return -delta_angle / math.tau / delta_freq
+    window = data[idx0:idx1 + 1]
+    return float(group_delay([d.freq for d in window],
+                             [d.phase for d in window])[index - idx0])
 
 
 def impedance_to_capacitance(z: complex, freq: float) -> float:
@@ -165,6 +191,8 @@ def corr_att_data(data: List[Datapoint], att: float) -> List[Datapoint]:
     if att <= 0:
         return data
     att = 10**(att / 20)
+    if hasattr(data, "scaled"):  # SweepData.Trace, already vectorized
+        return data.scaled(att)
     ndata = []
     for dp in data:
         corrected = dp.z * att
@@ -0,0 +1,73 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import logging
+import math
+from time import perf_counter
+from typing import Callable
+
+from PyQt5 import QtCore
+
+from NanoVNASaver.SweepStats import SweepStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE = 30  # refreshes per second
+
+
+class RefreshScheduler(QtCore.QObject):
+    """Coalesces bursts of refresh requests
+
+    At most one refresh per 1 / rate seconds is run from the event
+    loop. Requests arriving while a refresh is pending are merged
+    into it and counted as dropped_refreshes.
+    """
+
+    def __init__(self, refresh: Callable[[], None],
+                 rate: int = DEFAULT_RATE, stats: SweepStats = None,
+                 parent: QtCore.QObject = None):
+        super().__init__(parent)
+        self._refresh = refresh
+        self.stats = stats if stats is not None else SweepStats()
+        self.rate = DEFAULT_RATE
+        self.setRate(rate)
+        self._last = -math.inf
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def setRate(self, rate: int):
+        self.rate = max(1, rate)
+        logger.debug("Refreshing at most %d times per second", self.rate)
+
+    def pending(self) -> bool:
+        return self._timer.isActive()
+
+    def request(self):
+        if self._timer.isActive():
+            self.stats.count("dropped_refreshes")
+            return
+        wait = max(0.0, self._last + 1 / self.rate - perf_counter())
+        self._timer.start(math.ceil(wait * 1000))
+
+    def flush(self):
+        """Refreshes now, replacing a pending refresh"""
+        self._timer.stop()
+        self._last = perf_counter()
+        self.stats.count("refreshes")
+        self._refresh()
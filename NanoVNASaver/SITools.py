@@ -54,6 +54,57 @@ class Format(NamedTuple):
     parse_clamp_max: float = math.inf
 
 
+def format_value(value: Real, unit: str = "", fmt: Format = Format()) -> str:
+    """Same string as str(Value(value, unit, fmt))
+
+    Formats the float directly, without the Decimal of a Value, for
+    the many values of marker labels and chart axes.
+    """
+    value = float(value)
+    if math.isnan(value):  # let Value raise as usual
+        return str(Value(value, unit, fmt))
+    return _format(value, unit, fmt)
+
+
+def _format(value: Union[decimal.Decimal, float], unit: str, fmt: Format) -> str:
+    # Decimals of a Value are exact conversions of the float, the
+    # comparisons and conversions below give the same results for both
+    if fmt.assume_infinity and abs(value) >= 10 ** ((fmt.max_offset + 1) * 3):
+        return ("-" if value < 0 else "") + "\N{INFINITY}" + fmt.space_str + unit
+    if value < fmt.printable_min:
+        return fmt.unprintable_under + unit
+    if value > fmt.printable_max:
+        return fmt.unprintable_over + unit
+
+    if value == 0:
+        offset = 0
+    else:
+        offset = clamp_value(
+            int(math.log10(abs(value)) // 3), fmt.min_offset, fmt.max_offset)
+
+    real = float(value) / (10 ** (offset * 3))
+
+    if fmt.max_nr_digits < 3:
+        formstr = ".0f"
+    else:
+        max_digits = fmt.max_nr_digits + (
+            (1 if not fmt.fix_decimals and abs(real) < 10 else 0) +
+            (1 if not fmt.fix_decimals and abs(real) < 100 else 0))
+        formstr = "." + str(max_digits - 3) + "f"
+
+    if fmt.allways_signed:
+        formstr = "+" + formstr
+    result = format(real, formstr)
+
+    if float(result) == 0.0:
+        offset = 0
+
+    if fmt.allow_strip and "." in result:
+        result = result.rstrip("0").rstrip(".")
+
+    return result + fmt.space_str + PREFIXES[offset + 8] + unit
+
+
 class Value:
     CTX = decimal.Context(prec=60, Emin=-27, Emax=27)
 
@@ -78,41 +129,7 @@ class Value:
                 f", '{self._unit}', {self.fmt})")
 
     def __str__(self) -> str:
-        fmt = self.fmt
-        if fmt.assume_infinity and abs(self._value) >= 10 ** ((fmt.max_offset + 1) * 3):
-            return ("-" if self._value < 0 else "") + "\N{INFINITY}" + fmt.space_str + self._unit
-        if self._value < fmt.printable_min:
-            return fmt.unprintable_under + self._unit
-        if self._value > fmt.printable_max:
-            return fmt.unprintable_over + self._unit
-
-        if self._value == 0:
-            offset = 0
-        else:
-            offset = clamp_value(
-                int(math.log10(abs(self._value)) // 3), fmt.min_offset, fmt.max_offset)
-
-        real = float(self._value) / (10 ** (offset * 3))
-
-        if fmt.max_nr_digits < 3:
-            formstr = ".0f"
-        else:
-            max_digits = fmt.max_nr_digits + (
-                (1 if not fmt.fix_decimals and abs(real) < 10 else 0) +
-                (1 if not fmt.fix_decimals and abs(real) < 100 else 0))
-            formstr = "." + str(max_digits - 3) + "f"
-
-        if self.fmt.allways_signed:
-            formstr = "+" + formstr
-        result = format(real, formstr)
-
-        if float(result) == 0.0:
-            offset = 0
-
-        if self.fmt.allow_strip and "." in result:
-            result = result.rstrip("0").rstrip(".")
-
-        return result + fmt.space_str + PREFIXES[offset + 8] + self._unit
+        return _format(self._value, self._unit, self.fmt)
 
     def __int__(self):
         return round(self._value)
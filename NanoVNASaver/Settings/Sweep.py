@@ -29,22 +29,36 @@ class SweepMode(Enum):
     SINGLE = 0
     CONTINOUS = 1
     AVERAGE = 2
+    RUNNING_AVERAGE = 3
+
+
+class Estimator(Enum):
+    """How the samples of an averaged sweep are combined"""
+    MEAN = 0  # mean after dropping the samples farthest from the mean
+    MEDIAN = 1
+    TRIMMED_MEAN = 2  # mean after dropping the samples farthest from median
+    SIGMA_CLIP = 3  # mean of the samples within 2 sigma of the mean
 
 
 class Properties():
     def __init__(self, name: str = "",
                  mode: 'SweepMode' = SweepMode.SINGLE,
                  averages: Tuple[int, int] = (3, 0),
-                 logarithmic: bool = False):
+                 logarithmic: bool = False,
+                 estimator: 'Estimator' = Estimator.MEAN,
+                 running: Tuple[int, bool] = (8, False)):
         self.name = name
         self.mode = mode
         self.averages = averages
         self.logarithmic = logarithmic
+        self.estimator = estimator
+        # window and exponential weighting of the running average
+        self.running = running
 
     def __repr__(self):
         return (
             f"Properties('{self.name}', {self.mode}, {self.averages},"
-            f" {self.logarithmic})")
+            f" {self.logarithmic}, {self.estimator}, {self.running})")
 
 
 class Sweep():
@@ -0,0 +1,266 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import itertools
+import logging
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from operator import itemgetter
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+
+from NanoVNASaver.RFTools import Datapoint, group_delay
+from NanoVNASaver.Settings.Sweep import Sweep
+
+logger = logging.getLogger(__name__)
+
+_versions = itertools.count(1)
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+class Trace(Sequence):
+    """Immutable, list like view of one s-parameter of a sweep
+
+    Behaves like a List[Datapoint] for existing consumers, but keeps the
+    values in contiguous numpy arrays. Derived columns are calculated
+    vectorized on first access and cached for the lifetime of the trace,
+    keyed by quantity and reference impedance. A published trace is
+    shared by all charts, markers and analyses of a snapshot, so each
+    column is calculated once per snapshot.
+    """
+
+    def __init__(self, freq: np.ndarray, z: np.ndarray):
+        self.freq = _readonly(np.asarray(freq, dtype=np.int64))
+        self.z = _readonly(np.asarray(z, dtype=np.complex128))
+        if self.freq.shape != self.z.shape:
+            raise ValueError("frequency and value length differ")
+        self._cache = {}
+
+    @classmethod
+    def from_datapoints(cls, data: Iterable[Datapoint]) -> 'Trace':
+        if isinstance(data, Trace):
+            return data
+        data = list(data)
+        freq = np.fromiter(map(itemgetter(0), data), np.int64, len(data))
+        re = np.fromiter(map(itemgetter(1), data), np.float64, len(data))
+        im = np.fromiter(map(itemgetter(2), data), np.float64, len(data))
+        return cls(freq, re + 1j * im)
+
+    def __len__(self) -> int:
+        return len(self.freq)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index == slice(None):  # immutable, no need to copy
+                return self
+            return Trace(self.freq[index], self.z[index])
+        z = self.z[index]
+        return Datapoint(int(self.freq[index]), float(z.real), float(z.imag))
+
+    def __iter__(self) -> Iterator[Datapoint]:
+        return map(Datapoint._make, zip(self.freq.tolist(),
+                                        self.z.real.tolist(),
+                                        self.z.imag.tolist()))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Trace):
+            return (np.array_equal(self.freq, other.freq) and
+                    np.array_equal(self.z, other.z))
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Trace({len(self)} points)"
+
+    def _cached(self, key, calc: Callable[[], np.ndarray]) -> np.ndarray:
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = _readonly(calc())
+            return value
+
+    def scaled(self, factor: float) -> 'Trace':
+        return Trace(self.freq, self.z * factor)
+
+    @property
+    def re(self) -> np.ndarray:
+        return self.z.real
+
+    @property
+    def im(self) -> np.ndarray:
+        return self.z.imag
+
+    @property
+    def mag(self) -> np.ndarray:
+        # hypot rounds like abs() of a Datapoint, np.abs may differ
+        # in the last digit and move e.g. the rounded up VSWR scale
+        return self._cached("mag", lambda: np.hypot(self.re, self.im))
+
+    @property
+    def phase(self) -> np.ndarray:
+        return self._cached("phase", lambda: np.angle(self.z))
+
+    @property
+    def gain(self) -> np.ndarray:
+        def calc():
+            with np.errstate(divide="ignore"):
+                return 20 * np.log10(self.mag)
+        return self._cached("gain", calc)
+
+    @property
+    def vswr(self) -> np.ndarray:
+        def calc():
+            mag = self.mag
+            with np.errstate(divide="ignore", invalid="ignore"):
+                vswr = (1 + mag) / (1 - mag)
+            vswr[mag == 1] = 1
+            return vswr
+        return self._cached("vswr", calc)
+
+    def impedance(self, ref_impedance: float = 50) -> np.ndarray:
+        def calc():
+            z = self.z
+            with np.errstate(divide="ignore", invalid="ignore"):
+                imp = ((-z - 1) / (z - 1)) * ref_impedance
+            imp[z == 1] = np.inf
+            return imp
+        return self._cached(("impedance", ref_impedance), calc)
+
+    def shuntImpedance(self, ref_impedance: float = 50) -> np.ndarray:
+        def calc():
+            z = self.z
+            with np.errstate(divide="ignore", invalid="ignore"):
+                imp = 0.5 * ref_impedance * z / (1 - z)
+            imp[z == 1] = np.inf
+            return imp
+        return self._cached(("shuntImpedance", ref_impedance), calc)
+
+    def seriesImpedance(self, ref_impedance: float = 50) -> np.ndarray:
+        def calc():
+            z = self.z
+            with np.errstate(divide="ignore", invalid="ignore"):
+                imp = 2 * ref_impedance * (1 - z) / z
+            imp[z == 0] = np.inf
+            return imp
+        return self._cached(("seriesImpedance", ref_impedance), calc)
+
+    def qFactor(self, ref_impedance: float = 50) -> np.ndarray:
+        def calc():
+            imp = self.impedance(ref_impedance)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                q = np.abs(imp.imag / imp.real)
+            q[imp.real == 0] = -1
+            return q
+        return self._cached(("qFactor", ref_impedance), calc)
+
+    def capacitiveEquivalent(self, ref_impedance: float = 50) -> np.ndarray:
+        def calc():
+            imag = self.impedance(ref_impedance).imag
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cap = -(1 / (self.freq * 2 * math.pi * imag))
+            cap[imag == 0] = np.inf
+            cap[self.freq == 0] = -np.inf
+            return cap
+        return self._cached(("capacitiveEquivalent", ref_impedance), calc)
+
+    def inductiveEquivalent(self, ref_impedance: float = 50) -> np.ndarray:
+        def calc():
+            imag = self.impedance(ref_impedance).imag
+            with np.errstate(divide="ignore", invalid="ignore"):
+                ind = imag * 1 / (self.freq * 2 * math.pi)
+            ind[self.freq == 0] = 0
+            return ind
+        return self._cached(("inductiveEquivalent", ref_impedance), calc)
+
+    def groupDelay(self, aperture: int = 2) -> np.ndarray:
+        return self._cached(("groupDelay", aperture), lambda: group_delay(
+            self.freq, self.phase, aperture))
+
+
+class SweepData:
+    """Columnar storage of the s11 and s21 values of a (segmented) sweep"""
+
+    def __init__(self, freq: Iterable[int] = (),
+                 s11: Iterable[complex] = None,
+                 s21: Iterable[complex] = None):
+        self.freq = np.array(freq, dtype=np.int64)
+        self.s11 = self._column(s11)
+        self.s21 = self._column(s21)
+        self._traces = {}
+
+    def _column(self, values: Iterable[complex]) -> np.ndarray:
+        if values is None:
+            return np.zeros(len(self.freq), dtype=np.complex128)
+        column = np.array(values, dtype=np.complex128)
+        if column.shape != self.freq.shape:
+            raise ValueError("frequency and value length differ")
+        return column
+
+    @classmethod
+    def from_sweep(cls, sweep: Sweep) -> 'SweepData':
+        return cls(np.fromiter(sweep.get_frequencies(), dtype=np.int64,
+                               count=sweep.points * sweep.segments))
+
+    def __len__(self) -> int:
+        return len(self.freq)
+
+    def copy(self) -> 'SweepData':
+        return SweepData(self.freq, self.s11, self.s21)
+
+    def update(self, offset: int, other: 'SweepData'):
+        """Overwrite the values starting at offset with the ones of other"""
+        end = offset + len(other)
+        self.freq[offset:end] = other.freq
+        self.s11[offset:end] = other.s11
+        self.s21[offset:end] = other.s21
+        self._traces.clear()
+
+    def trace(self, name: str) -> Trace:
+        """Returns an immutable copy of s11 or s21 for publishing
+
+        The trace is created once per update, so derived columns
+        are only calculated once, however many consumers use them.
+        """
+        if name not in self._traces:
+            values = {"11": self.s11, "21": self.s21}[name]
+            self._traces[name] = Trace(self.freq.copy(), values.copy())
+        return self._traces[name]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Immutable, versioned state of the published sweep data
+
+    A new snapshot is published per update by swapping one reference,
+    so readers get a consistent s11/s21 pair without locking. Versions
+    only increase, a reader can compare it with the one last rendered.
+    """
+    s11: Trace = field(default_factory=lambda: Trace((), ()))
+    s21: Trace = field(default_factory=lambda: Trace((), ()))
+    source: str = ""
+    version: int = field(default_factory=lambda: next(_versions))
@@ -0,0 +1,154 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from time import perf_counter, time
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# histogram bucket upper bounds in s, doubling from 0.1ms to ~13s
+BUCKET_BOUNDS = tuple(1e-4 * 2 ** i for i in range(18))
+
+
+class Histogram:
+    """Count, sum and logarithmic distribution of durations"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q quantile"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "buckets": dict(zip(
+                [f"{b * 1000:g}ms" for b in BUCKET_BOUNDS] + ["inf"],
+                self.buckets)),
+        }
+
+
+class SweepStats:
+    """Runtime switchable timing and counters of the sweep stages
+
+    While disabled timer() hands out a shared null context and count()
+    returns immediately, so the instrumentation can stay in place.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {}
+        self.counters = Counter()
+        self.started = time()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = Counter()
+            self.started = time()
+
+    def add_time(self, stage: str, seconds: float):
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = Histogram()
+            self.stages[stage].add(seconds)
+
+    @contextmanager
+    def _timer(self, stage: str):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, perf_counter() - start)
+
+    def timer(self, stage: str):
+        if not self.enabled:
+            return nullcontext()
+        return self._timer(stage)
+
+    def count(self, name: str, value: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "started": self.started,
+                "elapsed": time() - self.started,
+                "stages": {name: hist.as_dict()
+                           for name, hist in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+
+    def save(self, filename: str):
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def report(self) -> List[str]:
+        """The snapshot as lines of a text table"""
+        snapshot = self.snapshot()
+        lines = [f"{'stage':20} {'count':>7} {'total s':>9} {'mean ms':>9}"
+                 f" {'p90 ms':>9} {'max ms':>9}"]
+        for name, stage in snapshot["stages"].items():
+            lines.append(
+                f"{name:20} {stage['count']:7} {stage['total']:9.3f}"
+                f" {stage['mean'] * 1000:9.2f} {stage['p90'] * 1000:9.2f}"
+                f" {stage['max'] * 1000:9.2f}")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name:20} {value:7}")
+        return lines
@@ -17,35 +17,139 @@
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
-from time import sleep
+import queue
+import threading
+from time import perf_counter, sleep
 from typing import List, Tuple
 
 import numpy as np
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtCore import pyqtSlot, pyqtSignal
 
-from NanoVNASaver.Calibration import correct_delay
-from NanoVNASaver.RFTools import Datapoint
-from NanoVNASaver.Settings.Sweep import Sweep, SweepMode
+from NanoVNASaver.Calibration import correct_delay_batch
+from NanoVNASaver.Settings.Sweep import Estimator, Sweep, SweepMode
+from NanoVNASaver.SweepData import SweepData
+from NanoVNASaver.SweepStats import SweepStats
 
 logger = logging.getLogger(__name__)
 
+# number of read segments waiting for calibration and publishing
+PIPELINE_DEPTH = 2
+# sigma clipping limit and maximum number of clipping rounds
+SIGMA_CLIP = 2.0
+SIGMA_CLIP_ROUNDS = 3
 
-def truncate(values: List[List[Tuple]], count: int) -> List[List[Tuple]]:
-    """truncate drops extrema from data list if averaging is active"""
+
+def _drop_farthest(values: np.ndarray, center: np.ndarray,
+                   count: int) -> np.ndarray:
+    """Drops the count samples per point farthest from center
+
+    values is an (averages x points) array, the kept samples are
+    returned in unspecified order.
+    """
     keep = len(values) - count
-    logger.debug("Truncating from %d values to %d", len(values), keep)
     if count < 1 or keep < 1:
         logger.info("Not doing illegal truncate")
         return values
-    truncated = []
-    for valueset in np.swapaxes(values, 0, 1).tolist():
-        avg = complex(*np.average(valueset, 0))
-        truncated.append(
-            sorted(valueset,
-                   key=lambda v, a=avg:
-                   abs(a - complex(*v)))[:keep])
-    return np.swapaxes(truncated, 0, 1).tolist()
+    distance = np.abs(values - center)
+    order = np.argpartition(distance, keep - 1, axis=0)[:keep]
+    return np.take_along_axis(values, order, 0)
+
+
+def truncate(values: List[np.ndarray], count: int) -> np.ndarray:
+    """truncate drops extrema from data list if averaging is active"""
+    values = np.asarray(values)
+    logger.debug("Truncating from %d values by %d", len(values), count)
+    return _drop_farthest(values, values.mean(0), count)
+
+
+def median(values: np.ndarray) -> np.ndarray:
+    """Median of real and imaginary part per point"""
+    return (np.median(values.real, 0) +
+            1j * np.median(values.imag, 0))
+
+
+def trimmed_mean(values: np.ndarray, count: int) -> np.ndarray:
+    return _drop_farthest(values, median(values), count).mean(0)
+
+
+def sigma_clip(values: np.ndarray, sigma: float = SIGMA_CLIP,
+               rounds: int = SIGMA_CLIP_ROUNDS) -> np.ndarray:
+    """Mean per point of the samples within sigma deviations of the mean
+
+    The deviation is the rms distance of the kept samples from their
+    mean, the sample closest to the mean is always kept.
+    """
+    mask = np.ones(values.shape, dtype=bool)
+    mean = values.mean(0)
+    for _ in range(rounds):
+        distance = np.abs(values - mean)
+        std = np.sqrt((distance ** 2 * mask).sum(0) / mask.sum(0))
+        clipped = distance <= sigma * std
+        if np.array_equal(clipped, mask):
+            break
+        mask = clipped
+        mean = (values * mask).sum(0) / mask.sum(0)
+    return mean
+
+
+def average(values: np.ndarray, estimator: 'Estimator' = Estimator.MEAN,
+            count: int = 0) -> np.ndarray:
+    """Combines (averages x points) samples to one value per point
+
+    count is the number of samples dropped per point for the mean
+    and the trimmed mean.
+    """
+    values = np.asarray(values)
+    if len(values) == 1:
+        return values[0]
+    if estimator == Estimator.MEDIAN:
+        return median(values)
+    if estimator == Estimator.SIGMA_CLIP:
+        return sigma_clip(values)
+    if count < 1:  # nothing to drop
+        return values.mean(0)
+    if estimator == Estimator.TRIMMED_MEAN:
+        return trimmed_mean(values, count)
+    return truncate(values, count).mean(0)
+
+
+class RunningAverage:
+    """Rolling average over the last reads of one segment
+
+    The moving average is the mean of the last window reads, the
+    exponential one weights a read by 2 / (window + 1). Until window
+    reads are available both are the plain mean of the reads so far.
+    Failed reads, empty or with another number of points, are passed
+    on unaveraged and leave the average as it is.
+    """
+
+    def __init__(self, window: int, exponential: bool = False):
+        self.window = max(1, window)
+        self.exponential = exponential
+        self.count = 0
+        self._samples = None
+        self._average = None
+
+    def add(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=complex)
+        if len(values) == 0 or (self._average is not None and
+                                self._average.shape != values.shape):
+            logger.debug("Not averaging a read of %d points", len(values))
+            return values
+        self.count += 1
+        if self.exponential:
+            if self.count == 1:
+                self._average = values.copy()
+            else:
+                weight = max(1 / self.count, 2 / (self.window + 1))
+                self._average += weight * (values - self._average)
+            return self._average.copy()
+        if self.count == 1:
+            self._samples = np.empty((self.window, len(values)), complex)
+        self._samples[(self.count - 1) % self.window] = values
+        self._average = self._samples[:min(self.count, self.window)].mean(0)
+        return self._average
 
 
 class WorkerSignals(QtCore.QObject):
@@ -55,6 +159,14 @@ class WorkerSignals(QtCore.QObject):
 
 
 class SweepWorker(QtCore.QRunnable):
+    """Reads the sweep from the device
+
+    Segments are calibrated and published by a processing thread while
+    the next one is read. data, rawData and offsetDelay are shared with
+    the GUI thread and only changed holding lock, the GUI changes them
+    through setOffsetDelay and recalibrate.
+    """
+
     def __init__(self, app: QtWidgets.QWidget):
         super().__init__()
         logger.info("Initializing SweepWorker")
@@ -62,16 +174,19 @@ class SweepWorker(QtCore.QRunnable):
         self.app = app
         self.sweep = Sweep()
         self.setAutoDelete(False)
+        self.lock = threading.Lock()
         self.percentage = 0
-        self.data11: List[Datapoint] = []
-        self.data21: List[Datapoint] = []
-        self.rawData11: List[Datapoint] = []
-        self.rawData21: List[Datapoint] = []
+        self.data = SweepData()
+        self.rawData = SweepData()
         self.init_data()
         self.stopped = False
         self.running = False
         self.error_message = ""
         self.offsetDelay = 0
+        self._pipeline_error = None
+        self.stats = SweepStats()
+        self._running_average = {}
+        self._running_config = None
 
     @pyqtSlot()
     def run(self):
@@ -104,27 +219,55 @@ class SweepWorker(QtCore.QRunnable):
 
         if sweep != self.sweep:  # parameters changed
             self.sweep = sweep
-            self.init_data()
-
-        while True:
-            for i in range(sweep.segments):
-                logger.debug("Sweep segment no %d", i)
-                if self.stopped:
-                    logger.debug("Stopping sweeping as signalled")
-                    break
-                start, stop = sweep.get_index_range(i)
-
-                try:
-                    freq, values11, values21 = self.readAveragedSegment(
-                        start, stop, averages)
-                    self.percentage = (i + 1) * 100 / sweep.segments
-                    self.updateData(freq, values11, values21, i)
-                except ValueError as e:
-                    self.gui_error(str(e))
-            else:
-                if sweep.properties.mode == SweepMode.CONTINOUS:
-                    continue
-            break
+            with self.lock:
+                self.init_data()
+        if sweep.properties.running != self._running_config:
+            self._running_config = sweep.properties.running
+            self._running_average = {}
+
+        # The device is read in this thread while the segments read
+        # before are calibrated and published by the processing thread
+        started = perf_counter()
+        self._pipeline_error = None
+        segments = queue.Queue(maxsize=PIPELINE_DEPTH)
+        processor = threading.Thread(
+            target=self._process_segments, args=(segments,),
+            name="SweepProcessor", daemon=True)
+        processor.start()
+        try:
+            while True:
+                for i in range(sweep.segments):
+                    logger.debug("Sweep segment no %d", i)
+                    if self.stopped:
+                        logger.debug("Stopping sweeping as signalled")
+                        break
+                    if not processor.is_alive():
+                        break
+                    start, stop = sweep.get_index_range(i)
+
+                    try:
+                        freq, values11, values21 = self.readAveragedSegment(
+                            start, stop, averages)
+                        if sweep.properties.mode == SweepMode.RUNNING_AVERAGE:
+                            values11, values21 = self.runningAverage(
+                                i, values11, values21)
+                        self.percentage = (i + 1) * 100 / sweep.segments
+                        self._queue_segment(
+                            segments, processor,
+                            (freq, values11, values21, i))
+                    except ValueError as e:
+                        self.gui_error(str(e))
+                else:
+                    if sweep.properties.mode in (SweepMode.CONTINOUS,
+                                                 SweepMode.RUNNING_AVERAGE):
+                        continue
+                break
+        finally:
+            # let the processing thread publish what is already read
+            self._queue_segment(segments, processor, None)
+            processor.join()
+        if self._pipeline_error is not None:
+            raise self._pipeline_error
 
         if sweep.segments > 1:
             start = sweep.start
@@ -133,83 +276,120 @@ class SweepWorker(QtCore.QRunnable):
                          start, end)
             self.app.vna.resetSweep(start, end)
 
+        if self.stats.enabled:
+            self.stats.add_time("sweep", perf_counter() - started)
         self.percentage = 100
         logger.debug('Sending "finished" signal')
         self.signals.finished.emit()
         self.running = False
 
+    @staticmethod
+    def _queue_segment(segments: queue.Queue,
+                       processor: threading.Thread, segment):
+        while processor.is_alive():
+            try:
+                segments.put(segment, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _process_segments(self, segments: queue.Queue):
+        while True:
+            segment = segments.get()
+            if segment is None:
+                return
+            try:
+                self.updateData(*segment)
+            except ValueError as e:
+                self.gui_error(str(e))
+            except BaseException as exc:  # pylint: disable=broad-except
+                self._pipeline_error = exc
+                return
+
     def init_data(self):
-        self.data11 = []
-        self.data21 = []
-        self.rawData11 = []
-        self.rawData21 = []
-        for freq in self.sweep.get_frequencies():
-            self.data11.append(Datapoint(freq, 0.0, 0.0))
-            self.data21.append(Datapoint(freq, 0.0, 0.0))
-            self.rawData11.append(Datapoint(freq, 0.0, 0.0))
-            self.rawData21.append(Datapoint(freq, 0.0, 0.0))
-        logger.debug("Init data length: %s", len(self.data11))
+        self.data = SweepData.from_sweep(self.sweep)
+        self.rawData = self.data.copy()
+        self._running_average = {}
+        logger.debug("Init data length: %s", len(self.data))
+
+    def runningAverage(self, index: int, values11: np.ndarray,
+                       values21: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Adds a read of segment index to its running averages"""
+        if index not in self._running_average:
+            window, exponential = self._running_config
+            self._running_average[index] = (
+                RunningAverage(window, exponential),
+                RunningAverage(window, exponential))
+        average11, average21 = self._running_average[index]
+        return average11.add(values11), average21.add(values21)
 
     def updateData(self, frequencies, values11, values21, index):
+        with self.stats.timer("updateData"):
+            self._updateData(frequencies, values11, values21, index)
+        self.stats.count("segments")
+        self.stats.count("points", len(frequencies))
+
+    def _updateData(self, frequencies, values11, values21, index):
         # Update the data from (i*101) to (i+1)*101
         logger.debug(
             "Calculating data and inserting in existing data at index %d",
             index)
         offset = self.sweep.points * index
-        v11 = values11[:]
-        v21 = values21[:]
-        raw_data11 = []
-        raw_data21 = []
-
-        for freq in frequencies:
-            real11, imag11 = v11.pop(0)
-            real21, imag21 = v21.pop(0)
-            raw_data11.append(Datapoint(freq, real11, imag11))
-            raw_data21.append(Datapoint(freq, real21, imag21))
-
-        data11, data21 = self.applyCalibration(raw_data11, raw_data21)
-        logger.debug("update Freqs: %s, Offset: %s", len(frequencies), offset)
-        for i in range(len(frequencies)):
-            self.data11[offset + i] = data11[i]
-            self.data21[offset + i] = data21[i]
-            self.rawData11[offset + i] = raw_data11[i]
-            self.rawData21[offset + i] = raw_data21[i]
-
-        logger.debug("Saving data to application (%d and %d points)",
-                     len(self.data11), len(self.data21))
-        self.app.saveData(self.data11, self.data21)
+
+        raw_data = SweepData(frequencies, values11, values21)
+        # calibrated and published as one step, so a recalibration from
+        # the GUI can not be overwritten by a segment calibrated before
+        with self.lock:
+            data = self.applyCalibration(raw_data)
+            logger.debug("update Freqs: %s, Offset: %s",
+                         len(frequencies), offset)
+            self.data.update(offset, data)
+            self.rawData.update(offset, raw_data)
+
+            logger.debug("Saving data to application (%d points)",
+                         len(self.data))
+            self.app.saveData(self.data.trace("11"), self.data.trace("21"))
         logger.debug('Sending "updated" signal')
         self.signals.updated.emit()
 
-    def applyCalibration(self,
-                         raw_data11: List[Datapoint],
-                         raw_data21: List[Datapoint]
-                         ) -> Tuple[List[Datapoint], List[Datapoint]]:
+    def setOffsetDelay(self, delay: float):
+        with self.lock:
+            self.offsetDelay = delay
+        self.recalibrate()
+
+    def recalibrate(self):
+        """Applies the current calibration to the last sweep read"""
+        with self.lock:
+            if len(self.rawData) == 0:
+                return
+            logger.debug("Applying calibration to existing sweep data.")
+            self.data = self.applyCalibration(self.rawData)
+            logger.debug("Saving and displaying corrected data.")
+            self.app.saveData(self.data.trace("11"), self.data.trace("21"),
+                              self.app.sweepSource)
+        self.signals.updated.emit()
 
-        data11: List[Datapoint] = []
-        data21: List[Datapoint] = []
+    def applyCalibration(self, raw_data: SweepData) -> SweepData:
+        with self.stats.timer("applyCalibration"):
+            return self._applyCalibration(raw_data)
 
-        if not self.app.calibration.isCalculated:
-            data11 = raw_data11.copy()
-            data21 = raw_data21.copy()
-        else:
-            if self.app.calibration.isValid1Port():
-                for dp in raw_data11:
-                    data11.append(self.app.calibration.correct11(dp))
-            else:
-                data11 = raw_data11.copy()
+    def _applyCalibration(self, raw_data: SweepData) -> SweepData:
+        freq = raw_data.freq
+        data11 = raw_data.s11
+        data21 = raw_data.s21
 
+        if self.app.calibration.isCalculated:
+            if self.app.calibration.isValid1Port():
+                data11 = self.app.calibration.correct11_batch(freq, data11)
             if self.app.calibration.isValid2Port():
-                for dp in raw_data21:
-                    data21.append(self.app.calibration.correct21(dp))
-            else:
-                data21 = raw_data21.copy()
+                data21 = self.app.calibration.correct21_batch(freq, data21)
 
         if self.offsetDelay != 0:
-            data11 = [correct_delay(dp, self.offsetDelay, reflect=True) for dp in data11]
-            data21 = [correct_delay(dp, self.offsetDelay) for dp in data21]
+            data11 = correct_delay_batch(
+                freq, data11, self.offsetDelay, reflect=True)
+            data21 = correct_delay_batch(freq, data21, self.offsetDelay)
 
-        return data11, data21
+        return SweepData(freq, data11, data21)
 
     def readAveragedSegment(self, start, stop, averages=1):
         values11 = []
@@ -227,13 +407,14 @@ class SweepWorker(QtCore.QRunnable):
             logger.debug("Reading average no %d / %d", i + 1, averages)
             retry = 0
             tmp11 = []
-            while not tmp11 and retry < 5:
+            while len(tmp11) == 0 and retry < 5:
                 sleep(0.5 * retry)
                 retry += 1
                 freq, tmp11, tmp21 = self.readSegment(start, stop)
                 if retry > 1:
                     logger.error("retry %s readSegment(%s,%s)",
                                  retry, start, stop)
+                    self.stats.count("segment_retries")
                     sleep(0.5)
             values11.append(tmp11)
             values21.append(tmp21)
@@ -243,20 +424,26 @@ class SweepWorker(QtCore.QRunnable):
         if not values11:
             raise IOError("Invalid data during swwep")
 
+        estimator = self.sweep.properties.estimator
         truncates = self.sweep.properties.averages[1]
-        if truncates > 0 and averages > 1:
-            logger.debug("Truncating %d values by %d",
-                         len(values11), truncates)
-            values11 = truncate(values11, truncates)
-            values21 = truncate(values21, truncates)
-
-        logger.debug("Averaging %d values", len(values11))
-        values11 = np.average(values11, 0).tolist()
-        values21 = np.average(values21, 0).tolist()
+        logger.debug("Averaging %d values (%s)", len(values11), estimator)
+        values11 = average(values11, estimator, truncates)
+        values21 = average(values21, estimator, truncates)
 
         return freq, values11, values21
 
     def readSegment(self, start, stop):
+        if not self.stats.enabled:
+            return self._readSegment(start, stop)
+        serial = self.app.vna.serial
+        bytes_in, bytes_out = serial.bytes_in, serial.bytes_out
+        with self.stats.timer("readSegment"):
+            result = self._readSegment(start, stop)
+        self.stats.count("serial_bytes_in", serial.bytes_in - bytes_in)
+        self.stats.count("serial_bytes_out", serial.bytes_out - bytes_out)
+        return result
+
+    def _readSegment(self, start, stop):
         logger.debug("Setting sweep range to %d to %d", start, stop)
         self.app.vna.setSweep(start, stop)
 
@@ -269,39 +456,44 @@ class SweepWorker(QtCore.QRunnable):
             return [], [], []
         return frequencies, values11, values21
 
-    def readData(self, data):
+    def readData(self, data) -> np.ndarray:
+        with self.stats.timer("readData"):
+            return self._readData(data)
+
+    def _readData(self, data) -> np.ndarray:
         logger.debug("Reading %s", data)
         done = False
         returndata = []
         count = 0
         while not done:
             done = True
-            returndata = []
-            tmpdata = self.app.vna.readValues(data)
-            logger.debug("Read %d values", len(tmpdata))
-            for d in tmpdata:
-                a, b = d.split(" ")
-                try:
-                    if self.app.vna.validateInput and (
-                            abs(float(a)) > 9.5 or
-                            abs(float(b)) > 9.5):
+            try:
+                returndata = self.app.vna.readComplexValues(data)
+                logger.debug("Read %d values", len(returndata))
+                if self.app.vna.validateInput:
+                    implausible = np.flatnonzero(
+                        (np.abs(returndata.real) > 9.5) |
+                        (np.abs(returndata.imag) > 9.5) |
+                        ~np.isfinite(returndata))
+                    if len(implausible):
                         logger.warning(
-                            "Got a non plausible data value: (%s)", d)
+                            "Got a non plausible data value: (%s)",
+                            returndata[implausible[0]])
                         done = False
-                        break
-                    returndata.append((float(a), float(b)))
-                except ValueError as exc:
-                    logger.exception("An exception occurred reading %s: %s",
-                                     data, exc)
-                    done = False
+            except ValueError as exc:
+                logger.exception("An exception occurred reading %s: %s",
+                                 data, exc)
+                done = False
             if not done:
                 logger.debug("Re-reading %s", data)
+                self.stats.count("data_retries")
                 sleep(0.2)
                 count += 1
                 if count == 5:
                     logger.error("Tried and failed to read %s %d times.",
                                  data, count)
                     logger.debug("trying to reconnect")
+                    self.stats.count("reconnects")
                     self.app.vna.reconnect()
                 if count >= 10:
                     logger.critical(
@@ -22,11 +22,13 @@ import cmath
 import io
 from operator import attrgetter
 
-from typing import List
+from typing import Iterable, List, TextIO, Tuple
 
+import numpy as np
 from scipy.interpolate import interp1d
 
 from NanoVNASaver.RFTools import Datapoint
+from NanoVNASaver.SweepData import Trace
 
 logger = logging.getLogger(__name__)
 
@@ -218,76 +220,175 @@ class Touchstone:
             logger.exception("Failed to parse %s: %s", self.filename, e)
 
     def _loads(self, s: str):
-        need_reorder = False
         with io.StringIO(s) as file:
             opts_line = self._parse_comments(file)
             self.opts.parse(opts_line)
+            lines = file.read().splitlines()
+        if not self._loads_bulk(lines):
+            self._loads_lines(lines)
+
+    def _loads_bulk(self, lines: List[str]) -> bool:
+        """Parses the data lines with numpy in one go
+
+        Returns False without touching the data if the input needs
+        the line by line parser, e.g. for inline comments or
+        malformed lines, which get reported there.
+        """
+        lines = list(filter(None, map(str.strip, lines)))
+        start = 0
+        while start < len(lines) and lines[start].startswith("!"):
+            start += 1
+        if any("!" in line for line in lines[start:]):
+            return False
+        rows = list(map(str.split, lines[start:]))
+        if not rows:
+            self._add_comments(lines[:start])
+            return True
+        row_len = len(rows[0])
+        if (row_len < 3 or row_len % 2 == 0 or
+                (row_len - 1) // 2 > len(self.sdata) or
+                any(len(row) != row_len for row in rows)):
+            return False
+        try:
+            values = np.array(rows, dtype=np.float64)
+        except ValueError:
+            return False
+
+        self._add_comments(lines[:start])
+        freq = np.round(values[:, 0] * self.opts.factor).astype(np.int64)
+        pairs = values[:, 1:]
+        first, second = pairs[:, 0::2], pairs[:, 1::2]
+        if self.opts.format == "ri":
+            re, im = first, second
+        else:
+            mag = first if self.opts.format == "ma" else 10 ** (first / 20)
+            angle = np.radians(second)
+            re, im = mag * np.cos(angle), mag * np.sin(angle)
+
+        # consistency checks
+        unordered = np.flatnonzero(
+            freq <= np.concatenate(([0], freq[:-1])))
+        for i in unordered.tolist():
+            logger.warning("Frequency not ascending: %s", lines[start + i])
+
+        freqs = freq.tolist()
+        for i, datalist in enumerate(self.sdata[:re.shape[1]]):
+            datalist.extend(map(Datapoint._make, zip(
+                freqs, re[:, i].tolist(), im[:, i].tolist())))
+        if len(unordered):
+            self._reorder()
+        return True
+
+    def _add_comments(self, lines: Iterable[str]):
+        for line in lines:
+            logger.warning("Comment after header: %s", line)
+            self.comments.append(line)
+
+    def _reorder(self):
+        logger.warning("Reordering data")
+        for datalist in self.sdata:
+            datalist.sort(key=attrgetter("freq"))
+
+    def _loads_lines(self, lines: Iterable[str]):
+        need_reorder = False
+        prev_freq = 0.0
+        prev_len = 0
+        for line in lines:
+            line = line.strip()
+            # ignore empty lines (even if not specified)
+            if line == "":
+                continue
+            # accept comment lines after header
+            if line.startswith("!"):
+                self._add_comments((line, ))
+                continue
 
-            prev_freq = 0.0
-            prev_len = 0
-            for line in file:
-                line = line.strip()
-                # ignore empty lines (even if not specified)
-                if line == "":
-                    continue
-                # accept comment lines after header
-                if line.startswith("!"):
-                    logger.warning("Comment after header: %s", line)
-                    self.comments.append(line)
-                    continue
-
-                # ignore comments at data end
-                data = line.split('!')[0]
-                data = data.split()
-                freq, data = round(float(data[0]) * self.opts.factor), data[1:]
-                data_len = len(data)
-
-                # consistency checks
-                if freq <= prev_freq:
-                    logger.warning("Frequency not ascending: %s", line)
-                    need_reorder = True
-                prev_freq = freq
-
-                if prev_len == 0:
-                    prev_len = data_len
-                    if data_len % 2:
-                        raise TypeError("Data values aren't pairs: " + line)
-                elif data_len != prev_len:
-                    raise TypeError("Inconsistent number of pairs: " + line)
-
-                self._append_line_data(freq, data)
-            if need_reorder:
-                logger.warning("Reordering data")
-                for datalist in self.sdata:
-                    datalist.sort(key=attrgetter("freq"))
-
-    def save(self, nr_params: int = 1):
+            # ignore comments at data end
+            data = line.split('!')[0]
+            data = data.split()
+            freq, data = round(float(data[0]) * self.opts.factor), data[1:]
+            data_len = len(data)
+
+            # consistency checks
+            if freq <= prev_freq:
+                logger.warning("Frequency not ascending: %s", line)
+                need_reorder = True
+            prev_freq = freq
+
+            if prev_len == 0:
+                prev_len = data_len
+                if data_len % 2:
+                    raise TypeError("Data values aren't pairs: " + line)
+            elif data_len != prev_len:
+                raise TypeError("Inconsistent number of pairs: " + line)
+
+            self._append_line_data(freq, data)
+        if need_reorder:
+            self._reorder()
+
+    def save(self, nr_params: int = 1, opts: Options = None):
         """Save touchstone data to file.
 
         Args:
             nr_params: Number of s-parameters. 2 for s1p, 4 for s2p
+            opts: Options for the written data, defaults to HZ S RI R 50
         """
 
         logger.info("Attempting to open file %s for writing",
                     self.filename)
         with open(self.filename, "w") as outfile:
-            outfile.write(self.saves(nr_params))
+            self.write(outfile, nr_params, opts)
 
-    def saves(self, nr_params: int = 1) -> str:
+    def saves(self, nr_params: int = 1, opts: Options = None) -> str:
         """Returns touchstone data as string.
 
         Args:
             nr_params: Number of s-parameters. 1 for s1p, 4 for s2p
+            opts: Options for the written data, defaults to HZ S RI R 50
         """
-        assert nr_params in (1, 4)
+        with io.StringIO() as outfile:
+            self.write(outfile, nr_params, opts)
+            return outfile.getvalue()
+
+    def write(self, stream: TextIO, nr_params: int = 1,
+              opts: Options = None, chunk_size: int = 4096):
+        """Writes touchstone data to a text stream in chunks of rows.
 
-        ts_str = "# HZ S RI R 50\n"
-        for i, dp_s11 in enumerate(self.s11):
-            ts_str += f"{dp_s11.freq} {dp_s11.re} {dp_s11.im}"
-            for j in range(1, nr_params):
-                dp = self.sdata[j][i]
-                if dp.freq != dp_s11.freq:
-                    raise LookupError("Frequencies of sdata not correlated")
-                ts_str += f" {dp.re} {dp.im}"
-            ts_str += "\n"
-        return ts_str
+        Args:
+            stream: The stream to write to
+            nr_params: Number of s-parameters. 1 for s1p, 4 for s2p
+            opts: Options for the written data, defaults to HZ S RI R 50
+            chunk_size: Number of rows formatted per write
+        """
+        assert nr_params in (1, 4)
+        if opts is None:
+            opts = Options("HZ", "S", "RI", 50)
+
+        data = [Trace.from_datapoints(self.sdata[j])
+                for j in range(nr_params)]
+        for trace in data[1:]:
+            if not np.array_equal(trace.freq, data[0].freq):
+                raise LookupError("Frequencies of sdata not correlated")
+
+        stream.write(f"{opts}\n")
+        row = " ".join(("{}",) * (1 + 2 * nr_params)) + "\n"
+        for start in range(0, len(data[0]), chunk_size):
+            stop = start + chunk_size
+            freq = data[0].freq[start:stop]
+            columns = [freq.tolist() if opts.factor == 1 else
+                       (freq / opts.factor).tolist()]
+            for trace in data:
+                columns.extend(
+                    _to_format(trace.z[start:stop], opts.format))
+            stream.write("".join(map(row.format, *columns)))
+
+
+def _to_format(values, t_format: str) -> Tuple[List[float], List[float]]:
+    """Converts complex values to the value pairs of a touchstone format"""
+    if t_format == "ri":
+        return values.real.tolist(), values.imag.tolist()
+    mag = np.abs(values)
+    if t_format == "db":
+        with np.errstate(divide="ignore"):
+            mag = 20 * np.log10(mag)
+    return mag.tolist(), np.degrees(np.angle(values)).tolist()
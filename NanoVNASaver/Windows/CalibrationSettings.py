@@ -256,12 +256,13 @@ class CalibrationWindow(QtWidgets.QWidget):
         return True
 
     def cal_save(self, name: str):
+        snapshot = self.app.snapshot
         if name in ("through", "isolation"):
-            self.app.calibration.insert(name, self.app.data.s21)
+            self.app.calibration.insert(name, snapshot.s21)
         else:
-            self.app.calibration.insert(name, self.app.data.s11)
+            self.app.calibration.insert(name, snapshot.s11)
         self.cal_label[name].setText(
-            _format_cal_label(len(self.app.data.s11)))
+            _format_cal_label(len(snapshot.s11)))
 
     def manual_save(self, name: str):
         if self.checkExpertUser():
@@ -451,32 +452,18 @@ class CalibrationWindow(QtWidgets.QWidget):
         self.listCalibrationStandards()
 
     def reset(self):
-        self.app.calibration = Calibration()
+        with self.app.worker.lock:
+            self.app.calibration = Calibration()
         for label in self.cal_label.values():
             label.setText("Uncalibrated")
         self.calibration_status_label.setText("Device calibration")
         self.calibration_source_label.setText("Device")
         self.notes_textedit.clear()
-
-        if len(self.app.worker.rawData11) > 0:
-            # There's raw data, so we can get corrected data
-            logger.debug("Saving and displaying raw data.")
-            self.app.saveData(self.app.worker.rawData11,
-                              self.app.worker.rawData21, self.app.sweepSource)
-            self.app.worker.signals.updated.emit()
+        self.app.worker.recalibrate()
 
     def setOffsetDelay(self, value: float):
         logger.debug("New offset delay value: %f ps", value)
-        self.app.worker.offsetDelay = value / 1e12
-        if len(self.app.worker.rawData11) > 0:
-            # There's raw data, so we can get corrected data
-            logger.debug("Applying new offset to existing sweep data.")
-            self.app.worker.data11, self.app.worker.data21 = \
-                self.app.worker.applyCalibration(
-                    self.app.worker.rawData11, self.app.worker.rawData21)
-            logger.debug("Saving and displaying corrected data.")
-            self.app.saveData(self.app.worker.data11, self.app.worker.data21, self.app.sweepSource)
-            self.app.worker.signals.updated.emit()
+        self.app.worker.setOffsetDelay(value / 1e12)
 
     def calculate(self):
         if self.app.sweep_control.btn_stop.isEnabled():
@@ -552,7 +539,8 @@ class CalibrationWindow(QtWidgets.QWidget):
 
         logger.debug("Attempting calibration calculation.")
         try:
-            self.app.calibration.calc_corrections()
+            with self.app.worker.lock:
+                self.app.calibration.calc_corrections()
             self.calibration_status_label.setText(
                 _format_cal_label(self.app.calibration.size(),
                                   "Application calibration"))
@@ -562,15 +550,7 @@ class CalibrationWindow(QtWidgets.QWidget):
                 self.calibration_source_label.setText(
                     self.app.calibration.source + " (Standards: Custom)")
 
-            if len(self.app.worker.rawData11) > 0:
-                # There's raw data, so we can get corrected data
-                logger.debug("Applying calibration to existing sweep data.")
-                self.app.worker.data11, self.app.worker.data21 = self.app.worker.applyCalibration(
-                    self.app.worker.rawData11, self.app.worker.rawData21)
-                logger.debug("Saving and displaying corrected data.")
-                self.app.saveData(self.app.worker.data11,
-                                  self.app.worker.data21, self.app.sweepSource)
-                self.app.worker.signals.updated.emit()
+            self.app.worker.recalibrate()
         except ValueError as e:
             # showError here hides the calibration window, so we need to pop up our own
             QtWidgets.QMessageBox.warning(self, "Error applying calibration", str(e))
@@ -586,7 +566,7 @@ class CalibrationWindow(QtWidgets.QWidget):
 
     def loadCalibration(self):
         filename, _ = QtWidgets.QFileDialog.getOpenFileName(
-            filter="Calibration Files (*.cal);;All files (*.*)")
+            filter="Calibration Files (*.cal *.calb);;All files (*.*)")
         if filename:
             self.app.calibration.load(filename)
         if not self.app.calibration.isValid1Port():
@@ -610,7 +590,13 @@ class CalibrationWindow(QtWidgets.QWidget):
             return
         filedialog = QtWidgets.QFileDialog(self)
         filedialog.setDefaultSuffix("cal")
-        filedialog.setNameFilter("Calibration Files (*.cal);;All files (*.*)")
+        filedialog.setNameFilters((
+            "Calibration Files (*.cal)",
+            "Binary Calibration Files (*.calb)",
+            "All files (*.*)"))
+        filedialog.filterSelected.connect(
+            lambda selected: filedialog.setDefaultSuffix(
+                "calb" if "*.calb" in selected else "cal"))
         filedialog.setAcceptMode(QtWidgets.QFileDialog.AcceptSave)
         selected = filedialog.exec()
         if selected:
@@ -667,7 +653,8 @@ class CalibrationWindow(QtWidgets.QWidget):
             self.btn_automatic.setDisabled(False)
             return
 
-        if self.app.sweep.properties.mode == SweepMode.CONTINOUS:
+        if self.app.sweep.properties.mode in (SweepMode.CONTINOUS,
+                                              SweepMode.RUNNING_AVERAGE):
             QtWidgets.QMessageBox(
                 QtWidgets.QMessageBox.Information,
                 "Continuous sweep enabled",
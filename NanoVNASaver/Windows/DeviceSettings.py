@@ -92,6 +92,11 @@ class DeviceSettingsWindow(QtWidgets.QWidget):
         self.btnCaptureScreenshot.clicked.connect(self.captureScreenshot)
         control_layout.addWidget(self.btnCaptureScreenshot)
 
+        self.btnStatistics = QtWidgets.QPushButton("Statistics ...")
+        self.btnStatistics.clicked.connect(
+            lambda: self.app.display_window("statistics"))
+        control_layout.addWidget(self.btnStatistics)
+
         left_layout.addWidget(status_box)
         left_layout.addLayout(control_layout)
 
@@ -118,6 +118,16 @@ class DisplaySettingsWindow(QtWidgets.QWidget):
         self.markerSizeInput.valueChanged.connect(self.changeMarkerSize)
         display_options_layout.addRow("Marker size", self.markerSizeInput)
 
+        self.refreshRateInput = QtWidgets.QSpinBox()
+        self.refreshRateInput.setMinimumHeight(20)
+        self.refreshRateInput.setMinimum(1)
+        self.refreshRateInput.setMaximum(120)
+        self.refreshRateInput.setValue(self.app.refresh.rate)
+        self.refreshRateInput.setSuffix(" Hz")
+        self.refreshRateInput.setAlignment(QtCore.Qt.AlignRight)
+        self.refreshRateInput.valueChanged.connect(self.changeRefreshRate)
+        display_options_layout.addRow("Max. refresh rate", self.refreshRateInput)
+
         self.show_marker_number_option = QtWidgets.QCheckBox("Show marker numbers")
         show_marker_number_label = QtWidgets.QLabel("Displays the marker number next to the marker")
         self.show_marker_number_option.stateChanged.connect(self.changeShowMarkerNumber)
@@ -347,21 +357,22 @@ class DisplaySettingsWindow(QtWidgets.QWidget):
         self.changeChart(1, 1, chart11_selection.currentText())
         self.changeChart(1, 2, chart12_selection.currentText())
 
+        default_colors = ChartColors()
         Chart.color.background = self.app.settings.value(
-            "BackgroundColor", defaultValue=ChartColors.background,
+            "BackgroundColor", defaultValue=default_colors.background,
             type=QtGui.QColor)
         Chart.color.foreground = self.app.settings.value(
-            "ForegroundColor", defaultValue=ChartColors.foreground,
+            "ForegroundColor", defaultValue=default_colors.foreground,
             type=QtGui.QColor)
         Chart.color.text = self.app.settings.value(
-            "TextColor", defaultValue=ChartColors.text,
+            "TextColor", defaultValue=default_colors.text,
             type=QtGui.QColor)
         self.bandsColor = self.app.settings.value(
-            "BandsColor", defaultValue=ChartColors.bands,
+            "BandsColor", defaultValue=default_colors.bands,
             type=QtGui.QColor)
         self.app.bands.color = Chart.color.bands
         Chart.color.swr = self.app.settings.value(
-            "VSWRColor", defaultValue=ChartColors.swr,
+            "VSWRColor", defaultValue=default_colors.swr,
             type=QtGui.QColor)
 
         self.dark_mode_option.setChecked(
@@ -454,7 +465,8 @@ class DisplaySettingsWindow(QtWidgets.QWidget):
 
         for m in self.app.markers:
             m.returnloss_is_positive = state
-            m.updateLabels(self.app.data.s11, self.app.data.s21)
+        snapshot = self.app.snapshot
+        Marker.updateMarkers(self.app.markers, snapshot.s11, snapshot.s21)
         self.marker_window.exampleMarker.returnloss_is_positive = state
         self.marker_window.updateMarker()
         self.app.charts["s11"]["log_mag"].isInverted = state
@@ -494,6 +506,10 @@ class DisplaySettingsWindow(QtWidgets.QWidget):
         for c in self.app.subscribing_charts:
             c.setLineThickness(size)
 
+    def changeRefreshRate(self, rate: int):
+        self.app.settings.setValue("RefreshRate", rate)
+        self.app.refresh.setRate(rate)
+
     def changeMarkerSize(self, size: int):
         self.app.settings.setValue("MarkerSize", size)
         ChartMarker.cfg.size = size
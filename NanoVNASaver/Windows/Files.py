@@ -18,9 +18,10 @@
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
 import logging
 
+import numpy as np
 from PyQt5 import QtWidgets, QtCore
+from NanoVNASaver.SweepData import Trace
 from NanoVNASaver.Touchstone import Touchstone
-from NanoVNASaver.RFTools import Datapoint
 
 logger = logging.getLogger(__name__)
 
@@ -68,11 +69,12 @@ class FilesWindow(QtWidgets.QWidget):
             lambda: self.app.display_window("file"))
 
     def exportFile(self, nr_params: int = 1):
-        if len(self.app.data.s11) == 0:
+        snapshot = self.app.snapshot
+        if len(snapshot.s11) == 0:
             QtWidgets.QMessageBox.warning(
                 self, "No data to save", "There is no data to save.")
             return
-        if nr_params > 2 and len(self.app.data.s21) == 0:
+        if nr_params > 2 and len(snapshot.s21) == 0:
             QtWidgets.QMessageBox.warning(
                 self, "No S21 data to save", "There is no S21 data to save.")
             return
@@ -96,12 +98,12 @@ class FilesWindow(QtWidgets.QWidget):
             return
 
         ts = Touchstone(filename)
-        ts.sdata[0] = self.app.data.s11
+        ts.sdata[0] = snapshot.s11
         if nr_params > 1:
-            ts.sdata[1] = self.app.data.s21
-            for dp in self.app.data.s11:
-                ts.sdata[2].append(Datapoint(dp.freq, 0, 0))
-                ts.sdata[3].append(Datapoint(dp.freq, 0, 0))
+            ts.sdata[1] = snapshot.s21
+            empty = Trace(ts.sdata[0].freq, np.zeros(len(ts.sdata[0])))
+            ts.sdata[2] = empty
+            ts.sdata[3] = empty
         try:
             ts.save(nr_params)
         except IOError as e:
@@ -121,8 +123,6 @@ class FilesWindow(QtWidgets.QWidget):
         filename, _ = QtWidgets.QFileDialog.getOpenFileName(
             filter="Touchstone Files (*.s1p *.s2p);;All files (*.*)")
         if filename != "":
-            self.app.data.s11 = []
-            self.app.data.s21 = []
             t = Touchstone(filename)
             t.load()
             self.app.saveData(t.s11, t.s21, filename)
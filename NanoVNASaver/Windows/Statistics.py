@@ -0,0 +1,128 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import logging
+
+from PyQt5 import QtWidgets, QtCore
+
+logger = logging.getLogger(__name__)
+
+STAGE_COLUMNS = ("Stage", "Count", "Total s", "Mean ms", "Min ms",
+                 "p50 ms", "p90 ms", "Max ms")
+REFRESH_INTERVAL = 1000  # ms
+
+
+class StatisticsWindow(QtWidgets.QWidget):
+    """Live view of the sweep worker timing and counters"""
+
+    def __init__(self, app: QtWidgets.QWidget):
+        super().__init__()
+        self.app = app
+        self.stats = app.worker.stats
+
+        self.setWindowTitle("Sweep statistics")
+        self.setWindowIcon(self.app.icon)
+        self.setMinimumWidth(600)
+        QtWidgets.QShortcut(QtCore.Qt.Key_Escape, self, self.hide)
+
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.chkEnabled = QtWidgets.QCheckBox("Collect sweep statistics")
+        self.chkEnabled.setChecked(self.stats.enabled)
+        self.chkEnabled.stateChanged.connect(self.setCollecting)
+        layout.addWidget(self.chkEnabled)
+
+        self.stageTable = QtWidgets.QTableWidget(0, len(STAGE_COLUMNS))
+        self.stageTable.setHorizontalHeaderLabels(STAGE_COLUMNS)
+        self.stageTable.verticalHeader().hide()
+        self.stageTable.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.stageTable)
+
+        self.counterTable = QtWidgets.QTableWidget(0, 2)
+        self.counterTable.setHorizontalHeaderLabels(("Counter", "Value"))
+        self.counterTable.verticalHeader().hide()
+        self.counterTable.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.counterTable)
+
+        self.elapsedLabel = QtWidgets.QLabel()
+        layout.addWidget(self.elapsedLabel)
+
+        button_layout = QtWidgets.QHBoxLayout()
+        btn_reset = QtWidgets.QPushButton("Reset")
+        btn_reset.clicked.connect(self.reset)
+        button_layout.addWidget(btn_reset)
+        btn_save = QtWidgets.QPushButton("Save ...")
+        btn_save.clicked.connect(self.save)
+        button_layout.addWidget(btn_save)
+        layout.addLayout(button_layout)
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setInterval(REFRESH_INTERVAL)
+        self.timer.timeout.connect(self.updateStats)
+
+    def setCollecting(self, state: int):
+        self.stats.enabled = state == QtCore.Qt.Checked
+        logger.info("Sweep statistics %s",
+                    "enabled" if self.stats.enabled else "disabled")
+
+    def showEvent(self, event):
+        self.updateStats()
+        self.timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def reset(self):
+        self.stats.reset()
+        self.updateStats()
+
+    def save(self):
+        filename, _ = QtWidgets.QFileDialog.getSaveFileName(
+            filter="JSON Files (*.json);;All files (*.*)")
+        if not filename:
+            return
+        try:
+            self.stats.save(filename)
+        except OSError as exc:
+            logger.exception("Saving statistics failed: %s", exc)
+            self.app.showError(f"Saving statistics failed\n\n{exc}")
+
+    def updateStats(self):
+        snapshot = self.stats.snapshot()
+        stages = snapshot["stages"]
+        self.stageTable.setRowCount(len(stages))
+        for row, (name, stage) in enumerate(stages.items()):
+            values = [name, str(stage["count"]), f"{stage['total']:.3f}"]
+            values += [f"{stage[key] * 1000:.2f}"
+                       for key in ("mean", "min", "p50", "p90", "max")]
+            for column, value in enumerate(values):
+                self.stageTable.setItem(
+                    row, column, QtWidgets.QTableWidgetItem(value))
+        counters = sorted(snapshot["counters"].items())
+        self.counterTable.setRowCount(len(counters))
+        for row, (name, value) in enumerate(counters):
+            self.counterTable.setItem(
+                row, 0, QtWidgets.QTableWidgetItem(name))
+            self.counterTable.setItem(
+                row, 1, QtWidgets.QTableWidgetItem(str(value)))
+        self.elapsedLabel.setText(
+            f"Collected for {snapshot['elapsed']:.0f}s")
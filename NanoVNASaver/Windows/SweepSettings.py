@@ -23,10 +23,17 @@ from PyQt5 import QtWidgets, QtCore
 from NanoVNASaver.Formatting import (
     format_frequency_short, format_frequency_sweep,
 )
-from NanoVNASaver.Settings.Sweep import SweepMode
+from NanoVNASaver.Settings.Sweep import Estimator, SweepMode
 
 logger = logging.getLogger(__name__)
 
+ESTIMATOR_NAMES = {
+    Estimator.MEAN: "Mean (discard farthest from mean)",
+    Estimator.MEDIAN: "Median",
+    Estimator.TRIMMED_MEAN: "Trimmed mean (discard farthest from median)",
+    Estimator.SIGMA_CLIP: "Sigma clipped mean",
+}
+
 
 class SweepSettingsWindow(QtWidgets.QWidget):
     def __init__(self, app: QtWidgets.QWidget):
@@ -93,6 +100,14 @@ class SweepSettingsWindow(QtWidgets.QWidget):
             lambda: self.update_mode(SweepMode.AVERAGE))
         sweep_btn_layout.addWidget(radio_button)
 
+        radio_button = QtWidgets.QRadioButton("Running average")
+        radio_button.setMinimumHeight(20)
+        radio_button.setChecked(
+            self.app.sweep.properties.mode == SweepMode.RUNNING_AVERAGE)
+        radio_button.clicked.connect(
+            lambda: self.update_mode(SweepMode.RUNNING_AVERAGE))
+        sweep_btn_layout.addWidget(radio_button)
+
         layout.addRow(sweep_btn_layout)
 
         # Log sweep
@@ -130,6 +145,36 @@ class SweepSettingsWindow(QtWidgets.QWidget):
             lambda: self.update_averaging(averages, truncates))
         layout.addRow("Number of measurements to average", averages)
         layout.addRow("Number to discard", truncates)
+        estimator = QtWidgets.QComboBox()
+        estimator.setMinimumHeight(20)
+        for value, name in ESTIMATOR_NAMES.items():
+            estimator.addItem(name, value)
+        estimator.setCurrentIndex(
+            estimator.findData(self.app.sweep.properties.estimator))
+        estimator.currentIndexChanged.connect(
+            lambda: self.update_estimator(estimator.currentData()))
+        layout.addRow("Averaging method", estimator)
+
+        # Running average
+        label = QtWidgets.QLabel(
+            "Running average sweeps continuously and shows the average of"
+            " the last reads after every read. Exponential weighting"
+            " follows changes smoother than a moving window.")
+        label.setWordWrap(True)
+        label.setMinimumHeight(50)
+        layout.addRow(label)
+        window = QtWidgets.QLineEdit(
+            str(self.app.sweep.properties.running[0]))
+        window.setMinimumHeight(20)
+        exponential = QtWidgets.QCheckBox("Exponential weighting")
+        exponential.setMinimumHeight(20)
+        exponential.setChecked(self.app.sweep.properties.running[1])
+        window.editingFinished.connect(
+            lambda: self.update_running(window, exponential.isChecked()))
+        exponential.toggled.connect(
+            lambda: self.update_running(window, exponential.isChecked()))
+        layout.addRow("Number of sweeps to average", window)
+        layout.addRow(exponential)
 
         # TODO: is this more a device than a sweep property?
         label = QtWidgets.QLabel(
@@ -246,6 +291,11 @@ class SweepSettingsWindow(QtWidgets.QWidget):
         with self.app.sweep.lock:
             self.app.sweep.properties.averages = (amount, truncates)
 
+    def update_estimator(self, estimator: 'Estimator'):
+        logger.debug("update_estimator(%s)", estimator)
+        with self.app.sweep.lock:
+            self.app.sweep.properties.estimator = estimator
+
     def update_logarithmic(self, logarithmic: bool):
         logger.debug("update_logarithmic(%s)", logarithmic)
         with self.app.sweep.lock:
@@ -261,6 +311,19 @@ class SweepSettingsWindow(QtWidgets.QWidget):
         self.padding = padding
         self.update_band()
 
+    def update_running(self, window: 'QtWidgets.QLineEdit',
+                       exponential: bool):
+        try:
+            size = int(window.text())
+            assert size > 0
+        except (AssertionError, ValueError):
+            logger.warning("Illegal running average window, set default")
+            size = 8
+        logger.debug("update_running(%s, %s)", size, exponential)
+        window.setText(str(size))
+        with self.app.sweep.lock:
+            self.app.sweep.properties.running = (size, exponential)
+
     def update_title(self, title: str = ""):
         logger.debug("update_title(%s)", title)
         with self.app.sweep.lock:
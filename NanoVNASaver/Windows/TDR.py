@@ -100,7 +100,7 @@ class TDRWindow(QtWidgets.QWidget):
         self.tdr_velocity_input = QtWidgets.QLineEdit()
         self.tdr_velocity_input.setDisabled(True)
         self.tdr_velocity_input.setText("0.66")
-        self.tdr_velocity_input.textChanged.connect(self.app.dataUpdated)
+        self.tdr_velocity_input.textChanged.connect(self.updateTDR)
 
         layout.addRow("Velocity factor", self.tdr_velocity_input)
 
@@ -114,7 +114,8 @@ class TDRWindow(QtWidgets.QWidget):
         # TODO: Let the user select whether to use high or low resolution TDR?
         FFT_POINTS = 2**14
 
-        if len(self.app.data.s11) < 2:
+        s11 = self.app.snapshot.s11
+        if len(s11) < 2:
             return
 
         if self.tdr_velocity_dropdown.currentData() == -1:
@@ -128,19 +129,15 @@ class TDRWindow(QtWidgets.QWidget):
         except ValueError:
             return
 
-        step_size = self.app.data.s11[1].freq - self.app.data.s11[0].freq
+        step_size = s11[1].freq - s11[0].freq
         if step_size == 0:
             self.tdr_result_label.setText("")
             logger.info("Cannot compute cable length at 0 span")
             return
 
-        s11 = []
-        for d in self.app.data.s11:
-            s11.append(np.complex(d.re, d.im))
+        window = np.blackman(len(s11))
 
-        window = np.blackman(len(self.app.data.s11))
-
-        windowed_s11 = window * s11
+        windowed_s11 = window * s11.z
         self.td = np.abs(np.fft.ifft(windowed_s11, FFT_POINTS))
         step = np.ones(FFT_POINTS)
         self.step_response = signal.convolve(self.td, step)
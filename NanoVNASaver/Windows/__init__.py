@@ -7,5 +7,6 @@ from .DisplaySettings import DisplaySettingsWindow
 from .Files import FilesWindow
 from .MarkerSettings import MarkerSettingsWindow
 from .Screenshot import ScreenshotWindow
+from .Statistics import StatisticsWindow
 from .SweepSettings import SweepSettingsWindow
 from .TDR import TDRWindow
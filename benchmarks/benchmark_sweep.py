@@ -0,0 +1,366 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""End to end sweep throughput benchmark
+
+Runs complete sweeps through the SweepWorker against a simulated
+device and reports the points per second, the time spent per stage
+and the peak memory. The results are written as JSON to compare them
+across commits:
+
+    python -m benchmarks.benchmark_sweep -o new.json --baseline old.json
+
+The stages are measured by wrapping the methods doing the work:
+serial is the time spent in port reads and writes (including waiting
+for the simulated device), parse is the rest of reading a segment
+(driver overhead and value conversion), calibration is applying the
+calibration, publish is handing the traces to the application,
+chart_update is setting the chart data and repaint painting the charts.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from typing import Callable, Dict, List
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# pylint: disable=wrong-import-position
+import numpy as np
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtCore import pyqtSlot
+
+from NanoVNASaver.Calibration import CalDataSet, Calibration
+from NanoVNASaver.Charts import (
+    GroupDelayChart, LogMagChart, PhaseChart, SmithChart, VSWRChart)
+from NanoVNASaver.Hardware.Hardware import get_comment, get_VNA
+from NanoVNASaver.Hardware.Simulator import (
+    Antenna, Cable, ShellDevice, SimulatedInterface, V2Device)
+from NanoVNASaver.Settings.Bands import BandsModel
+from NanoVNASaver.Settings.Sweep import Properties, Sweep, SweepMode
+from NanoVNASaver.SweepData import Snapshot
+from NanoVNASaver.SweepWorker import SweepWorker
+
+Scenario = namedtuple("Scenario", "segments properties")
+
+SCENARIOS = {
+    "single": Scenario(1, Properties()),
+    "averaged": Scenario(1, Properties(
+        mode=SweepMode.AVERAGE, averages=(5, 1))),
+    "segmented": Scenario(50, Properties()),
+    "logarithmic": Scenario(10, Properties(logarithmic=True)),
+}
+STAGES = ("serial", "parse", "calibration", "publish",
+          "chart_update", "repaint")
+S11_CHARTS = (SmithChart, LogMagChart, VSWRChart, PhaseChart)
+S21_CHARTS = (LogMagChart, GroupDelayChart)
+
+# kept referenced for the lifetime of the charts
+QT_APP = None
+
+
+class StageTimes:
+    """Thread safe accumulation of the time spent per stage"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seconds = dict.fromkeys(STAGES + ("acquisition", ), 0.0)
+        self.calls = dict.fromkeys(self.seconds, 0)
+
+    def add(self, stage: str, seconds: float):
+        with self.lock:
+            self.seconds[stage] += seconds
+            self.calls[stage] += 1
+
+    def timed(self, stage: str, func: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return wrapper
+
+    def wrap(self, obj, name: str, stage: str):
+        setattr(obj, name, self.timed(stage, getattr(obj, name)))
+
+    def result(self) -> Dict[str, float]:
+        result = {stage: self.seconds[stage] for stage in STAGES}
+        result["parse"] = max(
+            0.0, self.seconds["acquisition"] - self.seconds["serial"])
+        return result
+
+
+def _timed_chart(chart_class: type, times: StageTimes) -> type:
+    def paintEvent(self, event):  # pylint: disable=invalid-name
+        start = time.perf_counter()
+        chart_class.paintEvent(self, event)
+        times.add("repaint", time.perf_counter() - start)
+    return type(chart_class.__name__, (chart_class, ), {
+        "paintEvent": paintEvent})
+
+
+class BenchApp(QtCore.QObject):
+    """The parts of the main window used by the SweepWorker"""
+
+    def __init__(self, vna, sweep: Sweep, calibration: Calibration,
+                 times: StageTimes, charts: bool = True):
+        super().__init__()
+        self.vna = vna
+        self.sweep = sweep
+        self.calibration = calibration
+        self.times = times
+        self.snapshot = Snapshot()
+        self.s11charts = []
+        self.s21charts = []
+        if charts:
+            bands = BandsModel()
+            for classes, charts_list in ((S11_CHARTS, self.s11charts),
+                                         (S21_CHARTS, self.s21charts)):
+                for chart_class in classes:
+                    chart = _timed_chart(chart_class, times)(
+                        chart_class.__name__)
+                    chart.setBands(bands)
+                    chart.resize(600, 400)
+                    chart.show()
+                    charts_list.append(chart)
+        times.wrap(self, "saveData", "publish")
+
+    def saveData(self, s11, s21):  # pylint: disable=invalid-name
+        self.snapshot = Snapshot(s11, s21)
+
+    @pyqtSlot()
+    def dataUpdated(self):  # pylint: disable=invalid-name
+        start = time.perf_counter()
+        snapshot = self.snapshot
+        s11, s21 = snapshot.s11, snapshot.s21
+        for chart in self.s11charts:
+            chart.setData(s11)
+        for chart in self.s21charts:
+            chart.setData(s21)
+        self.times.add("chart_update", time.perf_counter() - start)
+
+    def close(self):
+        for chart in self.s11charts + self.s21charts:
+            chart.close()
+
+
+def calibration(start: int, stop: int, points: int = 1001) -> Calibration:
+    """A full calibration with a mild error model over the sweep range"""
+    freq = np.linspace(start, stop, points).round().astype(np.int64)
+    ripple = 0.01 * np.exp(1j * freq / 1e7)
+    cal = Calibration()
+    cal.dataset = CalDataSet.from_columns({
+        "freq": freq,
+        "short": -0.95 + ripple,
+        "open": 0.97 + ripple,
+        "load": 0.02 + ripple / 2,
+        "through": 0.9 * np.exp(-1j * freq / 1e8),
+        "isolation": np.full(points, 0.001 + 0j),
+    })
+    cal.calc_corrections()
+    return cal
+
+
+def _device(args: argparse.Namespace):
+    dut = Cable(2, termination=Antenna((args.start + args.stop) / 2))
+    options = {"latency": args.latency, "point_time": args.point_time,
+               "noise": 0.001, "seed": 1}
+    if args.device == "v2":
+        return V2Device(dut, **options)
+    return ShellDevice(dut, scan_binary=args.device == "shell", **options)
+
+
+def _run_once(vna, sweep: Sweep, args: argparse.Namespace) -> dict:
+    times = StageTimes()
+    times.wrap(vna.serial, "read", "serial")
+    times.wrap(vna.serial, "write", "serial")
+    app = BenchApp(vna, sweep, calibration(sweep.start, sweep.end),
+                   times, charts=args.charts)
+    worker = SweepWorker(app)
+    times.wrap(worker, "readSegment", "acquisition")
+    times.wrap(worker, "applyCalibration", "calibration")
+    errors = []
+    loop = QtCore.QEventLoop()
+    worker.signals.updated.connect(app.dataUpdated)
+    worker.signals.finished.connect(loop.quit)
+    worker.signals.sweepError.connect(
+        lambda: errors.append(worker.error_message))
+    worker.signals.sweepError.connect(loop.quit)
+
+    start = time.perf_counter()
+    QtCore.QThreadPool.globalInstance().start(worker)
+    loop.exec_()
+    QtCore.QThreadPool.globalInstance().waitForDone()
+    QtWidgets.QApplication.processEvents()
+    wall = time.perf_counter() - start
+
+    for name in ("read", "write"):
+        delattr(vna.serial, name)
+    app.close()
+    if errors:
+        raise RuntimeError(errors[0])
+    points = sweep.points * sweep.segments
+    return {
+        "points": points,
+        "segments": sweep.segments,
+        "seconds": wall,
+        "points_per_second": points / wall,
+        "stages": times.result(),
+    }
+
+
+def run_scenario(name: str, args: argparse.Namespace) -> dict:
+    scenario = SCENARIOS[name]
+    iface = SimulatedInterface(_device(args), bandwidth=args.bandwidth)
+    iface.open()
+    iface.comment = get_comment(iface)
+    vna = get_VNA(iface)
+    vna.datapoints = args.points
+    sweep = Sweep(args.start, args.stop, args.points, scenario.segments,
+                  scenario.properties)
+
+    result = min((_run_once(vna, sweep, args) for _ in range(args.repeat)),
+                 key=lambda run: run["seconds"])
+    if args.memory:
+        tracemalloc.start()
+        _run_once(vna, sweep, args)
+        result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    iface.close()
+    return result
+
+
+def run(args: argparse.Namespace) -> dict:
+    global QT_APP  # pylint: disable=global-statement
+    QT_APP = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    results = {
+        "commit": _commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("output", "baseline")},
+        "scenarios": {},
+    }
+    for name in args.scenario:
+        results["scenarios"][name] = run_scenario(name, args)
+    return results
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], check=True,
+            capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Returns the scenarios more than tolerance slower than baseline"""
+    slower = []
+    for name, result in results["scenarios"].items():
+        if name not in baseline["scenarios"]:
+            continue
+        old = baseline["scenarios"][name]["points_per_second"]
+        ratio = result["points_per_second"] / old
+        print(f"{name:12} {old:10.0f} -> {result['points_per_second']:10.0f}"
+              f" points/s ({ratio - 1:+.1%})")
+        if ratio < 1 - tolerance:
+            slower.append(name)
+    return slower
+
+
+def report(results: dict):
+    print(f"commit {results['commit']}  python {results['python']}"
+          f"  numpy {results['numpy']}")
+    for name, result in results["scenarios"].items():
+        stages = "  ".join(f"{stage} {seconds * 1000:.0f}ms"
+                           for stage, seconds in result["stages"].items())
+        memory = ""
+        if "peak_memory" in result:
+            memory = f"  peak {result['peak_memory'] / 2**20:.1f}MiB"
+        print(f"{name:12} {result['points']:6} points"
+              f" {result['seconds']:7.3f}s"
+              f" {result['points_per_second']:10.0f} points/s{memory}")
+        print(f"{'':12} {stages}")
+
+
+def parse_args(argv: List[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="NanoVNASaver sweep throughput benchmark")
+    parser.add_argument("-s", "--scenario", action="append",
+                        choices=SCENARIOS,
+                        help="scenario to run (default: all)")
+    parser.add_argument("--device", choices=("shell", "shell-text", "v2"),
+                        default="shell",
+                        help="simulated device protocol")
+    parser.add_argument("--start", type=int, default=1000000)
+    parser.add_argument("--stop", type=int, default=900000000)
+    parser.add_argument("--points", type=int, default=101,
+                        help="points per segment")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="simulated command latency in s")
+    parser.add_argument("--point-time", type=float, default=0.0,
+                        help="simulated measurement time per point in s")
+    parser.add_argument("--bandwidth", type=float, default=None,
+                        help="simulated link speed in bytes/s")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per scenario, the fastest is reported")
+    parser.add_argument("--no-charts", dest="charts",
+                        action="store_false", help="do not draw charts")
+    parser.add_argument("--no-memory", dest="memory",
+                        action="store_false",
+                        help="skip the traced run measuring peak memory")
+    parser.add_argument("-o", "--output", help="write the results as JSON")
+    parser.add_argument("--baseline",
+                        help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed slow down against the baseline")
+    args = parser.parse_args(argv)
+    args.scenario = args.scenario or list(SCENARIOS)
+    return args
+
+
+def main(argv: List[str] = None) -> int:
+    args = parse_args(argv)
+    results = run(args)
+    report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            slower = compare(results, json.load(f), args.tolerance)
+        if slower:
+            print(f"slower than baseline: {', '.join(slower)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import os
+import tempfile
+import unittest
+
+# Import targets to be tested
+from benchmarks import benchmark_sweep
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_smoke(self):
+        """One tiny run, the benchmark itself is run by hand"""
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, "results.json")
+            self.assertEqual(benchmark_sweep.main(
+                ["-s", "single", "--repeat", "1", "--no-memory",
+                 "--points", "11", "-o", output]), 0)
+            with open(output, encoding="utf-8") as f:
+                results = json.load(f)
+        result = results["scenarios"]["single"]
+        self.assertEqual(result["points"], 11)
+        self.assertEqual(set(result["stages"]),
+                         set(benchmark_sweep.STAGES))
+
+    def test_compare(self):
+        def results(pps):
+            return {"scenarios": {"single": {"points_per_second": pps}}}
+        self.assertEqual(benchmark_sweep.compare(
+            results(80), results(100), 0.1), ["single"])
+        self.assertEqual(benchmark_sweep.compare(
+            results(95), results(100), 0.1), [])
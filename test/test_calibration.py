@@ -0,0 +1,186 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+# Import targets to be tested
+from NanoVNASaver.Calibration import Calibration, correct_delay, \
+    correct_delay_batch
+from NanoVNASaver.RFTools import Datapoint
+
+
+def _dps(freqs, values):
+    return [Datapoint(f, v.real, v.imag) for f, v in zip(freqs, values)]
+
+
+class TestCalibration(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.cal_freq = np.linspace(1e6, 100e6, 11).astype(np.int64)
+        size = len(self.cal_freq)
+
+        def noise():
+            return 0.05 * (rng.standard_normal(size) +
+                           1j * rng.standard_normal(size))
+        self.cal = Calibration()
+        self.cal.insert("short", _dps(self.cal_freq, -1 + noise()))
+        self.cal.insert("open", _dps(self.cal_freq, 1 + noise()))
+        self.cal.insert("load", _dps(self.cal_freq, noise()))
+        self.cal.insert("through", _dps(self.cal_freq, 0.9 + noise()))
+        self.cal.insert("isolation", _dps(self.cal_freq, noise() / 10))
+        self.cal.calc_corrections()
+        # measurement grid in between and outside of the cal points
+        self.freq = np.linspace(0.5e6, 110e6, 37).astype(np.int64)
+        self.values = 0.5 * np.exp(1j * np.linspace(0, 6, 37))
+
+    def test_batch_matches_scalar(self):
+        dps = _dps(self.freq, self.values)
+        s11 = self.cal.correct11_batch(self.freq, self.values)
+        s21 = self.cal.correct21_batch(self.freq, self.values)
+        np.testing.assert_allclose(
+            s11, [self.cal.correct11(dp).z for dp in dps])
+        np.testing.assert_allclose(
+            s21, [self.cal.correct21(dp).z for dp in dps])
+
+    def test_error_term_cache(self):
+        terms = self.cal.error_terms(self.freq)
+        self.assertIs(self.cal.error_terms(self.freq.copy()), terms)
+        self.assertIsNot(self.cal.error_terms(self.freq[1:]), terms)
+        self.cal.calc_corrections()
+        self.assertIsNot(self.cal.error_terms(self.freq), terms)
+
+    def test_correct_delay_batch(self):
+        dps = _dps(self.freq, self.values)
+        for reflect in (False, True):
+            np.testing.assert_allclose(
+                correct_delay_batch(self.freq, self.values, 1e-9, reflect),
+                [correct_delay(dp, 1e-9, reflect).z for dp in dps])
+
+    def test_ideal_error_terms(self):
+        # with ideal standards the directivity is the measured load
+        for cd in self.cal.dataset.values():
+            self.assertAlmostEqual(cd["e00"], cd["load"].z)
+        self.assertEqual(len(self.cal.error_terms(self.cal_freq)), 5)
+
+    def test_calc_corrections_zero_division(self):
+        cal = Calibration()
+        short = _dps(self.cal_freq, np.full(len(self.cal_freq), -1 + 0j))
+        cal.insert("short", short)
+        cal.insert("open", short[:5] + _dps(self.cal_freq[5:],
+                                            np.ones(6, dtype=complex)))
+        cal.insert("load", _dps(self.cal_freq, np.zeros(11, dtype=complex)))
+        with self.assertRaisesRegex(ValueError, f"{self.cal_freq[4]}Hz"):
+            cal.calc_corrections()
+        self.assertFalse(cal.isCalculated)
+
+    def test_non_ideal_standards(self):
+        self.cal.useIdealShort = False
+        self.cal.useIdealOpen = False
+        self.cal.useIdealLoad = False
+        self.cal.useIdealThrough = False
+        self.cal.loadC = 1e-13
+        self.cal.loadL = 1e-10
+        self.cal.throughLength = 1e-11
+        freq = self.cal_freq
+        for gamma in (self.cal.gamma_short, self.cal.gamma_open,
+                      self.cal.gamma_load, self.cal.gamma_through):
+            np.testing.assert_allclose(
+                gamma(freq), [gamma(int(f)) for f in freq])
+        self.cal.calc_corrections()
+        self.assertTrue(self.cal.isCalculated)
+
+
+class TestCalibrationFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        rng = np.random.default_rng(7)
+        freq = np.linspace(50e3, 900e6, 101).astype(np.int64)
+
+        def values(offset):
+            return offset + rng.standard_normal(101) / 3 + \
+                1j * rng.standard_normal(101) / 3
+        self.cal = Calibration()
+        self.cal.notes = ["first note", "second note"]
+        for name, offset in (("short", -1), ("open", 1), ("load", 0),
+                             ("through", 1), ("isolation", 0)):
+            self.cal.insert(name, _dps(freq, values(offset)))
+        self.cal.calc_corrections()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_text_binary_roundtrip(self):
+        self.cal.save(self._file("text.cal"))
+        text = Calibration()
+        text.load(self._file("text.cal"))
+        text.save(self._file("binary.calb"))
+        self.assertTrue(Calibration.is_binary(self._file("binary.calb")))
+        binary = Calibration()
+        binary.load(self._file("binary.calb"))
+        self.assertEqual(binary.notes, self.cal.notes)
+        self.assertEqual(binary.source, "binary.calb")
+        self.assertFalse(binary.dataset.column("short").flags.writeable)
+        self.assertTrue(binary.isValid2Port())
+        self.assertEqual(binary.data_size("load"), 101)
+        binary.save(self._file("again.cal"))
+        with open(self._file("text.cal")) as f1, \
+                open(self._file("again.cal")) as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+    def test_binary_error_terms(self):
+        self.cal.save(self._file("cal.calb"))
+        binary = Calibration()
+        binary.load(self._file("cal.calb"))
+        for name in ("e00", "e11", "delta_e", "e30", "e10e32"):
+            np.testing.assert_array_equal(
+                binary.dataset.column(name), self.cal.dataset.column(name))
+        binary.calc_corrections()
+        freq = np.arange(1e6, 800e6, 1e6).astype(np.int64)
+        values = np.full(len(freq), 0.3 + 0.2j)
+        np.testing.assert_allclose(
+            binary.correct11_batch(freq, values),
+            self.cal.correct11_batch(freq, values))
+        # overwriting the file of a calibration in use
+        short = binary.dataset.column("short").copy()
+        self.cal.notes = ["changed"]
+        self.cal.save(self._file("cal.calb"))
+        np.testing.assert_array_equal(binary.dataset.column("short"), short)
+        binary.save(self._file("cal.calb"))
+        self.assertFalse(os.path.exists(self._file("cal.calb.tmp")))
+
+    def test_binary_one_port(self):
+        cal = Calibration()
+        for name in ("short", "open", "load"):
+            cal.insert(name, [cd[name] for cd in self.cal.dataset.values()])
+        cal.save(self._file("one.calb"))
+        binary = Calibration()
+        binary.load(self._file("one.calb"))
+        self.assertTrue(binary.isValid1Port())
+        self.assertFalse(binary.isValid2Port())
+        self.assertIsNone(binary.dataset.get(50000)["through"])
+        self.assertEqual(binary.dataset.get(50000)["short"],
+                         self.cal.dataset.get(50000)["short"])
@@ -0,0 +1,347 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# pylint: disable=wrong-import-position
+from PyQt5 import QtWidgets
+
+# Import targets to be tested
+from NanoVNASaver.Charts import (
+    CapacitanceChart, GroupDelayChart, InductanceChart, LogMagChart, MagnitudeChart,
+    MagnitudeZChart, MagnitudeZSeriesChart, MagnitudeZShuntChart,
+    PhaseChart, QualityFactorChart, SmithChart, SParameterChart, VSWRChart)
+from NanoVNASaver.Charts.Frequency import DECIMATE_CACHE_SIZE
+from NanoVNASaver.Settings.Bands import BandsModel
+from NanoVNASaver.SweepData import SweepData
+
+QT_APP = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def segmented(segments: int, filled: int, points: int = 101) -> SweepData:
+    """A sweep with the first filled segments read"""
+    freq = np.linspace(1e6, 30e6, segments * points).round()
+    data = SweepData(freq)
+    count = filled * points
+    data.s11[:count] = 0.5 * np.exp(-1j * freq[:count] / 3e6)
+    data.s21[:count] = 0.3 * np.exp(-1j * freq[:count] / 5e6)
+    return data
+
+
+def shown_chart(chart_class):
+    chart = chart_class("test")
+    chart.setBands(BandsModel())
+    chart.setDrawLines(True)
+    chart.resize(500, 300)
+    chart.show()
+    return chart
+
+
+class TestLayeredPaint(unittest.TestCase):
+
+    @staticmethod
+    def _image(chart):
+        return chart.grab().toImage()
+
+    def test_partial_repaint(self):
+        for chart_class in (LogMagChart, VSWRChart, SParameterChart):
+            chart = shown_chart(chart_class)
+            chart.setFixedValues(True)
+            chart.setData(segmented(10, 3).trace("11"))
+            self._image(chart)
+            chart.setData(segmented(10, 4).trace("11"))
+            self.assertEqual(chart._dirty, (303, 403))
+            partial = self._image(chart)
+            chart.update()  # forces a full repaint
+            self.assertEqual(partial, self._image(chart),
+                             chart_class.__name__)
+
+    def test_partial_decimated(self):
+        """A stripe of a trace drawn as envelope matches a full repaint"""
+        rng = np.random.default_rng(7)
+        sweeps = (np.linspace(1e6, 30e6, 1010).round(),
+                  np.geomspace(1e6, 30e6, 1010).round())
+        noise = (rng.normal(0, 0.05, 1010) +
+                 1j * rng.normal(0, 0.05, 1010))
+        for freq in sweeps:
+            full = SweepData(freq, 0.5 * np.exp(-1j * freq / 3e6) + noise,
+                             0.3 * np.exp(-1j * freq / 5e6) + noise)
+            for chart_class in (LogMagChart, VSWRChart, SParameterChart,
+                                MagnitudeChart, MagnitudeZChart,
+                                QualityFactorChart, PhaseChart):
+                chart = shown_chart(chart_class)
+                chart.setReference(full.trace("21"))
+                data = full.copy()
+                data.s11[404:] = 0
+                chart.setData(data.trace("11"))
+                self._image(chart)
+                data.update(404, SweepData(
+                    freq[404:505], full.s11[404:505], full.s21[404:505]))
+                chart.setData(data.trace("11"))
+                self.assertEqual(chart._dirty, (404, 504))
+                partial = self._image(chart)
+                chart.update()
+                self.assertEqual(partial, self._image(chart),
+                                 chart_class.__name__)
+
+    def test_auto_scaling(self):
+        chart = shown_chart(LogMagChart)
+        data = segmented(10, 3)
+        chart.setData(data.trace("11"))
+        self._image(chart)
+        data.update(303, SweepData(data.freq[303:404],
+                                   np.full(101, 0.001), np.zeros(101)))
+        chart.setData(data.trace("11"))
+        changed = self._image(chart)
+        chart.update()
+        self.assertEqual(changed, self._image(chart))
+
+    def test_background_kept(self):
+        """Data within the current scaling does not redraw the axes"""
+        for chart_class in (LogMagChart, VSWRChart, MagnitudeZChart,
+                            QualityFactorChart, CapacitanceChart):
+            chart = shown_chart(chart_class)
+            data = segmented(10, 10)
+            chart.setData(data.trace("11"))
+            self._image(chart)
+            background = chart._background
+            data.update(303, SweepData(data.freq[303:404],
+                                       data.s11[303:404] * 0.999,
+                                       data.s21[303:404]))
+            chart.setData(data.trace("11"))
+            self.assertEqual(chart._axisState(), chart._axis_state,
+                             chart_class.__name__)
+            self._image(chart)
+            self.assertIs(chart._background, background,
+                          chart_class.__name__)
+        # a new scaling replaces it
+        data.update(303, SweepData(data.freq[303:404],
+                                   np.full(101, 0.001), np.zeros(101)))
+        chart.setData(data.trace("11"))
+        self._image(chart)
+        self.assertIsNot(chart._background, background)
+
+    def test_unchanged(self):
+        chart = shown_chart(LogMagChart)
+        trace = segmented(2, 2).trace("11")
+        chart.setData(trace)
+        self._image(chart)
+        chart.setData(segmented(2, 2).trace("11"))
+        self.assertIsNone(chart._dirty)
+        # a different sweep range repaints everything
+        chart.setData(segmented(3, 1).trace("11"))
+        self.assertIsNone(chart._background)
+
+    def test_unwrap_not_layered(self):
+        chart = shown_chart(PhaseChart)
+        chart.setUnwrap(True)
+        self.assertFalse(chart.flag.layered)
+        chart.setData(segmented(4, 2).trace("11"))
+        image = self._image(chart)
+        self.assertFalse(image.isNull())
+
+
+class TestYPositions(unittest.TestCase):
+
+    def test_vectorized(self):
+        trace = segmented(2, 2).trace("11")
+        for chart_class in (LogMagChart, PhaseChart, SParameterChart,
+                            VSWRChart, MagnitudeChart, CapacitanceChart,
+                            InductanceChart, QualityFactorChart,
+                            MagnitudeZChart, MagnitudeZSeriesChart,
+                            MagnitudeZShuntChart, GroupDelayChart):
+            chart = chart_class("test")
+            chart.setBands(BandsModel())
+            chart.resize(500, 300)
+            chart.setData(trace)
+            chart.grab()  # scaling is set while painting
+            functions = [chart.getYPosition]
+            if chart_class is SParameterChart:
+                functions.append(chart.getImYPosition)
+            for function in functions:
+                expected = [function(d) for d in trace]
+                np.testing.assert_array_equal(
+                    chart.getYPositions(
+                        trace, None if function == chart.getYPosition
+                        else function),
+                    np.array(expected, dtype=np.float64),
+                    chart_class.__name__)
+
+    def test_log_vswr(self):
+        chart = VSWRChart("test")
+        chart.setBands(BandsModel())
+        chart.setLogarithmicY(True)
+        trace = segmented(2, 1).trace("11")
+        chart.setData(trace)
+        chart.grab()
+        np.testing.assert_array_equal(
+            chart.getYPositions(trace),
+            np.array([chart.getYPosition(d) for d in trace], np.float64))
+
+
+    def test_log_impedance(self):
+        chart = MagnitudeZChart("test")
+        chart.setBands(BandsModel())
+        chart.setLogarithmicY(True)
+        trace = segmented(2, 1).trace("11")
+        chart.setData(trace)
+        chart.grab()
+        np.testing.assert_array_equal(
+            chart.getYPositions(trace),
+            np.array([chart.getYPosition(d) for d in trace], np.float64))
+
+    def test_group_delay_lookup(self):
+        chart = GroupDelayChart("test")
+        chart.setBands(BandsModel())
+        trace = segmented(2, 2).trace("11")
+        reference = trace.scaled(0.5)
+        chart.setData(trace)
+        chart.setReference(reference)
+        chart.grab()
+        for index in (0, 50, 100):
+            expected = chart.getYPositionFromDelay(chart.groupDelay[index])
+            self.assertEqual(chart.getYPosition(trace[index]), expected)
+            self.assertEqual(
+                chart.getMarkerYPosition(trace, index), expected)
+            self.assertEqual(
+                chart.getYPosition(reference[index]),
+                chart.getYPositionFromDelay(
+                    chart.groupDelayReference[index]))
+        # the traces are built once, not per lookup
+        self.assertIs(chart._trace, trace)
+        np.testing.assert_array_equal(chart.getYPositions(trace), [
+            chart.getYPosition(d) for d in trace])
+
+    def test_shared_columns(self):
+        trace = segmented(2, 2).trace("11")
+        for chart_class in (CapacitanceChart, InductanceChart,
+                            MagnitudeZChart):
+            chart = chart_class("test")
+            chart.setBands(BandsModel())
+            chart.setData(trace)
+            chart.grab()
+        # all charts derive from the one cached impedance column
+        impedance = trace.impedance()
+        self.assertIs(trace._cache[("impedance", 50)], impedance)
+        self.assertIn(("capacitiveEquivalent", 50), trace._cache)
+        self.assertIn(("inductiveEquivalent", 50), trace._cache)
+
+
+class TestDecimation(unittest.TestCase):
+
+    def test_envelope(self):
+        chart = LogMagChart("test")
+        chart.resize(500, 300)
+        chart.fstart, chart.fstop = 1000000, 30000000
+        freq = np.linspace(1e6, 30e6, 20000).round().astype(np.int64)
+        y = np.sin(freq / 1e6) * 100
+        y[777] = 1000  # a single point peak
+        y[778] = np.nan
+        x, decimated = chart._decimate(freq, y)
+        self.assertEqual(len(x), 4 * len(np.unique(chart._xPositions(freq))))
+        self.assertLessEqual(len(x), 4 * (chart.dim.width + 1))
+        self.assertEqual(np.nanmax(decimated), 1000)
+        self.assertEqual(np.nanmin(decimated), np.min(y[~np.isnan(y)]))
+        # the pixel columns are cached per zoom
+        columns = chart._pixelColumns(freq)
+        self.assertIs(chart._pixelColumns(freq.copy()), columns)
+        chart.fstop = 20000000
+        self.assertIsNot(chart._pixelColumns(freq), columns)
+
+    def test_unsorted(self):
+        chart = LogMagChart("test")
+        chart.fstart, chart.fstop = 1, 1000
+        freq = np.array([1, 500, 2, 1000] * 300)
+        self.assertIsNone(chart._decimate(freq, np.zeros(len(freq))))
+
+    def test_draw(self):
+        freq = np.linspace(1e6, 30e6, 20000).round()
+        data = SweepData(freq, 0.5 * np.exp(-1j * freq / 3e6))
+        chart = shown_chart(LogMagChart)
+        chart.setData(data.trace("11"))
+        self.assertFalse(chart.grab().toImage().isNull())
+        self.assertEqual(sorted(key[0] for key in chart._column_cache),
+                         ["columns", "envelope"])
+        # a stripe slices the columns of the whole trace
+        data.update(5000, SweepData(freq[5000:6000],
+                                    np.full(1000, 0.1), np.zeros(1000)))
+        chart.setData(data.trace("11"))
+        self.assertIsNotNone(chart._dirty)
+        chart.grab()
+        self.assertEqual(
+            [key[0] for key in chart._column_cache].count("columns"), 1)
+        # a repaint with the same axes reuses the envelope
+        chart.update()
+        chart.grab()
+        with patch.object(chart, "getYPositions") as positions:
+            chart.update()
+            chart.grab()
+        positions.assert_not_called()
+        # bounded, the least recently used zoom is dropped
+        for stop in range(20):
+            chart.fstop = 29000000 - stop * 100000
+            chart._pixelColumns(freq)
+        self.assertEqual(len(chart._column_cache), DECIMATE_CACHE_SIZE)
+
+
+class TestSmithChart(unittest.TestCase):
+
+    def setUp(self):
+        self.chart = SmithChart("test")
+        self.chart.setDrawLines(True)
+        self.chart.resize(300, 300)
+        self.chart.show()
+        self.trace = segmented(2, 2).trace("11")
+
+    def test_grid_cached(self):
+        chart = self.chart
+        chart.setData(self.trace)
+        chart.grab()
+        grid = chart.gridPixmap()
+        chart.setData(segmented(2, 1).trace("11"))
+        chart.grab()
+        self.assertIs(chart.gridPixmap(), grid)
+        chart.addSWRMarker(2)
+        self.assertIsNot(chart.gridPixmap(), grid)
+        grid = chart.gridPixmap()
+        chart.resize(400, 400)
+        self.assertIsNot(chart.gridPixmap(), grid)
+
+    def test_positions(self):
+        self.chart.setData(self.trace)
+        np.testing.assert_array_equal(
+            self.chart.getXPositions(self.trace),
+            [self.chart.getXPosition(d) for d in self.trace])
+        np.testing.assert_array_equal(
+            self.chart.getYPositions(self.trace),
+            [self.chart.getYPosition(d) for d in self.trace])
+
+    def test_reference_span(self):
+        chart = self.chart
+        chart.setReference(self.trace)
+        chart.setData(self.trace[:50])
+        image = chart.grab().toImage()
+        # reference points outside of the sweep are not drawn
+        chart.setReference(self.trace[:50])
+        self.assertEqual(image, chart.grab().toImage())
@@ -0,0 +1,212 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import unittest
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# pylint: disable=wrong-import-position
+from PyQt5 import QtWidgets
+
+# Import targets to be tested
+from NanoVNASaver import RFTools
+from NanoVNASaver.Formatting import (
+    format_capacitance, format_complex_adm, format_complex_imp,
+    format_frequency_space, format_gain, format_group_delay,
+    format_inductance, format_magnitude, format_phase, format_q_factor,
+    format_resistance, format_vswr, format_wavelength)
+from NanoVNASaver.Marker import Marker
+from NanoVNASaver.Marker.Values import TYPES
+from NanoVNASaver.Marker.Widget import nearest_location
+from NanoVNASaver.RFTools import Datapoint
+from NanoVNASaver.SweepData import SweepData
+
+QT_APP = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def walk(freq, frequency) -> int:
+    """The linear search binary search replaced"""
+    min_distance = freq[-1]
+    for i, item in enumerate(freq):
+        if abs(item - frequency) <= min_distance:
+            min_distance = abs(item - frequency)
+        else:
+            return i - 1
+    return len(freq) - 1
+
+
+class TestNearestLocation(unittest.TestCase):
+
+    def test_like_walk(self):
+        rng = np.random.default_rng(5)
+        # log sweep, non uniform segments and repeated frequencies
+        sweeps = (
+            np.geomspace(1e4, 1e9, 2000).round().astype(np.int64),
+            np.sort(rng.integers(1e6, 3e6, 500)),
+            np.array([100, 200, 200, 300, 400, 400, 400, 500]),
+        )
+        for freq in sweeps:
+            targets = np.concatenate((
+                freq, freq + 1, freq - 1, (freq[1:] + freq[:-1]) // 2,
+                rng.integers(freq[0], freq[-1], 200)))
+            for target in targets:
+                self.assertEqual(nearest_location(freq, target),
+                                 walk(freq, target), target)
+
+    def test_unsorted(self):
+        freq = np.array([300, 100, 200])
+        self.assertEqual(nearest_location(freq, 110), 1)
+
+
+class TestFindLocation(unittest.TestCase):
+
+    def setUp(self):
+        self.marker = Marker("test")
+        freq = np.linspace(1e6, 2e6, 20001).round()
+        self.trace = SweepData(freq).trace("11")
+
+    def _find(self, frequency, data=None):
+        self.marker.freq = frequency
+        self.marker.findLocation(self.trace if data is None else data)
+        return (self.marker.location,
+                self.marker.frequencyInput.previousFrequency,
+                self.marker.frequencyInput.nextFrequency)
+
+    def test_find(self):
+        self.assertEqual(self._find(1500020), (10000, 1499950, 1500050))
+        self.assertEqual(self._find(1000000), (0, -1, 1000050))
+        self.assertEqual(self._find(2000010), (20000, 1999950, -1))
+        # more than half a step outside
+        self.assertEqual(self._find(2000030), (-1, -1, -1))
+        self.assertEqual(self._find(999970), (-1, -1, -1))
+
+    def test_lists(self):
+        data = [Datapoint(f, 0, 0) for f in (100, 200, 400)]
+        self.assertEqual(self._find(310, data), (2, 200, -1))
+        self.assertEqual(self._find(100, data[:1]), (0, -1, -1))
+        self.assertEqual(self._find(100, []), (-1, -1, -1))
+
+
+def labels(s11, s21, location) -> dict:
+    """The labels of the former per marker, per datapoint calculation"""
+    _s11 = s11[location]
+    imp = _s11.impedance()
+    imp_p = RFTools.serial_to_parallel(imp)
+    cap = format_capacitance(RFTools.impedance_to_capacitance(imp, _s11.freq))
+    ind = format_inductance(RFTools.impedance_to_inductance(imp, _s11.freq))
+    cap_p = format_capacitance(
+        RFTools.impedance_to_capacitance(imp_p, _s11.freq))
+    ind_p = format_inductance(
+        RFTools.impedance_to_inductance(imp_p, _s11.freq))
+    _s21 = s21[location]
+    return {
+        'actualfreq': format_frequency_space(_s11.freq),
+        'lambda': format_wavelength(_s11.wavelength),
+        'admittance': format_complex_adm(imp),
+        'impedance': format_complex_imp(imp),
+        'parc': cap_p,
+        'parl': ind_p,
+        'parlc': cap_p if imp_p.imag < 0 else ind_p,
+        'parr': format_resistance(imp_p.real),
+        'returnloss': format_gain(_s11.gain),
+        's11groupdelay': format_group_delay(RFTools.groupDelay(s11, location)),
+        's11mag': format_magnitude(abs(_s11.z)),
+        's11phase': format_phase(_s11.phase),
+        's11polar': str(round(abs(_s11.z), 2)) + "∠" + format_phase(_s11.phase),
+        's11q': format_q_factor(_s11.qFactor()),
+        's11z': format_resistance(abs(imp)),
+        'serc': cap,
+        'serl': ind,
+        'serlc': cap if imp.imag < 0 else ind,
+        'serr': format_resistance(imp.real),
+        'vswr': format_vswr(_s11.vswr),
+        's21gain': format_gain(_s21.gain),
+        's21groupdelay': format_group_delay(
+            RFTools.groupDelay(s21, location) / 2),
+        's21mag': format_magnitude(abs(_s21.z)),
+        's21phase': format_phase(_s21.phase),
+        's21polar': str(round(abs(_s21.z), 2)) + "∠" + format_phase(_s21.phase),
+        's21magshunt': format_magnitude(abs(_s21.shuntImpedance())),
+        's21magseries': format_magnitude(abs(_s21.seriesImpedance())),
+        's21realimagshunt': format_complex_imp(
+            _s21.shuntImpedance(), allow_negative=True),
+        's21realimagseries': format_complex_imp(
+            _s21.seriesImpedance(), allow_negative=True),
+    }
+
+
+class TestMarkerLabels(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        freq = np.linspace(1e5, 9e8, 1001).round()
+        s11 = rng.uniform(-1, 1, 1001) + 1j * rng.uniform(-1, 1, 1001)
+        # special points: short, matched and purely reactive
+        s11[:3] = [-1, 0, 1j]
+        s21 = rng.uniform(-1, 1, 1001) + 1j * rng.uniform(-1, 1, 1001)
+        s21[:2] = [1, 0]
+        data = SweepData(freq, s11, s21)
+        self.s11 = data.trace("11")
+        self.s21 = data.trace("21")
+        self.markers = [Marker(f"test {i}") for i in range(3)]
+        all_labels = [l.label_id for l in TYPES]
+        for m in self.markers:
+            m.setFieldSelection(all_labels)
+
+    def _texts(self, marker: Marker) -> dict:
+        return {label_id: label.text()
+                for label_id, label in marker.label.items()}
+
+    def test_like_datapoints(self):
+        s11_list, s21_list = list(self.s11), list(self.s21)
+        for start in range(0, 1001, 3):
+            for i, m in enumerate(self.markers):
+                m.location = min(start + i, 1000)
+            Marker.updateMarkers(self.markers, self.s11, self.s21)
+            for m in self.markers:
+                self.assertEqual(
+                    self._texts(m),
+                    labels(s11_list, s21_list, m.location), m.location)
+
+    def test_active_labels(self):
+        marker = self.markers[0]
+        marker.setFieldSelection(["vswr"])
+        marker.resetLabels()
+        marker.location = 5
+        marker.updateLabels(self.s11, self.s21)
+        texts = self._texts(marker)
+        self.assertNotEqual(texts.pop("vswr"), "")
+        self.assertEqual(set(texts.values()), {""})
+        # newly shown labels are filled without new data
+        marker.setFieldSelection(["vswr", "s21gain"])
+        self.assertEqual(marker.label["s21gain"].text(),
+                         format_gain(self.s21[5].gain))
+
+    def test_without_s21(self):
+        marker = self.markers[0]
+        marker.location = 7
+        marker.updateLabels(list(self.s11), [])
+        self.assertEqual(marker.label["s21gain"].text(), "")
+        self.assertEqual(marker.label["vswr"].text(),
+                         format_vswr(self.s11[7].vswr))
+        marker.location = 5000
+        marker.updateLabels(self.s11, self.s21)
+        self.assertEqual(marker.location, 0)
@@ -0,0 +1,110 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import struct
+import threading
+import unittest
+
+import numpy as np
+
+# Import targets to be tested
+from NanoVNASaver.Hardware.NanoVNA import NanoVNA
+
+
+class FakeSerial:
+    """Answers scan commands like a NanoVNA shell"""
+
+    def __init__(self, binary: bool):
+        self.lock = threading.Lock()
+        self.timeout = 0.05
+        self.binary = binary
+        self.buffer = b""
+        self.scans = 0
+        self.synced = False
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.buffer)
+
+    def write(self, data: bytes):
+        command = data.decode("ascii").strip()
+        _, start, stop, points, mask = command.split()
+        self.scans += 1
+        freqs = np.linspace(int(start), int(stop), int(points)).astype(int)
+        out = command.encode("ascii") + b"\r\n"
+        if self.binary:
+            out += struct.pack("<HH", int(mask, 2) | 0x80, len(freqs))
+            for i, freq in enumerate(freqs):
+                out += struct.pack("<Iffff", freq, i / 8, -i / 8, 0.5, 0.25)
+        else:
+            for i, freq in enumerate(freqs):
+                out += f"{freq} {i / 8} {-i / 8} 0.5 0.25\r\n".encode()
+        self.buffer = out + b"ch> "
+
+    def read(self, size: int = 1) -> bytes:
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readline(self) -> bytes:
+        line, sep, self.buffer = self.buffer.partition(b"\n")
+        return line + sep
+
+    def read_until(self, expected: bytes) -> bytes:
+        data, sep, self.buffer = self.buffer.partition(expected)
+        return data + sep
+
+
+class TestNanoVNA(unittest.TestCase):
+
+    def _vna(self, binary: bool) -> NanoVNA:
+        vna = NanoVNA.__new__(NanoVNA)
+        vna.serial = FakeSerial(binary)
+        vna.features = {"Scan mask command"}
+        if binary:
+            vna.features.add("Scan binary output")
+        vna.sweep_method = "scan_mask"
+        vna.datapoints = 5
+        vna.bandwidth = 1000
+        vna._scan_unread = False
+        vna._sweepdata = []
+        vna.setSweep(1000000, 5000000)
+        return vna
+
+    def test_channel_1_first(self):
+        vna = self._vna(False)
+        s21 = vna.readComplexValues("data 1")
+        self.assertEqual(s21.dtype, complex)
+        self.assertEqual(len(s21), 0)
+        self.assertEqual(vna.serial.scans, 0)
+
+    def test_single_scan(self):
+        for binary in (False, True):
+            vna = self._vna(binary)
+            self.assertEqual(vna.readFrequencies(),
+                             [1000000, 2000000, 3000000, 4000000, 5000000])
+            s11 = vna.readComplexValues("data 0")
+            s21 = vna.readComplexValues("data 1")
+            self.assertEqual(vna.serial.scans, 1)
+            np.testing.assert_array_equal(
+                s11, np.arange(5) / 8 * (1 - 1j))
+            np.testing.assert_array_equal(s21, np.full(5, 0.5 + 0.25j))
+            self.assertEqual(vna.serial.timeout, 0.05)
+            self.assertTrue(vna.serial.synced)
+            # re-reading channel 0 scans again
+            self.assertEqual(vna.readValues("data 0")[1], "0.125 -0.125")
+            self.assertEqual(vna.serial.scans, 2)
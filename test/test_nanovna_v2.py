@@ -0,0 +1,76 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import threading
+import unittest
+from struct import pack
+
+import numpy as np
+
+# Import targets to be tested
+from NanoVNASaver.Hardware import NanoVNA_V2 as V2
+
+
+class FakeSerial:
+    def __init__(self, records: bytes):
+        self.lock = threading.Lock()
+        self.timeout = 1
+        self.records = records
+
+    def write(self, data: bytes):
+        pass
+
+    def read(self, size: int) -> bytes:
+        data, self.records = self.records[:size], self.records[size:]
+        return data
+
+
+class TestNanoVNA_V2(unittest.TestCase):
+
+    def setUp(self):
+        V2.WRITE_SLEEP = 0
+        self.addCleanup(setattr, V2, "WRITE_SLEEP", 0.05)
+
+    def _vna(self, records: bytes, points: int) -> V2.NanoVNA_V2:
+        vna = V2.NanoVNA_V2.__new__(V2.NanoVNA_V2)
+        vna.serial = FakeSerial(records)
+        vna.features = set()
+        vna.datapoints = points
+        return vna
+
+    def test_read_fifo(self):
+        # records arrive out of order
+        records = b"".join(
+            pack("<iiiiiihxxxxxx", 2, 0, i, -i, 10, 2 * i, i)
+            for i in (2, 0, 1))
+        vna = self._vna(records, 3)
+        s11 = vna.readComplexValues("data 0")
+        s21 = vna.readComplexValues("data 1")
+        np.testing.assert_array_equal(s11, [0, 0.5 - 0.5j, 1 - 1j])
+        np.testing.assert_array_equal(s21, [5, 5 + 1j, 5 + 2j])
+        self.assertEqual(vna.serial.timeout, 1)
+
+    def test_read_values(self):
+        records = pack("<iiiiiihxxxxxx", 4, 0, 1, 2, 3, 4, 0)
+        vna = self._vna(records, 1)
+        self.assertEqual(vna.readValues("data 0"), ["0.25 0.5"])
+        self.assertEqual(vna.readValues("data 1"), ["0.75 1.0"])
+
+    def test_short_read(self):
+        vna = self._vna(b"\0" * 40, 2)
+        self.assertEqual(len(vna.readComplexValues("data 0")), 0)
@@ -0,0 +1,82 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import os
+import time
+import unittest
+
+from PyQt5 import QtCore
+
+# Import targets to be tested
+from NanoVNASaver.RefreshScheduler import RefreshScheduler
+from NanoVNASaver.SweepStats import SweepStats
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+class TestRefreshScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.qt_app = (QtCore.QCoreApplication.instance() or
+                       QtCore.QCoreApplication([]))
+        self.refreshes = []
+        self.stats = SweepStats(enabled=True)
+        self.scheduler = RefreshScheduler(
+            lambda: self.refreshes.append(time.perf_counter()),
+            rate=20, stats=self.stats)
+
+    def _wait(self, seconds: float):
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            self.qt_app.processEvents()
+            time.sleep(0.001)
+
+    def test_coalesce(self):
+        for _ in range(10):
+            self.scheduler.request()
+        self.assertTrue(self.scheduler.pending())
+        self.assertEqual(self.refreshes, [])
+        self._wait(0.05)
+        self.assertEqual(len(self.refreshes), 1)
+        self.assertFalse(self.scheduler.pending())
+        counters = self.stats.snapshot()["counters"]
+        self.assertEqual(counters["dropped_refreshes"], 9)
+        self.assertEqual(counters["refreshes"], 1)
+
+    def test_rate(self):
+        # a long interval keeps the test independent of the load
+        self.scheduler.setRate(5)
+        self.scheduler.request()
+        self._wait(0.02)
+        self.assertEqual(len(self.refreshes), 1)
+        self.scheduler.request()
+        self._wait(0.02)
+        # the second refresh waits for the 200ms interval
+        self.assertEqual(len(self.refreshes), 1)
+        self._wait(0.4)
+        self.assertEqual(len(self.refreshes), 2)
+        self.assertGreaterEqual(
+            self.refreshes[1] - self.refreshes[0], 0.19)
+
+    def test_flush(self):
+        self.scheduler.request()
+        self.scheduler.flush()
+        self.assertEqual(len(self.refreshes), 1)
+        self.assertFalse(self.scheduler.pending())
+        self.scheduler.setRate(0)
+        self.assertEqual(self.scheduler.rate, 1)
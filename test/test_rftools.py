@@ -19,13 +19,16 @@
 import math
 import unittest
 
+import numpy as np
+
 # Import targets to be tested
 from NanoVNASaver.RFTools import Datapoint, \
     norm_to_impedance, impedance_to_norm, \
     reflection_coefficient, gamma_to_impedance, clamp_value, \
     parallel_to_serial, serial_to_parallel, \
     impedance_to_capacitance, impedance_to_inductance, \
-    groupDelay, corr_att_data
+    group_delay, groupDelay, corr_att_data
+from NanoVNASaver.SweepData import Trace
 
 
 class TestRFTools(unittest.TestCase):
@@ -121,6 +124,26 @@ class TestRFTools(unittest.TestCase):
         self.assertAlmostEqual(groupDelay(dpoints, 1), -9.514e-5)
         self.assertEqual(groupDelay(dpoints0, 1), 0.0)
 
+    def test_group_delay(self):
+        freq = np.arange(1000000, 1010000, 1000)
+        delay = 50e-9
+        # wraps around several times over the sweep
+        phase = np.angle(np.exp(-1j * math.tau * freq * delay))
+        np.testing.assert_allclose(group_delay(freq, phase), delay)
+        np.testing.assert_allclose(group_delay(freq, phase, 4), delay)
+        np.testing.assert_allclose(group_delay(freq, phase, 1), delay)
+        self.assertEqual(len(group_delay(freq[:1], phase[:1])), 1)
+        # the aperture smooths over the given number of steps
+        noisy = phase + np.resize([0, 0.01], len(phase))
+        self.assertLess(np.ptp(group_delay(freq, noisy, 4)),
+                        np.ptp(group_delay(freq, noisy)))
+        dps = [Datapoint(f, math.cos(p), math.sin(p))
+               for f, p in zip(freq, phase)]
+        for index in (0, 5, 9):
+            self.assertAlmostEqual(groupDelay(dps, index), delay)
+        trace = Trace.from_datapoints(dps)
+        self.assertEqual(groupDelay(trace, 5), trace.groupDelay()[5])
+
     def test_cor_att_data(self):
         dp1 = [
             Datapoint(100000, 0.1091, 0.3118),
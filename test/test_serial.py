@@ -0,0 +1,108 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import threading
+import unittest
+
+# Import targets to be tested
+from NanoVNASaver.Hardware.Serial import read_lines
+from NanoVNASaver.Hardware.VNA import VNA
+
+
+class FakeSerial:
+    """Hands out the answer in chunks and counts the reads"""
+
+    def __init__(self, chunks=(), answers=None):
+        self.lock = threading.Lock()
+        self.timeout = 0.01
+        self.synced = False
+        self.chunks = list(chunks)
+        self.answers = answers or {}
+        self.reads = 0
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.chunks[0]) if self.chunks else 0
+
+    def read(self, size: int = 1) -> bytes:
+        self.reads += 1
+        if not self.chunks:
+            return b""
+        chunk = self.chunks.pop(0)
+        if len(chunk) > size:
+            chunk, rest = chunk[:size], chunk[size:]
+            self.chunks.insert(0, rest)
+        return chunk
+
+    def write(self, data: bytes):
+        self.chunks.extend(self.answers[data])
+
+
+class TestReadLines(unittest.TestCase):
+
+    def test_split_chunks(self):
+        port = FakeSerial([b"data 0\r\n1.0 2", b".0\r\n\r\n3.0 4.0\r",
+                           b"\nch", b"> "])
+        self.assertEqual(list(read_lines(port, 1)),
+                         ["data 0", "1.0 2.0", "3.0 4.0"])
+        self.assertEqual(port.reads, 4)
+
+    def test_prompt_line(self):
+        port = FakeSerial([b"info\r\nch> \r\nleft over"])
+        self.assertEqual(list(read_lines(port, 1)), ["info"])
+
+    def test_timeout(self):
+        port = FakeSerial([b"1.0 2.0\r\n"])
+        with self.assertRaises(IOError):
+            list(read_lines(port, 0.05))
+
+
+class TestExecCommand(unittest.TestCase):
+
+    def _vna(self, chunks, answers) -> VNA:
+        vna = VNA.__new__(VNA)
+        vna.serial = FakeSerial(chunks, answers)
+        vna.bandwidth = 1000
+        vna.datapoints = 101
+        return vna
+
+    def test_drain_only_out_of_sync(self):
+        vna = self._vna([b"stale\r\n"], {
+            b"version\r": [b"version\r\n1.2.3\r\nch> "],
+            b"info\r": [b"info\r\nfoo\r\nch> "],
+        })
+        self.assertEqual(list(vna.exec_command("version")), ["1.2.3"])
+        self.assertTrue(vna.serial.synced)
+        vna.serial.reads = 0
+        self.assertEqual(list(vna.exec_command("info")), ["foo"])
+        # in sync, no drain read needed before the command
+        self.assertEqual(vna.serial.reads, 1)
+
+    def test_prompt_blank_pending(self):
+        vna = self._vna([b" "], {b"info\r": [b"info\r\nfoo\r\nch> "]})
+        vna.serial.synced = True
+        self.assertEqual(list(vna.exec_command("info")), ["foo"])
+        # blank read without waiting for the line to get quiet
+        self.assertEqual(vna.serial.reads, 2)
+
+    def test_abandoned_command(self):
+        vna = self._vna([], {b"data 0\r": [b"data 0\r\n1 2\r\n3 4\r\nch> "]})
+        lines = vna.exec_command("data 0")
+        self.assertEqual(next(lines), "1 2")
+        lines.close()
+        self.assertFalse(vna.serial.synced)
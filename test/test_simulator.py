@@ -0,0 +1,115 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import time
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Import targets to be tested
+from NanoVNASaver.Hardware import NanoVNA_V2
+from NanoVNASaver.Hardware.Hardware import get_comment, get_VNA
+from NanoVNASaver.Hardware.Simulator import (
+    Antenna, BandPass, Cable, Load, LowPass, ShellDevice,
+    SimulatedInterface, V2Device)
+
+FREQ = np.linspace(1e6, 300e6, 101)
+
+
+class TestModels(unittest.TestCase):
+
+    def test_load(self):
+        s11, s21 = Load(50).s_parameters(FREQ)
+        np.testing.assert_array_equal(s11, 0)
+        np.testing.assert_array_equal(s21, 0)
+        self.assertAlmostEqual(Load(150).s_parameters(FREQ)[0][0], 0.5)
+
+    def test_antenna(self):
+        s11, _ = Antenna(100e6, resistance=40).s_parameters(
+            np.array([50e6, 100e6, 200e6]))
+        self.assertAlmostEqual(s11[1], -10 / 90)
+        self.assertTrue(np.all(np.abs(s11[[0, 2]]) > abs(s11[1])))
+
+    def test_cable(self):
+        s11, s21 = Cable(10, loss=0, termination=Load(0)).s_parameters(FREQ)
+        np.testing.assert_allclose(np.abs(s21), 1)
+        np.testing.assert_allclose(s11, -s21 ** 2)
+        _, lossy = Cable(10).s_parameters(FREQ)
+        self.assertTrue(np.all(np.diff(np.abs(lossy)) < 0))
+
+    def test_filters(self):
+        for dut in (LowPass(100e6), BandPass(100e6, 20e6)):
+            s11, s21 = dut.s_parameters(FREQ)
+            np.testing.assert_allclose(
+                np.abs(s11) ** 2 + np.abs(s21) ** 2, 1)
+        s21 = LowPass(100e6).s_parameters(np.array([100e6]))[1]
+        self.assertAlmostEqual(20 * np.log10(abs(s21[0])), -3.0103, 3)
+
+
+class TestSimulatedInterface(unittest.TestCase):
+
+    def _vna(self, device, **kwargs):
+        iface = SimulatedInterface(device, **kwargs)
+        iface.open()
+        iface.comment = get_comment(iface)
+        return get_VNA(iface)
+
+    def _sweep(self, vna, dut, places):
+        vna.datapoints = 101
+        vna.setSweep(1000000, 301000000)
+        freq = vna.readFrequencies()
+        self.assertEqual(freq[:2], [1000000, 4000000])
+        s11, s21 = dut.s_parameters(np.array(freq, dtype=float))
+        np.testing.assert_almost_equal(
+            vna.readComplexValues("data 0"), s11, places)
+        np.testing.assert_almost_equal(
+            vna.readComplexValues("data 1"), s21, places)
+
+    def test_shell(self):
+        dut = Cable(5, termination=Antenna(100e6))
+        for binary, places in ((False, 8), (True, 6)):
+            vna = self._vna(ShellDevice(dut, scan_binary=binary))
+            self.assertEqual(vna.name, "NanoVNA-H")
+            self.assertEqual(vna.sweep_method, "scan_mask")
+            self.assertEqual("Scan binary output" in vna.features, binary)
+            self._sweep(vna, dut, places)
+
+    @patch.object(NanoVNA_V2, "WRITE_SLEEP", 0)
+    def test_v2(self):
+        dut = BandPass(150e6, 50e6)
+        vna = self._vna(V2Device(dut))
+        self.assertEqual(vna.name, "NanoVNA-V2")
+        self.assertEqual(str(vna.version), "1.0.3")
+        self._sweep(vna, dut, 6)
+
+    def test_timing(self):
+        iface = SimulatedInterface(
+            ShellDevice(Load(), latency=0.02), bandwidth=10000)
+        iface.open()
+        start = time.monotonic()
+        iface.write(b"frequencies\r")
+        self.assertEqual(iface.in_waiting, 0)
+        iface.timeout = 1
+        data = iface.read_until(b"ch> ")
+        # 101 lines of ~11 bytes at 10000 bytes/s after the latency
+        self.assertGreater(time.monotonic() - start, 0.02 + len(data) / 10000)
+        self.assertTrue(data.endswith(b"ch> "))
+        iface.timeout = 0.01
+        iface.write(b"frequencies\r")
+        self.assertLess(len(iface.read(10000)), 10000)
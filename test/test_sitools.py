@@ -20,8 +20,10 @@ import unittest
 from math import inf
 from decimal import Decimal  # Needed for test_representation()
 
+import numpy as np
+
 # Import targets to be tested
-from NanoVNASaver.SITools import Format, Value
+from NanoVNASaver.SITools import Format, Value, format_value
 
 F_DEFAULT = Format()
 
@@ -157,6 +159,32 @@ class TestTSIToolsValue(unittest.TestCase):
         self.assertEqual(v.unit, "Hz")
 
 
+class TestFormatValue(unittest.TestCase):
+
+    def test_like_value(self):
+        rng = np.random.default_rng(9)
+        values = np.concatenate((
+            rng.normal(0, 1, 200) * 10.0 ** rng.integers(-30, 30, 200),
+            [0.0, -0.0, inf, -inf, 1e27, 999.9995, 0.0004999, 1234567890,
+             5e-25, -5e-28, 1e-3, 9.9999996, 99.99995, 1e24]))
+        formats = (F_DEFAULT, F_DIGITS_1, F_DIGITS_3, F_DIGITS_4,
+                   F_WITH_SPACE, F_WITH_UNDERSCORE,
+                   Format(max_nr_digits=5, space_str=" ", allow_strip=True),
+                   Format(max_nr_digits=3, allow_strip=True,
+                          printable_min=0, unprintable_under="- "),
+                   Format(fix_decimals=True, allways_signed=True))
+        for fmt in formats:
+            for value in values.tolist() + [0, 7, -12345, 10 ** 15]:
+                try:
+                    expected = str(Value(value, "Hz", fmt))
+                except (OverflowError, ValueError) as exc:
+                    self.assertRaises(
+                        type(exc), format_value, value, "Hz", fmt)
+                    continue
+                self.assertEqual(
+                    format_value(value, "Hz", fmt), expected, value)
+
+
 
 # TODO: test F_DIGITS_31
 #            F_WITH_SPACE
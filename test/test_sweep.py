@@ -27,7 +27,8 @@ class TestCases(unittest.TestCase):
         sweep = Sweep()
         self.assertEqual(str(sweep),
                          "Sweep(3600000, 30000000, 101, 1, Properties('',"
-                         " SweepMode.SINGLE, (3, 0), False))")
+                         " SweepMode.SINGLE, (3, 0), False, Estimator.MEAN,"
+                         " (8, False)))")
         self.assertTrue(Sweep(3600000) == sweep)
         self.assertFalse(Sweep(3600001) == sweep)
         self.assertRaises(ValueError, Sweep, -1)
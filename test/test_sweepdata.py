@@ -0,0 +1,129 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import unittest
+
+import numpy as np
+
+# Import targets to be tested
+from NanoVNASaver.RFTools import Datapoint
+from NanoVNASaver.Settings.Sweep import Sweep
+from NanoVNASaver.SweepData import Snapshot, SweepData, Trace
+
+
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.dps = [
+            Datapoint(100000, 0.1091, 0.3118),
+            Datapoint(100000000, 0.1091, 0.3124),
+            Datapoint(200000000, -0.5, -0.5),
+            Datapoint(300000000, 1.0, 0.0),
+            Datapoint(400000000, 0.0, 0.0),
+        ]
+        self.trace = Trace.from_datapoints(self.dps)
+
+    def test_list_interface(self):
+        self.assertEqual(len(self.trace), 5)
+        self.assertEqual(self.trace[2], self.dps[2])
+        self.assertEqual(self.trace[-1], self.dps[-1])
+        self.assertIsInstance(self.trace[0].freq, int)
+        self.assertEqual(list(self.trace), self.dps)
+        self.assertEqual(self.trace, self.dps)
+        self.assertEqual(self.trace[1:3], self.dps[1:3])
+        self.assertIs(self.trace[:], self.trace)
+        self.assertIs(Trace.from_datapoints(self.trace), self.trace)
+        self.assertIn(self.dps[3], self.trace)
+        self.assertFalse(Trace.from_datapoints([]))
+
+    def test_immutable(self):
+        with self.assertRaises(ValueError):
+            self.trace.z[0] = 0
+        with self.assertRaises(ValueError):
+            self.trace.gain[0] = 0
+
+    def test_derived_columns(self):
+        np.testing.assert_allclose(self.trace.phase,
+                                   [dp.phase for dp in self.dps])
+        np.testing.assert_allclose(self.trace.gain,
+                                   [dp.gain for dp in self.dps])
+        np.testing.assert_allclose(self.trace.vswr,
+                                   [dp.vswr for dp in self.dps])
+        np.testing.assert_allclose(self.trace.impedance(),
+                                   [dp.impedance() for dp in self.dps])
+        np.testing.assert_allclose(self.trace.impedance(75),
+                                   [dp.impedance(75) for dp in self.dps])
+        self.assertIs(self.trace.gain, self.trace.gain)
+        # exactly as rounded per point, scales are rounded up from these
+        np.testing.assert_array_equal(self.trace.mag,
+                                      [abs(dp.z) for dp in self.dps])
+
+    def test_equivalents(self):
+        dps = self.dps + [Datapoint(0, 0.2, 0.3)]
+        trace = Trace.from_datapoints(dps)
+        for name in ("shuntImpedance", "seriesImpedance", "qFactor",
+                     "capacitiveEquivalent", "inductiveEquivalent"):
+            for ref in (50, 75):
+                np.testing.assert_allclose(
+                    getattr(trace, name)(ref),
+                    [getattr(dp, name)(ref) for dp in dps], err_msg=name)
+        self.assertIs(trace.qFactor(), trace.qFactor(50))
+        self.assertIsNot(trace.qFactor(), trace.qFactor(75))
+
+    def test_scaled(self):
+        scaled = self.trace.scaled(2)
+        np.testing.assert_array_equal(scaled.z, self.trace.z * 2)
+        np.testing.assert_array_equal(scaled.freq, self.trace.freq)
+
+
+class TestSweepData(unittest.TestCase):
+
+    def test_from_sweep(self):
+        sweep = Sweep(segments=3)
+        data = SweepData.from_sweep(sweep)
+        self.assertEqual(len(data), 303)
+        self.assertEqual(list(data.freq), list(sweep.get_frequencies()))
+        self.assertFalse(data.s11.any())
+        self.assertRaises(ValueError, SweepData, [1, 2], [1j])
+
+    def test_update(self):
+        data = SweepData([1, 2, 3, 4])
+        trace = data.trace("11")
+        self.assertIs(data.trace("11"), trace)
+        data.update(2, SweepData([5, 6], [1 + 1j, 2 + 2j], [3j, 4j]))
+        self.assertEqual(list(data.freq), [1, 2, 5, 6])
+        self.assertEqual(list(data.s21), [0, 0, 3j, 4j])
+        # published traces do not change with the data
+        self.assertEqual(list(trace.z), [0, 0, 0, 0])
+        self.assertEqual(list(data.trace("11").z), [0, 0, 1 + 1j, 2 + 2j])
+        copy = data.copy()
+        copy.s11[0] = 1
+        self.assertEqual(data.s11[0], 0)
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def test_snapshot(self):
+        data = SweepData([1, 2], [1j, 2j], [3j, 4j])
+        first = Snapshot(data.trace("11"), data.trace("21"), "first")
+        empty = Snapshot()
+        self.assertEqual(len(empty.s11), 0)
+        self.assertGreater(empty.version, first.version)
+        self.assertEqual(list(first.s21.z), [3j, 4j])
+        with self.assertRaises(AttributeError):
+            first.s11 = empty.s11
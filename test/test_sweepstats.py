@@ -0,0 +1,71 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import json
+import os
+import tempfile
+import unittest
+
+# Import targets to be tested
+from NanoVNASaver.SweepStats import Histogram, SweepStats
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_add(self):
+        hist = Histogram()
+        for seconds in (0.00005, 0.001, 0.001, 0.002, 0.5):
+            hist.add(seconds)
+        self.assertEqual(hist.count, 5)
+        self.assertAlmostEqual(hist.total, 0.50405)
+        self.assertEqual(hist.min, 0.00005)
+        self.assertEqual(hist.max, 0.5)
+        self.assertAlmostEqual(hist.quantile(0.5), 0.0016)
+        self.assertEqual(hist.quantile(1), 0.5)
+        self.assertEqual(sum(hist.buckets), 5)
+        self.assertEqual(Histogram().quantile(0.5), 0)
+
+
+class TestSweepStats(unittest.TestCase):
+
+    def test_disabled(self):
+        stats = SweepStats()
+        with stats.timer("stage"):
+            pass
+        stats.count("counter")
+        self.assertEqual(stats.snapshot()["stages"], {})
+        self.assertEqual(stats.snapshot()["counters"], {})
+
+    def test_enabled(self):
+        stats = SweepStats(enabled=True)
+        for _ in range(3):
+            with stats.timer("stage"):
+                pass
+        stats.count("bytes", 10)
+        stats.count("bytes", 5)
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot["stages"]["stage"]["count"], 3)
+        self.assertEqual(snapshot["counters"], {"bytes": 15})
+        self.assertEqual(len(stats.report()), 3)
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "stats.json")
+            stats.save(filename)
+            with open(filename, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["counters"], {"bytes": 15})
+        stats.reset()
+        self.assertEqual(stats.snapshot()["stages"], {})
@@ -0,0 +1,337 @@
+#  NanoVNASaver
+#
+#  A python program to view and export Touchstone data from a NanoVNA
+#  Copyright (C) 2019, 2020  Rune B. Broberg
+#  Copyright (C) 2020,2021 NanoVNA-Saver Authors
+#
+#  This program is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Import targets to be tested
+from NanoVNASaver.Calibration import Calibration, correct_delay_batch
+from NanoVNASaver.Hardware.VNA import parse_values
+from NanoVNASaver.Settings.Sweep import (
+    Estimator, Properties, Sweep, SweepMode)
+from NanoVNASaver.SweepWorker import (
+    RunningAverage, SweepWorker, average, logger, truncate)
+
+
+class FakeSerial:
+    bytes_in = 0
+    bytes_out = 0
+
+
+class FakeVNA:
+    validateInput = False
+
+    def __init__(self, points: int):
+        self.points = points
+        self.start = self.stop = 0
+        self.reads = 0
+        self.failures = 0  # number of segment reads without data
+        self.serial = FakeSerial()
+
+    def connected(self) -> bool:
+        return True
+
+    def setSweep(self, start, stop):
+        self.start, self.stop = start, stop
+        self.failing = self.failures > 0
+        self.failures = max(0, self.failures - 1)
+
+    def resetSweep(self, start, stop):
+        pass
+
+    def readFrequencies(self):
+        self.reads += 1
+        if self.failing:
+            return []
+        step = (self.stop - self.start) / self.points
+        return [round(self.start + i * step) for i in range(self.points)]
+
+    def readValues(self, value):
+        scale = 1e-9 if value == "data 0" else -1e-9
+        self.serial.bytes_out += len(value) + 1
+        self.serial.bytes_in += 20 * self.points
+        return [f"{f * scale} 0.5" for f in self.readFrequencies()]
+
+    def readComplexValues(self, value):
+        return parse_values(self.readValues(value))
+
+
+class FakeApp:
+    sweepSource = ""
+
+    def __init__(self, sweep: Sweep):
+        self.sweep = sweep
+        self.vna = FakeVNA(sweep.points)
+        self.calibration = Calibration()
+        self.saved = []
+        self.threads = set()
+        self.locked = set()
+
+    def saveData(self, s11, s21, source=None):
+        self.threads.add(threading.current_thread().name)
+        self.locked.add(self.worker.lock.locked())
+        self.saved.append((s11, s21))
+
+
+class TestSweepWorker(unittest.TestCase):
+
+    def _worker(self, sweep: Sweep) -> SweepWorker:
+        app = FakeApp(sweep)
+        worker = app.worker = SweepWorker(app)
+        self.finished = []
+        self.errors = []
+        worker.signals.finished.connect(lambda: self.finished.append(True))
+        worker.signals.sweepError.connect(
+            lambda: self.errors.append(worker.error_message))
+        return worker
+
+    def test_segments(self):
+        sweep = Sweep(1000000, 10000000, points=11, segments=5)
+        worker = self._worker(sweep)
+        worker.run()
+        app = worker.app
+        self.assertEqual(self.errors, [])
+        self.assertTrue(self.finished)
+        self.assertFalse(worker.running)
+        self.assertEqual(len(app.saved), 5)
+        self.assertEqual(app.threads, {"SweepProcessor"})
+        s11, s21 = app.saved[-1]
+        self.assertEqual(len(s11), 55)
+        np.testing.assert_array_equal(
+            s11.freq, list(sweep.get_frequencies()))
+        np.testing.assert_allclose(s11.re, s11.freq * 1e-9)
+        np.testing.assert_allclose(s21.re, s21.freq * -1e-9)
+
+    def test_stats(self):
+        sweep = Sweep(1000000, 10000000, points=11, segments=3)
+        worker = self._worker(sweep)
+        worker.stats.enabled = True
+        worker.run()
+        snapshot = worker.stats.snapshot()
+        for stage, count in (("sweep", 1), ("readSegment", 3),
+                             ("readData", 6), ("applyCalibration", 3),
+                             ("updateData", 3)):
+            self.assertEqual(snapshot["stages"][stage]["count"], count)
+        self.assertEqual(snapshot["counters"], {
+            "segments": 3, "points": 33,
+            "serial_bytes_in": 3 * 2 * 220, "serial_bytes_out": 3 * 14})
+
+    def test_stop(self):
+        sweep = Sweep(1000000, 10000000, points=11, segments=3,
+                      properties=Properties(mode=SweepMode.CONTINOUS))
+        worker = self._worker(sweep)
+
+        def stop_after(s11, s21):
+            FakeApp.saveData(worker.app, s11, s21)
+            if len(worker.app.saved) == 7:
+                worker.stopped = True
+        worker.app.saveData = stop_after
+        worker.run()
+        self.assertTrue(self.finished)
+        # segments already read when stopping are still published
+        self.assertGreaterEqual(len(worker.app.saved), 7)
+        self.assertLessEqual(len(worker.app.saved), 7 + 2)
+
+    def test_running_average(self):
+        sweep = Sweep(1000000, 10000000, points=11, segments=2,
+                      properties=Properties(mode=SweepMode.RUNNING_AVERAGE,
+                                            running=(4, False)))
+        worker = self._worker(sweep)
+
+        def stop_after(s11, s21):
+            FakeApp.saveData(worker.app, s11, s21)
+            if len(worker.app.saved) == 6:
+                worker.stopped = True
+        worker.app.saveData = stop_after
+        worker.run()
+        self.assertEqual(self.errors, [])
+        # every single read is published
+        self.assertEqual(len(worker.app.saved), worker.app.vna.reads // 3)
+        self.assertEqual(self._averaged(worker), len(worker.app.saved))
+        s11, _ = worker.app.saved[-1]
+        np.testing.assert_allclose(s11.re, s11.freq * 1e-9)
+
+        # changing the sweep starts averaging again
+        worker.app.sweep = Sweep(2000000, 10000000, points=11, segments=2,
+                                 properties=sweep.properties)
+        worker.stopped = False
+        worker.app.saved = []
+        worker.run()
+        self.assertEqual(self._averaged(worker), len(worker.app.saved))
+
+    def test_running_average_failed_read(self):
+        sweep = Sweep(1000000, 10000000, points=11, segments=1,
+                      properties=Properties(mode=SweepMode.RUNNING_AVERAGE,
+                                            running=(4, False)))
+        worker = self._worker(sweep)
+        vna = worker.app.vna
+
+        def fail_after(s11, s21):
+            FakeApp.saveData(worker.app, s11, s21)
+            if len(worker.app.saved) == 2:
+                vna.failures = 5  # the next read fails all its retries
+            if len(worker.app.saved) == 5:
+                worker.stopped = True
+        worker.app.saveData = fail_after
+        with patch("NanoVNASaver.SweepWorker.sleep"):
+            worker.run()
+        # all successful reads are kept in the average
+        self.assertEqual(self._averaged(worker), vna.reads // 3 - 5)
+        self.assertGreaterEqual(self._averaged(worker), 4)
+        s11, _ = worker.app.saved[-1]
+        np.testing.assert_allclose(s11.re, s11.freq * 1e-9)
+
+    @staticmethod
+    def _averaged(worker: SweepWorker) -> int:
+        return sum(s11.count for s11, _ in worker._running_average.values())
+
+    def test_implausible(self):
+        sweep = Sweep(1000000, 10000000, points=11, segments=1)
+        worker = self._worker(sweep)
+        vna = worker.app.vna
+        vna.validateInput = True
+        read = vna.readComplexValues
+        bad = [True]
+
+        def zero_forward(value):
+            values = read(value)
+            if bad:  # e.g. divided by a zero forward sample
+                values[3] = complex(np.nan, np.nan)
+                bad.pop()
+            return values
+        vna.readComplexValues = zero_forward
+        with patch("NanoVNASaver.SweepWorker.sleep"):
+            worker.run()
+        s11, _ = worker.app.saved[-1]
+        self.assertTrue(np.all(np.isfinite(s11.z)))
+        np.testing.assert_allclose(s11.re, s11.freq * 1e-9)
+
+    def test_offset_delay(self):
+        sweep = Sweep(1000000, 10000000, points=11, segments=2)
+        worker = self._worker(sweep)
+        worker.run()
+        worker.setOffsetDelay(1e-9)
+        s11, s21 = worker.app.saved[-1]
+        self.assertEqual(len(worker.app.saved), 3)
+        raw = worker.rawData
+        np.testing.assert_allclose(s11.z, correct_delay_batch(
+            raw.freq, raw.s11, 1e-9, reflect=True))
+        np.testing.assert_allclose(
+            s21.z, correct_delay_batch(raw.freq, raw.s21, 1e-9))
+        np.testing.assert_array_equal(worker.data.s11, s11.z)
+        # published holding the lock, by the processor and the GUI
+        self.assertEqual(worker.app.locked, {True})
+        self.assertEqual(worker.app.threads,
+                         {"SweepProcessor", threading.current_thread().name})
+
+    def test_processing_error(self):
+        sweep = Sweep(1000000, 10000000, points=11, segments=20)
+        worker = self._worker(sweep)
+
+        def fail(s11, s21):
+            raise KeyError("broken")
+        worker.app.saveData = fail
+        worker.run()
+        self.assertEqual(len(self.errors), 1)
+        self.assertIn("broken", self.errors[0])
+        self.assertLess(worker.app.vna.reads, 20 * 3)
+
+
+class TestRunningAverage(unittest.TestCase):
+
+    def test_moving(self):
+        avg = RunningAverage(3)
+        reads = [np.full(4, v, dtype=complex) for v in (1, 2, 6, 10, 1j)]
+        expected = [1, 1.5, 3, 6, (6 + 10 + 1j) / 3]
+        for read, value in zip(reads, expected):
+            np.testing.assert_allclose(avg.add(read), np.full(4, value))
+
+    def test_exponential(self):
+        avg = RunningAverage(3, exponential=True)
+        # weights 1, 1/2 while warming up, then 2 / (3 + 1)
+        results = [avg.add(np.array([v]))[0] for v in (4, 2, 2, 2)]
+        np.testing.assert_allclose(results, [4, 3, 2.5, 2.25])
+
+    def test_failed_read(self):
+        avg = RunningAverage(3)
+        avg.add(np.ones(4))
+        # passed on, but not averaged
+        np.testing.assert_allclose(avg.add(np.zeros(5)), np.zeros(5))
+        self.assertEqual(len(avg.add(np.array([]))), 0)
+        self.assertEqual(avg.count, 1)
+        np.testing.assert_allclose(avg.add(np.full(4, 3)), np.full(4, 2))
+
+
+class TestTruncate(unittest.TestCase):
+
+    def test_truncate(self):
+        values = np.array([
+            [1 + 1j, 5 + 0j, 2 + 0j],
+            [1 + 2j, 2 + 0j, 2 + 0j],
+            [9 + 9j, 3 + 0j, 2 + 0j],
+        ])
+        truncated = truncate(values, 1)
+        self.assertEqual(truncated.shape, (2, 3))
+        # kept samples come in no particular order
+        np.testing.assert_array_equal(
+            np.sort_complex(truncated.T),
+            [[1 + 1j, 1 + 2j], [2 + 0j, 3 + 0j], [2 + 0j, 2 + 0j]])
+        self.assertIs(truncate(values, 3), values)
+
+
+class TestAverage(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.values = (rng.normal(0, 0.01, (16, 1023)) +
+                       1j * rng.normal(0, 0.01, (16, 1023)) + 0.5)
+        # one wild sample per point
+        self.values[7] = 5 + 5j
+
+    def test_mean(self):
+        with patch.object(logger, "info") as info:
+            np.testing.assert_array_equal(
+                average(self.values), self.values.mean(0))
+            np.testing.assert_array_equal(
+                average(self.values, Estimator.TRIMMED_MEAN),
+                self.values.mean(0))
+        info.assert_not_called()
+        np.testing.assert_allclose(
+            average(self.values, Estimator.MEAN, 1), 0.5, atol=0.02)
+        np.testing.assert_array_equal(
+            average(self.values[:1], Estimator.MEDIAN), self.values[0])
+
+    def test_robust(self):
+        for estimator, count in ((Estimator.MEDIAN, 0),
+                                 (Estimator.TRIMMED_MEAN, 2),
+                                 (Estimator.SIGMA_CLIP, 0)):
+            result = average(self.values, estimator, count)
+            self.assertEqual(result.shape, (1023, ))
+            np.testing.assert_allclose(result, 0.5, atol=0.02)
+        # the wild sample is clipped in the first round
+        np.testing.assert_allclose(
+            average(self.values, Estimator.SIGMA_CLIP),
+            np.delete(self.values, 7, 0).mean(0), atol=0.005)
+
+    def test_median(self):
+        values = np.array([[1 + 5j], [2 + 1j], [9 + 2j]])
+        np.testing.assert_array_equal(
+            average(values, Estimator.MEDIAN), [2 + 2j])
@@ -16,6 +16,7 @@
 #
 #  You should have received a copy of the GNU General Public License
 #  along with this program.  If not, see <https://www.gnu.org/licenses/>.
+import io
 import unittest
 import logging
 import os
@@ -149,6 +150,28 @@ class TestTouchstoneTouchstone(unittest.TestCase):
         self.assertIn("!freq ReS11 ImS11 ReS21 ImS21 ReS12 ImS12 ReS22 ImS22",
                       ts.comments)
 
+    def test_bulk_parser(self):
+        for filename in ("attenuator-0643_DB.s2p", "ma.s2p",
+                         "valid.s2p", "valid_with_datacomment.s1p"):
+            ts_bulk = Touchstone(f"./test/data/{filename}")
+            ts_bulk.load()
+            ts_lines = Touchstone(f"./test/data/{filename}")
+            with open(ts_lines.filename) as infile:
+                ts_lines.opts.parse(ts_lines._parse_comments(infile))
+                ts_lines._loads_lines(infile)
+            self.assertEqual(ts_bulk.comments, ts_lines.comments)
+            for data_bulk, data_lines in zip(ts_bulk.sdata, ts_lines.sdata):
+                self.assertEqual(len(data_bulk), len(data_lines))
+                for dp_bulk, dp_lines in zip(data_bulk, data_lines):
+                    self.assertEqual(dp_bulk.freq, dp_lines.freq)
+                    self.assertAlmostEqual(dp_bulk.z, dp_lines.z, places=12)
+
+        ts = Touchstone("./test/data/valid.s1p")
+        ts.load()
+        ts.loads("# HZ S RI R 50\n1 0.1 0.2\n")
+        self.assertEqual(len(ts.s11), 1011)
+        self.assertEqual(ts.s11[-1], Datapoint(1, 0.1, 0.2))
+
     def test_setter(self):
         ts = Touchstone("")
         dp_list = [Datapoint(1, 0.0, 0.0), Datapoint(3, 1.0, 1.0)]
@@ -193,3 +216,25 @@ class TestTouchstoneTouchstone(unittest.TestCase):
         ts.s11[0] = Datapoint(100, 0.1, 0.1)
         self.assertRaisesRegex(
             LookupError, "Frequencies of sdata not correlated", ts.saves, 4)
+
+    def test_write(self):
+        ts = Touchstone("./test/data/valid.s2p")
+        ts.load()
+        stream = io.StringIO()
+        ts.write(stream, 4, chunk_size=7)
+        self.assertEqual(stream.getvalue(), ts.saves(4))
+
+        for options in ("# MHZ S MA R 50", "# GHZ S DB R 50",
+                        "# KHZ S RI R 50"):
+            opts = Options()
+            opts.parse(options)
+            written = ts.saves(4, opts)
+            self.assertTrue(written.startswith(options + "\n"))
+            ts_read = Touchstone()
+            ts_read.loads(written)
+            self.assertEqual(str(ts_read.opts), options)
+            for data, data_read in zip(ts.sdata, ts_read.sdata):
+                self.assertEqual(len(data), len(data_read))
+                for dp, dp_read in zip(data, data_read):
+                    self.assertEqual(dp.freq, dp_read.freq)
+                    self.assertAlmostEqual(dp.z, dp_read.z, places=12)